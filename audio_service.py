@@ -3,60 +3,250 @@
 负责音频提取和语音识别功能
 """
 import asyncio
+import difflib
 import json
 import os
+import re
 import subprocess
 import tempfile
 import mimetypes
 import uuid
-from typing import Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 import aiohttp
 from astrbot.api import logger
 
+if TYPE_CHECKING:
+    from .http_client import HttpClientManager
+
+
+# Whisper API 单个文件大小上限
+WHISPER_MAX_FILE_SIZE = 25 * 1024 * 1024
+# 文件超过大小上限但未配置分段时长时使用的分段时长（秒）
+DEFAULT_SEGMENT_SECONDS = 600
+# 分段识别失败的片段超过此比例时放弃整个转写，避免用残缺的文本生成总结
+MAX_FAILED_SEGMENT_RATIO = 0.2
+# 音频编码方案：ffmpeg编码参数、输出格式和文件后缀
+# opus 在 16~24kbps 下即可保持语音清晰度，体积约为 64kbps mp3 的 1/3；flac 为无损格式，适合本地识别服务
+ENCODING_PROFILES: Dict[str, Dict[str, Any]] = {
+    'mp3-64k': {
+        'args': ['-acodec', 'libmp3lame', '-ar', '16000', '-ac', '1', '-b:a', '64k'],
+        'format': 'mp3', 'ext': '.mp3',
+    },
+    'opus-24k': {
+        'args': ['-acodec', 'libopus', '-ar', '16000', '-ac', '1', '-b:a', '24k', '-application', 'voip'],
+        'format': 'ogg', 'ext': '.ogg',
+    },
+    'opus-16k': {
+        'args': ['-acodec', 'libopus', '-ar', '16000', '-ac', '1', '-b:a', '16k', '-application', 'voip'],
+        'format': 'ogg', 'ext': '.ogg',
+    },
+    'flac-16k': {
+        'args': ['-acodec', 'flac', '-ar', '16000', '-ac', '1', '-sample_fmt', 's16'],
+        'format': 'flac', 'ext': '.flac',
+    },
+}
+DEFAULT_ENCODING_PROFILE = 'mp3-64k'
+
+# 语音加速倍率范围：超过2倍后识别准确率明显下降（单个 atempo 滤镜在旧版 ffmpeg 中也只支持到2倍）
+MIN_SPEED_FACTOR = 1.0
+MAX_SPEED_FACTOR = 2.0
+
+# 从ffmpeg标准输出读取音频时的块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# 剪除静音时在语音两侧保留的余量（秒），避免切掉字词的起止
+SILENCE_PADDING = 0.25
+
+_SILENCE_START_PATTERN = re.compile(r'silence_start:\s*(-?[\d.]+)')
+_SILENCE_END_PATTERN = re.compile(r'silence_end:\s*(-?[\d.]+)')
+_FFMPEG_TIME_PATTERN = re.compile(r'time=(\d+):(\d+):([\d.]+)')
+_FFMPEG_DURATION_PATTERN = re.compile(r'Duration:\s*(\d+):(\d+):([\d.]+)')
+
+
+class AudioBufferOverflow(Exception):
+    """流式提取的音频超过了内存缓冲上限"""
+
+
+def stitch_transcripts(parts: List[str], window: int = 80, min_match: int = 4) -> str:
+    """按顺序拼接分段识别结果，去除相邻片段因音频重叠而重复的文字
+
+    在前一段末尾和后一段开头各 window 个字符内寻找最长的公共片段，
+    长度达到 min_match 且两侧被丢弃的文字不超过 window 的一半时视为重叠内容，只保留一份。
+    """
+    result = ''
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if not result:
+            result = part
+            continue
+        tail = result[-window:]
+        head = part[:window]
+        match = difflib.SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(
+            0, len(tail), 0, len(head))
+        discarded = (len(tail) - match.a - match.size) + match.b
+        if match.size >= min_match and discarded <= window // 2:
+            cut = len(result) - len(tail) + match.a + match.size
+            result = result[:cut] + part[match.b + match.size:]
+        else:
+            separator = ' ' if result[-1].isascii() and part[0].isascii() else ''
+            result = result + separator + part
+    return result
+
+
+def parse_silences(stderr_text: str) -> List[Tuple[float, float]]:
+    """从 ffmpeg silencedetect 的输出中解析静音区间，末尾未结束的静音终点记为无穷大"""
+    silences = []
+    start = None
+    for line in stderr_text.splitlines():
+        match = _SILENCE_START_PATTERN.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = _SILENCE_END_PATTERN.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if start is not None:
+        silences.append((start, float('inf')))
+    return silences
+
+
+def parse_ffmpeg_duration(stderr_text: str) -> Optional[float]:
+    """从 ffmpeg 输出中解析已处理的音频时长，优先取最后一条进度信息"""
+    matches = _FFMPEG_TIME_PATTERN.findall(stderr_text) or _FFMPEG_DURATION_PATTERN.findall(stderr_text)
+    if not matches:
+        return None
+    hours, minutes, seconds = matches[-1]
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def speech_regions(silences: List[Tuple[float, float]], duration: float,
+                   padding: float = SILENCE_PADDING) -> List[Tuple[float, float]]:
+    """根据静音区间计算需要保留的语音区间，每段静音两侧各保留 padding 秒"""
+    regions = []
+    cursor = 0.0
+    for start, end in silences:
+        start = min(start + padding, duration) if start > 0 else 0.0
+        end = max(end - padding, 0.0) if end < duration else duration
+        if end <= start:
+            continue
+        if start > cursor:
+            regions.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < duration:
+        regions.append((cursor, duration))
+    return regions
+
+
+def map_trimmed_time(regions: List[Tuple[float, float]], t: float) -> float:
+    """将剪除静音后音频中的时间点映射回原音频的时间点"""
+    offset = 0.0
+    for start, end in regions:
+        length = end - start
+        if t < offset + length:
+            return start + (t - offset)
+        offset += length
+    return regions[-1][1] if regions else t
+
 
 class AudioService:
     """音频处理服务类"""
     
-    def __init__(self, whisper_api_key: str, whisper_api_url: str, 
-                 whisper_model: str, audio_language: str):
+    def __init__(self, http_client: 'HttpClientManager', whisper_api_key: str, whisper_api_url: str,
+                 whisper_model: str, audio_language: str, segment_seconds: int = 0,
+                 segment_overlap: int = 2, segment_parallelism: int = 3,
+                 stream_max_bytes: int = WHISPER_MAX_FILE_SIZE,
+                 encoding_profile: str = DEFAULT_ENCODING_PROFILE, trim_silence: bool = False,
+                 silence_threshold_db: float = -35.0, silence_min_duration: float = 1.0,
+                 speed_factor: float = 1.0):
+        self.http_client = http_client
         self.whisper_api_key = whisper_api_key
         self.whisper_api_url = whisper_api_url
         self.whisper_model = whisper_model
         self.audio_language = audio_language
+        self.segment_seconds = segment_seconds
+        self.segment_overlap = max(0, segment_overlap)
+        self.segment_parallelism = max(1, segment_parallelism)
+        self.stream_max_bytes = min(max(1, stream_max_bytes), WHISPER_MAX_FILE_SIZE)
+        if encoding_profile not in ENCODING_PROFILES:
+            logger.warning(f"未知的音频编码方案: {encoding_profile}，使用默认的 {DEFAULT_ENCODING_PROFILE}")
+            encoding_profile = DEFAULT_ENCODING_PROFILE
+        self.encoding_profile = encoding_profile
+        self.trim_silence = trim_silence
+        self.silence_threshold_db = silence_threshold_db
+        self.silence_min_duration = max(0.1, silence_min_duration)
+        self.speed_factor = min(max(speed_factor, MIN_SPEED_FACTOR), MAX_SPEED_FACTOR)
+
+        # 流式提取统计
+        self.stream_jobs = 0
+        self.stream_overflows = 0
+        self.stream_bytes = 0
+        self.stream_peak_buffer = 0
+
+        # 静音剪除统计
+        self.trim_jobs = 0
+        self.trim_seconds = 0.0
+        self.trim_bytes = 0
     
+    @property
+    def _profile(self) -> Dict[str, Any]:
+        return ENCODING_PROFILES[self.encoding_profile]
+
+    def _build_ffmpeg_command(self, video_url: str, duration: int) -> List[str]:
+        """构建提取音频的ffmpeg命令（不含输出目标），编码参数取自当前编码方案
+
+        video_url 为 pipe:0 时从标准输入读取，不添加HTTP相关参数。
+        """
+        cmd = ['ffmpeg']
+        if video_url != 'pipe:0':
+            # 添加更多参数以应对B站的防盗链
+            cmd.extend([
+                '-user_agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                '-referer', 'https://www.bilibili.com/',
+                '-reconnect', '1',  # 自动重连
+                '-reconnect_streamed', '1',  # 对流式连接重连
+                '-reconnect_delay_max', '5',  # 最大重连延迟5秒
+            ])
+        cmd.extend([
+            '-i', video_url,
+            '-vn',  # 不处理视频
+        ])
+        # 加速播放以缩短上传的音频时长
+        if self.speed_factor > MIN_SPEED_FACTOR:
+            cmd.extend(['-af', f'atempo={self.speed_factor:g}'])
+        cmd.extend(self._profile['args'])
+
+        # 如果设置了时长限制（作为输出选项按加速后的时长计算，加速时可覆盖更长的视频）
+        if duration > 0:
+            cmd.extend(['-t', str(duration)])
+        return cmd
+
+    def transcript_signature(self, duration: int) -> str:
+        """返回影响转写结果的参数标识，用作转写缓存的来源键"""
+        signature = f"audio:d={duration}:model={self.whisper_model}:lang={self.audio_language}:{self.encoding_profile}"
+        if self.speed_factor > MIN_SPEED_FACTOR:
+            signature += f":speed={self.speed_factor:g}"
+        if self.trim_silence:
+            signature += f":trim={self.silence_threshold_db}dB/{self.silence_min_duration}s"
+        return signature
+
     async def extract_audio_from_video(self, video_url: str, duration: int = 0) -> Optional[str]:
         """从视频URL提取音频 - 使用ffmpeg异步提取"""
         try:
             # 创建临时文件
             temp_dir = tempfile.gettempdir()
-            audio_path = os.path.join(temp_dir, f"bilibili_audio_{uuid.uuid4().hex}.mp3")
+            audio_path = os.path.join(temp_dir, f"bilibili_audio_{uuid.uuid4().hex}{self._profile['ext']}")
             
             logger.info("开始提取音频（使用ffmpeg异步处理）...")
             
             # 使用ffmpeg直接从URL提取音频，避免手动下载
             try:
-                # 构建ffmpeg命令 - 添加更多参数以应对B站的防盗链
-                cmd = [
-                    'ffmpeg',
-                    '-user_agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    '-referer', 'https://www.bilibili.com/',
-                    '-reconnect', '1',  # 自动重连
-                    '-reconnect_streamed', '1',  # 对流式连接重连
-                    '-reconnect_delay_max', '5',  # 最大重连延迟5秒
-                    '-i', video_url,
-                    '-vn',  # 不处理视频
-                    '-acodec', 'libmp3lame',  # 使用mp3编码
-                    '-ar', '16000',  # 采样率16kHz（降低文件大小）
-                    '-ac', '1',  # 单声道
-                    '-b:a', '64k',  # 码率64kbps
-                ]
-                
-                # 如果设置了时长限制
-                if duration > 0:
-                    cmd.extend(['-t', str(duration)])
-                
+                cmd = self._build_ffmpeg_command(video_url, duration)
                 cmd.extend(['-y', audio_path])  # 覆盖已存在的文件
-                
+
                 logger.info("执行ffmpeg命令（异步，带重连机制）")
                 
                 # 使用asyncio.create_subprocess_exec异步执行ffmpeg命令
@@ -113,6 +303,178 @@ class AudioService:
             logger.error(f"提取音频时发生未预期错误: {type(e).__name__}: {str(e)}")
             return None
 
+    @staticmethod
+    async def _feed_stdin(process: asyncio.subprocess.Process, chunks: AsyncGenerator[bytes, None]) -> None:
+        """把下载的音频数据写入ffmpeg标准输入，ffmpeg提前结束读取时停止下载"""
+        try:
+            async for chunk in chunks:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # 达到时长限制后ffmpeg会主动关闭输入
+            pass
+        finally:
+            await chunks.aclose()
+            if not process.stdin.is_closing():
+                process.stdin.close()
+
+    async def extract_audio_from_chunks(self, chunks: AsyncGenerator[bytes, None], duration: int = 0) -> Optional[str]:
+        """从下载的音频数据流提取音频到临时文件，数据经标准输入交给ffmpeg"""
+        audio_path = os.path.join(tempfile.gettempdir(), f"bilibili_audio_{uuid.uuid4().hex}{self._profile['ext']}")
+        cmd = self._build_ffmpeg_command('pipe:0', duration)
+        cmd.extend(['-y', audio_path])
+
+        logger.info("开始提取音频（分块下载后经标准输入交给ffmpeg）...")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            logger.error("未找到ffmpeg，请确保ffmpeg已安装并添加到系统PATH")
+            await chunks.aclose()
+            return None
+
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        feed_task = asyncio.ensure_future(self._feed_stdin(process, chunks))
+        failed = False
+        try:
+            await asyncio.wait_for(asyncio.gather(feed_task, process.wait()), timeout=300)
+        except asyncio.TimeoutError:
+            logger.error("ffmpeg执行超时（5分钟）")
+            failed = True
+        except Exception as e:
+            logger.error(f"下载音频数据失败: {type(e).__name__}: {str(e)}")
+            failed = True
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            feed_task.cancel()
+            await asyncio.gather(feed_task, return_exceptions=True)
+            stderr = await stderr_task
+
+        if not failed and process.returncode == 0 and os.path.exists(audio_path):
+            logger.info(f"音频提取成功: {audio_path}, 大小: {os.path.getsize(audio_path) / 1024 / 1024:.2f}MB")
+            return audio_path
+
+        if not failed:
+            stderr_lines = stderr.decode('utf-8', errors='ignore').splitlines()
+            logger.error(f"ffmpeg提取音频失败，返回码: {process.returncode}，错误信息: {' | '.join(stderr_lines[-5:])}")
+        if os.path.exists(audio_path):
+            try:
+                os.remove(audio_path)
+            except OSError as e:
+                logger.warning(f"清理临时文件失败: {type(e).__name__}: {str(e)}")
+        return None
+
+    async def extract_audio_to_memory(self, video_url: str, duration: int = 0,
+                                      chunks: Optional[AsyncGenerator[bytes, None]] = None) -> Optional[bytes]:
+        """从视频URL提取音频到内存，不写临时文件
+
+        ffmpeg 的编码输出经标准输出按块读入缓冲区，超过 stream_max_bytes 时终止 ffmpeg
+        并抛出 AudioBufferOverflow，由调用方改用临时文件方式。
+        提供 chunks 时忽略 video_url，改为把下载的数据经标准输入交给ffmpeg。
+        """
+        cmd = self._build_ffmpeg_command('pipe:0' if chunks is not None else video_url, duration)
+        cmd.extend(['-f', self._profile['format'], 'pipe:1'])
+
+        logger.info("开始流式提取音频（ffmpeg输出到内存）...")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if chunks is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            logger.error("未找到ffmpeg，请确保ffmpeg已安装并添加到系统PATH")
+            if chunks is not None:
+                await chunks.aclose()
+            return None
+
+        buffer = bytearray()
+
+        async def read_stdout() -> None:
+            while True:
+                chunk = await process.stdout.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    return
+                if len(buffer) + len(chunk) > self.stream_max_bytes:
+                    raise AudioBufferOverflow()
+                buffer.extend(chunk)
+
+        # 同时读取stderr，避免管道写满导致ffmpeg阻塞
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        feed_task = asyncio.ensure_future(self._feed_stdin(process, chunks)) if chunks is not None else None
+        try:
+            if feed_task is not None:
+                await asyncio.wait_for(asyncio.gather(read_stdout(), feed_task), timeout=300)
+            else:
+                await asyncio.wait_for(read_stdout(), timeout=300)  # 5分钟超时
+            await process.wait()
+        except AudioBufferOverflow:
+            self.stream_overflows += 1
+            logger.warning(f"流式提取的音频超过内存上限({self.stream_max_bytes / 1024 / 1024:.0f}MB)，已终止ffmpeg")
+            raise
+        except asyncio.TimeoutError:
+            logger.error("ffmpeg执行超时（5分钟）")
+            return None
+        except Exception as e:
+            if feed_task is None:
+                raise
+            logger.error(f"下载音频数据失败: {type(e).__name__}: {str(e)}")
+            return None
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            if feed_task is not None:
+                feed_task.cancel()
+                await asyncio.gather(feed_task, return_exceptions=True)
+            stderr = await stderr_task
+            self.stream_bytes += len(buffer)
+            self.stream_peak_buffer = max(self.stream_peak_buffer, len(buffer))
+
+        if process.returncode != 0 or not buffer:
+            stderr_text = stderr.decode('utf-8', errors='ignore') if stderr else ''
+            logger.error(f"ffmpeg流式提取音频失败，返回码: {process.returncode}")
+            if stderr_text:
+                logger.error(f"错误信息: {' | '.join(stderr_text.splitlines()[-5:])}")
+            return None
+
+        self.stream_jobs += 1
+        logger.info(f"音频流式提取成功，大小: {len(buffer) / 1024 / 1024:.2f}MB（未写入磁盘）")
+        return bytes(buffer)
+
+    async def transcribe_audio_bytes(self, audio_data: bytes, openai_api_key: str) -> Optional[str]:
+        """使用Whisper API识别内存中的音频（按当前编码方案）"""
+        api_key = self.whisper_api_key if self.whisper_api_key else openai_api_key
+        logger.info("开始语音识别（内存音频）...")
+        try:
+            if self.trim_silence:
+                # 整段识别不输出片段时间，不需要保留时间映射
+                audio_data, _ = await self._trim_silence(audio_data)
+            filename = f"audio{self._profile['ext']}"
+            return await self._request_transcription(audio_data, filename, len(audio_data), api_key)
+        except aiohttp.ClientError as e:
+            logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"语音识别时发生未预期错误: {type(e).__name__}: {str(e)}")
+            return None
+
+    def stream_stats(self) -> Dict[str, int]:
+        """返回流式提取的次数、传输字节数和缓冲区峰值"""
+        return {
+            'jobs': self.stream_jobs,
+            'overflows': self.stream_overflows,
+            'bytes': self.stream_bytes,
+            'peak_buffer': self.stream_peak_buffer,
+        }
+
     async def transcribe_audio(self, audio_path: str, openai_api_key: str) -> Optional[str]:
         """使用Whisper API将音频转换为文字"""
         try:
@@ -120,110 +482,30 @@ class AudioService:
                 logger.error(f"音频文件不存在: {audio_path}")
                 return None
             
-            # 检查文件大小（Whisper API限制25MB）
-            file_size = os.path.getsize(audio_path)
-            if file_size > 25 * 1024 * 1024:
-                logger.warning(f"音频文件过大({file_size / 1024 / 1024:.2f}MB)，尝试压缩...")
-                # 这里可以添加音频压缩逻辑
-            
-            logger.info("开始语音识别...")
-            
             # 使用独立的 Whisper API Key，如果未设置则回退到 OpenAI API Key
             api_key = self.whisper_api_key if self.whisper_api_key else openai_api_key
-            
-            # 准备multipart/form-data请求
-            async with aiohttp.ClientSession() as session:
-                # 使用 with 语句确保文件正确关闭
-                with open(audio_path, 'rb') as audio_file:
-                    data = aiohttp.FormData()
-                    
-                    # 根据实际音频后缀推断文件名和MIME类型（兼容m4a/webm/mp3等）
-                    filename = os.path.basename(audio_path) or 'audio.mp3'
-                    guessed_mime, _ = mimetypes.guess_type(filename)
-                    content_type = guessed_mime or 'application/octet-stream'
-                    
-                    # 添加文件字段 - 直接传递文件对象
-                    data.add_field('file',
-                                   audio_file,
-                                   filename=filename,
-                                   content_type=content_type)
-                    
-                    # 添加model字段 - 这是必需的
-                    data.add_field('model', self.whisper_model)
-                    
-                    # 添加其他可选字段
-                    if self.audio_language:
-                        data.add_field('language', self.audio_language)
-                    
-                    # 设置返回格式
-                    data.add_field('response_format', 'json')
-                    
-                    headers = {
-                        'Authorization': f'Bearer {api_key}'
-                    }
-                    
-                    request_url = self.whisper_api_url
-                    
-                    logger.info("发送语音识别请求")
-                    logger.info(f"API地址: {request_url}")
-                    logger.info(f"模型: {self.whisper_model}")
-                    logger.info(f"文件大小: {file_size / 1024 / 1024:.2f}MB")
-                    
-                    try:
-                        async with session.post(
-                            request_url,
-                            headers=headers,
-                            data=data,
-                            timeout=aiohttp.ClientTimeout(total=300)
-                        ) as response:
-                            response_text = await response.text()
-                            
-                            if response.status == 200:
-                                # 尝试解析JSON响应
-                                try:
-                                    response_json = json.loads(response_text)
-                                    text = ""
-                                    
-                                    # 标准OpenAI格式: {"text": "..."}
-                                    if 'text' in response_json:
-                                        text = response_json['text']
-                                    # 某些变体格式
-                                    elif 'data' in response_json and isinstance(response_json['data'], dict):
-                                        text = response_json['data'].get('text', '')
-                                    
-                                    if text:
-                                        logger.info(f"语音识别成功，文本长度: {len(text)}字符")
-                                        return text
-                                    else:
-                                        # 如果JSON中没有text字段，可能返回了其他格式，尝试直接返回
-                                        logger.warning(f"语音识别响应JSON中未找到text字段: {response_text[:100]}...")
-                                        return str(response_json)
-                                        
-                                except json.JSONDecodeError:
-                                    # 如果不是JSON，直接返回文本
-                                    logger.info(f"语音识别成功（非JSON格式），文本长度: {len(response_text)}字符")
-                                    return response_text
-                            else:
-                                # 记录详细错误信息
-                                logger.error("语音识别API请求失败")
-                                logger.error(f"状态码: {response.status}")
-                                logger.error(f"响应内容: {response_text}")
-                                
-                                # 尝试解析JSON错误信息
-                                try:
-                                    error_json = json.loads(response_text)
-                                    logger.error(f"错误详情: {json.dumps(error_json, ensure_ascii=False)}")
-                                except Exception:
-                                    pass
-                                
-                                return None
-                    except asyncio.TimeoutError:
-                        logger.error("语音识别请求超时")
-                        return None
-                    except Exception as e:
-                        logger.error(f"发送请求时出错: {str(e)}")
-                        return None
-                        
+
+            # 剪除静音，剪除后的文件替换原文件（原文件由剪除步骤清理）
+            regions = None
+            if self.trim_silence:
+                audio_path, regions = await self._trim_silence(audio_path)
+
+            # 检查文件大小（Whisper API限制25MB），超过时改为分段识别
+            file_size = os.path.getsize(audio_path)
+            segment_seconds = self.segment_seconds
+            if file_size > WHISPER_MAX_FILE_SIZE and segment_seconds <= 0:
+                logger.warning(f"音频文件过大({file_size / 1024 / 1024:.2f}MB)，超过Whisper的25MB限制，改为分段识别")
+                segment_seconds = DEFAULT_SEGMENT_SECONDS
+
+            logger.info("开始语音识别...")
+
+            if segment_seconds > 0:
+                duration = await self._probe_duration(audio_path)
+                if duration and duration > segment_seconds + self.segment_overlap:
+                    return await self._transcribe_segmented(audio_path, api_key, duration, segment_seconds, regions)
+
+            return await self._transcribe_file(audio_path, api_key)
+
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
             return None
@@ -245,4 +527,326 @@ class AudioService:
                 except OSError as e:
                     logger.warning(f"清理临时文件失败: {type(e).__name__}: {str(e)}")
                 except Exception as e:
-                    logger.error(f"清理临时文件时发生未预期错误: {type(e).__name__}: {str(e)}")
\ No newline at end of file
+                    logger.error(f"清理临时文件时发生未预期错误: {type(e).__name__}: {str(e)}")
+
+    async def _transcribe_file(self, audio_path: str, api_key: str) -> Optional[str]:
+        """上传单个音频文件进行识别，不负责清理文件"""
+        file_size = os.path.getsize(audio_path)
+        # 根据实际音频后缀推断文件名和MIME类型（兼容m4a/webm/mp3等）
+        filename = os.path.basename(audio_path) or 'audio.mp3'
+
+        # 使用 with 语句确保文件正确关闭
+        with open(audio_path, 'rb') as audio_file:
+            return await self._request_transcription(audio_file, filename, file_size, api_key)
+
+    async def _request_transcription(self, audio: Any, filename: str, file_size: int, api_key: str) -> Optional[str]:
+        """发送语音识别请求，audio 可以是文件对象或字节串"""
+        # 准备multipart/form-data请求
+        async with self.http_client.session() as session:
+            data = aiohttp.FormData()
+
+            guessed_mime, _ = mimetypes.guess_type(filename)
+            content_type = guessed_mime or 'application/octet-stream'
+
+            # 添加文件字段 - 直接传递文件对象或字节串
+            data.add_field('file',
+                           audio,
+                           filename=filename,
+                           content_type=content_type)
+            
+            # 添加model字段 - 这是必需的
+            data.add_field('model', self.whisper_model)
+            
+            # 添加其他可选字段
+            if self.audio_language:
+                data.add_field('language', self.audio_language)
+            
+            # 设置返回格式
+            data.add_field('response_format', 'json')
+            
+            headers = {
+                'Authorization': f'Bearer {api_key}'
+            }
+            
+            request_url = self.whisper_api_url
+            
+            logger.info("发送语音识别请求")
+            logger.info(f"API地址: {request_url}")
+            logger.info(f"模型: {self.whisper_model}")
+            logger.info(f"文件大小: {file_size / 1024 / 1024:.2f}MB")
+            
+            try:
+                async with session.post(
+                    request_url,
+                    headers=headers,
+                    data=data,
+                    timeout=aiohttp.ClientTimeout(total=300)
+                ) as response:
+                    response_text = await response.text()
+                    
+                    if response.status == 200:
+                        # 尝试解析JSON响应
+                        try:
+                            response_json = json.loads(response_text)
+                            text = ""
+                            
+                            # 标准OpenAI格式: {"text": "..."}
+                            if 'text' in response_json:
+                                text = response_json['text']
+                            # 某些变体格式
+                            elif 'data' in response_json and isinstance(response_json['data'], dict):
+                                text = response_json['data'].get('text', '')
+                            
+                            if text:
+                                logger.info(f"语音识别成功，文本长度: {len(text)}字符")
+                                return text
+                            else:
+                                # 如果JSON中没有text字段，可能返回了其他格式，尝试直接返回
+                                logger.warning(f"语音识别响应JSON中未找到text字段: {response_text[:100]}...")
+                                return str(response_json)
+                                
+                        except json.JSONDecodeError:
+                            # 如果不是JSON，直接返回文本
+                            logger.info(f"语音识别成功（非JSON格式），文本长度: {len(response_text)}字符")
+                            return response_text
+                    else:
+                        # 记录详细错误信息
+                        logger.error("语音识别API请求失败")
+                        logger.error(f"状态码: {response.status}")
+                        logger.error(f"响应内容: {response_text}")
+                        
+                        # 尝试解析JSON错误信息
+                        try:
+                            error_json = json.loads(response_text)
+                            logger.error(f"错误详情: {json.dumps(error_json, ensure_ascii=False)}")
+                        except Exception:
+                            pass
+                        
+                        return None
+            except asyncio.TimeoutError:
+                logger.error("语音识别请求超时")
+                return None
+            except Exception as e:
+                logger.error(f"发送请求时出错: {str(e)}")
+                return None
+
+    async def _run_ffmpeg(self, args: List[str], input_data: Optional[bytes] = None,
+                          timeout: float = 300) -> Tuple[int, bytes, bytes]:
+        """执行ffmpeg命令，input_data 不为空时通过标准输入传入，返回 (返回码, stdout, stderr)"""
+        process = await asyncio.create_subprocess_exec(
+            'ffmpeg', *args,
+            stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(input_data), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        return process.returncode, stdout, stderr
+
+    async def _trim_silence(self, source: Union[str, bytes]) -> Tuple[Union[str, bytes], List[Tuple[float, float]]]:
+        """用 silencedetect 检测静音并剪除
+
+        source 为文件路径或内存中的音频，返回同类型的剪除结果和保留的原音频区间；
+        没有可剪除的静音或处理失败时原样返回 source 和空列表。
+        识别结果是不带时间戳的纯文本，区间只用于在日志中标注分段对应的原视频时间。
+        """
+        is_file = isinstance(source, str)
+        input_arg = source if is_file else 'pipe:0'
+        input_data = None if is_file else source
+        original_size = os.path.getsize(source) if is_file else len(source)
+
+        try:
+            code, _, stderr = await self._run_ffmpeg(
+                ['-i', input_arg, '-af',
+                 f'silencedetect=noise={self.silence_threshold_db}dB:d={self.silence_min_duration}',
+                 '-f', 'null', '-'],
+                input_data, timeout=120
+            )
+            stderr_text = stderr.decode('utf-8', errors='ignore')
+            duration = parse_ffmpeg_duration(stderr_text)
+            silences = parse_silences(stderr_text)
+            if code != 0 or not duration or not silences:
+                return source, []
+
+            regions = speech_regions(silences, duration)
+            removed = duration - sum(end - start for start, end in regions)
+            if not regions or removed < self.silence_min_duration:
+                return source, []
+
+            select = '+'.join(f'between(t,{start:.3f},{end:.3f})' for start, end in regions)
+            args = ['-i', input_arg, '-af', f"aselect='{select}',asetpts=N/SR/TB"] + self._profile['args']
+            if is_file:
+                base, ext = os.path.splitext(source)
+                output = f"{base}_trimmed{ext}"
+                args += ['-y', output]
+            else:
+                args += ['-f', self._profile['format'], 'pipe:1']
+            code, stdout, stderr = await self._run_ffmpeg(args, input_data)
+            if code != 0 or (is_file and not os.path.exists(output)) or (not is_file and not stdout):
+                logger.warning(f"剪除静音失败，使用原音频: {stderr.decode('utf-8', errors='ignore')[-200:]}")
+                if is_file and os.path.exists(output):
+                    os.remove(output)
+                return source, []
+        except FileNotFoundError:
+            logger.warning("未找到ffmpeg，跳过静音剪除")
+            return source, []
+        except asyncio.TimeoutError:
+            logger.warning("静音检测超时，使用原音频")
+            return source, []
+
+        new_size = os.path.getsize(output) if is_file else len(stdout)
+        self.trim_jobs += 1
+        self.trim_seconds += removed
+        self.trim_bytes += max(0, original_size - new_size)
+        logger.info(
+            f"已剪除静音 {removed:.1f}s / {duration:.1f}s（{len(regions)} 段语音），"
+            f"音频 {original_size / 1024:.0f}KB -> {new_size / 1024:.0f}KB"
+        )
+        if not is_file:
+            return stdout, regions
+        try:
+            os.remove(source)
+        except OSError as e:
+            logger.warning(f"清理临时文件失败: {type(e).__name__}: {str(e)}")
+        return output, regions
+
+    def trim_stats(self) -> Dict[str, float]:
+        """返回静音剪除的次数、剪除秒数和减少的字节数"""
+        return {
+            'jobs': self.trim_jobs,
+            'seconds': self.trim_seconds,
+            'bytes': self.trim_bytes,
+        }
+
+    async def _probe_duration(self, audio_path: str) -> Optional[float]:
+        """使用ffprobe获取音频时长（秒），失败返回None"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'ffprobe', '-v', 'error',
+                '-show_entries', 'format=duration',
+                '-of', 'default=noprint_wrappers=1:nokey=1',
+                audio_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=30)
+            if process.returncode == 0:
+                return float(stdout.decode('utf-8', errors='ignore').strip())
+        except FileNotFoundError:
+            logger.warning("未找到ffprobe，无法获取音频时长")
+        except asyncio.TimeoutError:
+            logger.warning("ffprobe获取音频时长超时")
+        except ValueError as e:
+            logger.warning(f"解析音频时长失败: {str(e)}")
+        return None
+
+    async def _cut_segment(self, audio_path: str, segment_path: str, start: float, length: float) -> bool:
+        """从音频中截取一段（直接复制音频流，不重新编码）"""
+        process = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-v', 'error',
+            '-ss', f'{start:.3f}', '-t', f'{length:.3f}',
+            '-i', audio_path,
+            '-c', 'copy', '-y', segment_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=60)
+        except asyncio.TimeoutError:
+            logger.error("截取音频片段超时（60秒）")
+            process.kill()
+            await process.wait()
+            return False
+        if process.returncode != 0 or not os.path.exists(segment_path):
+            logger.error(f"截取音频片段失败: {stderr.decode('utf-8', errors='ignore')[-200:]}")
+            return False
+        return True
+
+    async def _transcribe_segmented(self, audio_path: str, api_key: str, duration: float, segment_seconds: int,
+                                    regions: Optional[List[Tuple[float, float]]] = None) -> Optional[str]:
+        """将音频切分为带重叠的片段并发识别，再按顺序拼接去重
+
+        regions 为剪除静音时保留的原音频区间，仅用于在日志中标注各片段对应的原视频时间，
+        识别结果本身是不带时间戳的纯文本。
+        失败的片段超过 MAX_FAILED_SEGMENT_RATIO 时返回None；少量失败时在对应位置插入缺失标记，
+        让总结时能看出转写不完整。
+        """
+        overlap = min(self.segment_overlap, segment_seconds // 4)
+        step = segment_seconds - overlap
+        starts = []
+        start = 0.0
+        while start < duration:
+            starts.append(start)
+            if start + segment_seconds >= duration:
+                break
+            start += step
+
+        logger.info(
+            f"音频时长{duration:.0f}s，分为{len(starts)}段识别"
+            f"（每段{segment_seconds}s，重叠{overlap}s，并发{self.segment_parallelism}）"
+        )
+        if regions:
+            # 加速后的时间需乘以倍率才是原视频时间
+            spans = ', '.join(
+                f"{map_trimmed_time(regions, seg_start) * self.speed_factor:.0f}-"
+                f"{map_trimmed_time(regions, min(seg_start + segment_seconds, duration)) * self.speed_factor:.0f}s"
+                for seg_start in starts
+            )
+            logger.info(f"各片段对应原视频时间: {spans}")
+        base, ext = os.path.splitext(audio_path)
+        semaphore = asyncio.Semaphore(self.segment_parallelism)
+
+        async def transcribe_segment(index: int, seg_start: float) -> Optional[str]:
+            segment_path = f"{base}_part{index:03d}{ext}"
+            async with semaphore:
+                try:
+                    if not await self._cut_segment(audio_path, segment_path, seg_start, segment_seconds):
+                        return None
+                    return await self._transcribe_file(segment_path, api_key)
+                finally:
+                    if os.path.exists(segment_path):
+                        try:
+                            os.remove(segment_path)
+                        except OSError as e:
+                            logger.warning(f"清理音频片段失败: {type(e).__name__}: {str(e)}")
+
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        results = await asyncio.gather(
+            *(transcribe_segment(i, seg_start) for i, seg_start in enumerate(starts)),
+            return_exceptions=True
+        )
+
+        # 连续成功的片段按重叠去重拼接，失败片段处插入缺失标记（标记两侧不是相邻音频，不做去重）
+        pieces = []
+        run = []
+        failed = 0
+        for index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                logger.error(f"第{index + 1}段识别异常: {type(result).__name__}: {str(result)}")
+            elif result:
+                run.append(result)
+                continue
+            failed += 1
+            if run:
+                pieces.append(stitch_transcripts(run))
+                run = []
+            pieces.append(f"[第{index + 1}段音频识别失败，约{segment_seconds}秒内容缺失]")
+        if run:
+            pieces.append(stitch_transcripts(run))
+
+        if failed > len(starts) * MAX_FAILED_SEGMENT_RATIO:
+            logger.error(f"分段识别有{failed}/{len(starts)}段失败，放弃本次转写")
+            return None
+        if failed:
+            logger.warning(f"分段识别有{failed}/{len(starts)}段失败，转写结果中已标注缺失位置")
+
+        text = '\n'.join(pieces)
+        logger.info(f"分段识别完成，耗时{loop.time() - begin:.2f}s，合并后文本长度: {len(text)}字符")
+        return text
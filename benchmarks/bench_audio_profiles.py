@@ -0,0 +1,47 @@
+"""
+音频编码方案基准测试
+用每个编码方案编码同一段语音样本，对比编码耗时、文件大小，以及本地替身识别器下的转写相似度
+
+用法：
+    python benchmarks/bench_audio_profiles.py [--sample speech.wav] [--model base] [--no-transcribe]
+
+样本默认取 benchmarks/samples/speech_sample.wav，不存在时尝试用 ffmpeg flite 合成。
+转写相似度以原始样本的识别结果为参照，需要安装 faster-whisper 或 openai-whisper。
+"""
+import argparse
+import os
+import tempfile
+
+from bench_utils import load_local_transcriber, prepare_sample, run_ffmpeg, similarity
+from audio_service import ENCODING_PROFILES
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='对比音频编码方案的体积、耗时和识别效果')
+    parser.add_argument('--sample', help='语音样本路径')
+    parser.add_argument('--model', default='base', help='本地识别模型大小')
+    parser.add_argument('--no-transcribe', action='store_true', help='只比较编码耗时和体积')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        sample = prepare_sample(args.sample, work_dir)
+        transcriber = None if args.no_transcribe else load_local_transcriber(args.model)
+        if transcriber is None and not args.no_transcribe:
+            print("未安装 faster-whisper / openai-whisper，跳过转写相似度")
+        reference = transcriber(sample) if transcriber else None
+
+        print(f"样本: {sample} ({os.path.getsize(sample) / 1024:.1f}KB)")
+        print(f"{'方案':<10} {'编码耗时':>10} {'大小':>10} {'相对mp3':>8} {'相似度':>8}")
+        baseline = None
+        for name, profile in ENCODING_PROFILES.items():
+            output = os.path.join(work_dir, f"{name}{profile['ext']}")
+            elapsed = run_ffmpeg(['-i', sample, '-vn'] + profile['args'] + ['-f', profile['format'], '-y', output])
+            size = os.path.getsize(output)
+            if baseline is None:
+                baseline = size
+            score = f"{similarity(reference, transcriber(output)):.3f}" if transcriber else '--'
+            print(f"{name:<10} {elapsed * 1000:>8.0f}ms {size / 1024:>8.1f}KB {size / baseline:>8.2f} {score:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+语音加速倍率基准测试
+用不同的 atempo 倍率编码同一段语音样本，对比上传时长、体积，以及本地替身识别器下的转写相似度
+
+用法：
+    python benchmarks/bench_audio_speed.py [--sample speech.wav] [--profile mp3-64k] [--model base] [--no-transcribe]
+
+转写相似度以原速样本的识别结果为参照，需要安装 faster-whisper 或 openai-whisper。
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import load_local_transcriber, prepare_sample, run_ffmpeg, similarity
+from audio_service import ENCODING_PROFILES, DEFAULT_ENCODING_PROFILE
+
+SPEED_FACTORS = (1.0, 1.25, 1.5, 1.75, 2.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='对比语音加速倍率对体积和识别效果的影响')
+    parser.add_argument('--sample', help='语音样本路径')
+    parser.add_argument('--profile', default=DEFAULT_ENCODING_PROFILE, choices=sorted(ENCODING_PROFILES))
+    parser.add_argument('--model', default='base', help='本地识别模型大小')
+    parser.add_argument('--no-transcribe', action='store_true', help='只比较编码耗时和体积')
+    args = parser.parse_args()
+    profile = ENCODING_PROFILES[args.profile]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        sample = prepare_sample(args.sample, work_dir)
+        transcriber = None if args.no_transcribe else load_local_transcriber(args.model)
+        if transcriber is None and not args.no_transcribe:
+            print("未安装 faster-whisper / openai-whisper，跳过转写相似度")
+
+        print(f"样本: {sample}，编码方案: {args.profile}")
+        print(f"{'倍率':<6} {'编码耗时':>10} {'大小':>10} {'相对原速':>8} {'识别耗时':>10} {'相似度':>8}")
+        reference = None
+        baseline = None
+        for factor in SPEED_FACTORS:
+            output = os.path.join(work_dir, f"speed_{factor:g}{profile['ext']}")
+            filters = ['-af', f'atempo={factor:g}'] if factor > 1.0 else []
+            elapsed = run_ffmpeg(['-i', sample, '-vn'] + filters + profile['args'] +
+                                 ['-f', profile['format'], '-y', output])
+            size = os.path.getsize(output)
+            if baseline is None:
+                baseline = size
+
+            transcribe_time = '--'
+            score = '--'
+            if transcriber:
+                begin = time.perf_counter()
+                text = transcriber(output)
+                transcribe_time = f"{(time.perf_counter() - begin) * 1000:.0f}ms"
+                if reference is None:
+                    reference = text
+                score = f"{similarity(reference, text):.3f}"
+            print(f"{factor:<6g} {elapsed * 1000:>8.0f}ms {size / 1024:>8.1f}KB {size / baseline:>8.2f} "
+                  f"{transcribe_time:>10} {score:>8}")
+
+
+if __name__ == '__main__':
+    main()
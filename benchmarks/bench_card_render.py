@@ -0,0 +1,75 @@
+"""
+本地卡片渲染基准测试
+用 Pillow 渲染器反复绘制一张典型的视频总结卡片，统计冷启动、预热和稳定状态下的渲染耗时
+
+用法：
+    python benchmarks/bench_card_render.py [--font NotoSansCJK-Regular.ttc] [--repeat 20] [--points 12]
+
+html_render 依赖 AstrBot 的文转图服务（通常是远程接口），无法离线测试；
+可在 AstrBot 日志中对比开启 pillow 前后“成功渲染视频总结卡片”的耗时。
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import bench_utils
+
+# card_renderer 使用相对导入，需要作为插件包的子模块加载
+PillowCardRenderer = bench_utils.import_plugin_module('card_renderer').PillowCardRenderer
+
+
+def sample_card(points: int) -> dict:
+    lines = ["## 视频概述", "本期视频介绍了如何在本地绘制**总结卡片**，避免远程渲染带来的网络往返。", "", "## 主要内容"]
+    for index in range(1, points + 1):
+        lines.append(f"{index}. 第{index}个要点：讲解了渲染流程中的一个环节，并给出了**具体的数据**和对比结论。")
+        lines.append("- 补充说明：这一环节的耗时主要来自文字排版和图片编码")
+    lines.extend(["", "总结：", "本地渲染的延迟稳定，不受文转图服务排队和网络状况影响。"])
+    summary = "\n".join(lines)
+    return {
+        'title': '【技术分享】在本地渲染视频总结卡片的实践与性能对比',
+        'owner': '某位UP主', 'duration': '12:34', 'views': '12.3万', 'likes': '4567',
+        'summary': summary, 'subtitle_length': 8421, 'summary_length': len(summary),
+        'comments': "讲得很清楚，收藏了\n请问字体是怎么选的？\n期待下一期",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='测量本地卡片渲染耗时')
+    parser.add_argument('--font', default='', help='中文字体路径，留空时自动查找系统字体')
+    parser.add_argument('--repeat', type=int, default=20, help='稳定状态下的渲染次数')
+    parser.add_argument('--points', type=int, default=12, help='总结中的要点数量')
+    args = parser.parse_args()
+
+    card = sample_card(args.points)
+    with tempfile.TemporaryDirectory() as work_dir:
+        renderer = PillowCardRenderer(work_dir, font_path=args.font)
+        if not renderer.available:
+            raise SystemExit("未安装 Pillow 或未找到中文字体，请通过 --font 指定字体文件")
+        print(f"字体: {renderer.font_path}，总结长度: {len(card['summary'])} 字")
+
+        begin = time.perf_counter()
+        renderer.render(card)
+        cold = time.perf_counter() - begin
+
+        renderer = PillowCardRenderer(work_dir, font_path=args.font)
+        warm_up = renderer.warm_up()
+        begin = time.perf_counter()
+        renderer.render(card)
+        first = time.perf_counter() - begin
+
+        timings = []
+        for _ in range(args.repeat):
+            begin = time.perf_counter()
+            renderer.render(card)
+            timings.append(time.perf_counter() - begin)
+        timings.sort()
+
+        print(f"冷启动首次渲染: {cold * 1000:.0f}ms")
+        print(f"预热耗时: {warm_up * 1000:.0f}ms，预热后首次渲染: {first * 1000:.0f}ms")
+        print(f"稳定状态（{args.repeat}次）: 中位数 {statistics.median(timings) * 1000:.0f}ms，"
+              f"P95 {timings[int(len(timings) * 0.95) - 1] * 1000:.0f}ms，最快 {timings[0] * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+卡片JSON遍历基准测试
+对比原先递归收集全部字符串再逐个扫描的方式与迭代有界遍历在各类卡片上的耗时
+
+用法：
+    python benchmarks/bench_json_walk.py [--repeat 200]
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Callable, List
+
+import bench_utils  # noqa: F401  将仓库目录加入 sys.path
+from link_scanner import extract_links_from_json, scan_links
+
+
+def legacy_strings(obj: Any) -> List[str]:
+    """原实现：递归收集全部字符串"""
+    strings = []
+    if isinstance(obj, dict):
+        for v in obj.values():
+            strings.extend(legacy_strings(v))
+    elif isinstance(obj, list):
+        for item in obj:
+            strings.extend(legacy_strings(item))
+    elif isinstance(obj, str):
+        strings.append(obj)
+    return strings
+
+
+def legacy_extract(obj: Any) -> List[str]:
+    links = []
+    for s in legacy_strings(obj):
+        links.extend(scan_links(s))
+    return links
+
+
+def bilibili_card() -> Any:
+    """典型的B站小程序分享卡片"""
+    return json.loads(json.dumps({
+        'app': 'com.tencent.miniapp_01', 'desc': '', 'view': 'view_8C8E89B49BE609866298ADDFF2DBABA4',
+        'ver': '1.0.0.19', 'prompt': '[QQ小程序]哔哩哔哩',
+        'meta': {'detail_1': {
+            'appid': '1109937557', 'title': '哔哩哔哩', 'desc': '一个视频标题',
+            'icon': 'https://miniapp.gtimg.cn/public/appicon/icon.png',
+            'preview': 'https://pubminishare-30161.picsz.qpic.cn/preview.jpg',
+            'url': 'm.q.qq.com/a/s/abcdef', 'scene': 1036,
+            'host': {'uin': 10001, 'nick': 'someone'},
+            'shareTemplateData': {}, 'qqdocurl': 'https://b23.tv/abc1234?share_medium=android',
+        }},
+        'config': {'type': 'normal', 'width': 0, 'height': 0, 'forward': 1, 'autoSize': 0, 'ctime': 1700000000},
+    }))
+
+
+def large_card(items: int) -> Any:
+    """链接位于末尾的大型卡片（例如带长列表的合集或公告卡片）"""
+    return {'meta': {'list': [{'title': f'条目{i}', 'desc': '一些无关的描述文字' * 4, 'tags': ['a', 'b', 'c']}
+                              for i in range(items)]},
+            'footer': {'jump': 'https://www.bilibili.com/video/BV1jv7YzJED2'}}
+
+
+def deep_card(depth: int) -> Any:
+    node: Any = {'url': 'https://www.bilibili.com/video/BV1jv7YzJED2'}
+    for _ in range(depth):
+        node = {'child': node, 'padding': '无关内容'}
+    return node
+
+
+def measure(extract: Callable[[Any], List[str]], payload: Any, repeat: int) -> str:
+    best = float('inf')
+    try:
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            extract(payload)
+            best = min(best, time.perf_counter() - begin)
+    except RecursionError:
+        return 'RecursionError'
+    return f"{best * 1e6:.1f}us"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='对比卡片JSON遍历方式的耗时')
+    parser.add_argument('--repeat', type=int, default=200, help='重复次数，取最快一次')
+    args = parser.parse_args()
+
+    cases = [
+        ('B站小程序卡片', bilibili_card()),
+        ('大型卡片(2000条)', large_card(2000)),
+        ('嵌套200层', deep_card(200)),
+        (f'嵌套{sys.getrecursionlimit()}层', deep_card(sys.getrecursionlimit())),
+    ]
+    print(f"{'卡片':<16} {'递归实现':>16} {'迭代遍历':>12} {'迭代遍历结果'}")
+    for name, payload in cases:
+        legacy = measure(legacy_extract, payload, args.repeat)
+        walker = measure(extract_links_from_json, payload, args.repeat)
+        print(f"{name:<16} {legacy:>16} {walker:>12} {extract_links_from_json(payload)}")
+    print("迭代遍历默认最多展开32层、访问5000个节点，超出上限的内容不会被扫描")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+链接扫描基准测试
+构造大型合成转发聊天记录，对比原先的五次独立 findall 与单次组合正则扫描的耗时和提取结果
+
+用法：
+    python benchmarks/bench_link_scan.py [--nodes 5000] [--link-ratio 0.05] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import re
+import time
+from typing import Callable, List
+
+import bench_utils  # noqa: F401  将仓库目录加入 sys.path
+from link_scanner import scan_links
+
+LEGACY_PATTERNS = [
+    r'https?://(?:www\.)?bilibili\.com/video/[^\s\'"<>]+',
+    r'https?://m\.bilibili\.com/video/[^\s\'"<>]+',
+    r'https?://b23\.tv/[^\s\'"<>]+',
+    r'BV[a-zA-Z0-9]{10}',
+    r'av\d+',
+]
+
+CHAT_LINES = [
+    '今天晚上吃什么', '哈哈哈哈哈哈', '这个up主更新好慢', '有没有人一起打游戏',
+    'java和python哪个好学', '周末去看电影吗', '收到，马上处理', '图片看不了，能再发一次吗',
+]
+
+
+def legacy_extract(text: str) -> List[str]:
+    links = []
+    for pattern in LEGACY_PATTERNS:
+        links.extend(re.findall(pattern, text, re.IGNORECASE))
+    return links
+
+
+def _random_bvid(rng: random.Random) -> str:
+    alphabet = 'FcwAPNKTMug3GV5Lj7EJnHpWsx4tb8haYeviqBz6rkCy12mUSDQX9RdoZf'
+    return 'BV1' + ''.join(rng.choice(alphabet) for _ in range(9))
+
+
+def build_forward_log(nodes: int, link_ratio: float, seed: int = 42) -> List[str]:
+    """生成转发聊天记录中的全部文本（普通消息、视频链接和小程序卡片JSON）"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(nodes):
+        roll = rng.random()
+        bvid = _random_bvid(rng)
+        if roll < link_ratio / 2:
+            texts.append(f"{rng.choice(CHAT_LINES)} https://www.bilibili.com/video/{bvid}?spm_id_from=333.1007&p=1")
+        elif roll < link_ratio * 0.8:
+            card = {'meta': {'detail_1': {
+                'title': '哔哩哔哩', 'desc': rng.choice(CHAT_LINES),
+                'qqdocurl': f"https://b23.tv/{bvid[3:]}?share_medium=android",
+                'preview': f"https://i0.hdslb.com/bfs/archive/{bvid}.jpg",
+            }}}
+            texts.append(json.dumps(card, ensure_ascii=False))
+        elif roll < link_ratio:
+            texts.append(f"av{rng.randint(1, 10 ** 9)} {rng.choice(CHAT_LINES)}")
+        else:
+            texts.append(' '.join(rng.choice(CHAT_LINES) for _ in range(rng.randint(1, 6))))
+    return texts
+
+
+def measure(extract: Callable[[str], List[str]], texts: List[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        for text in texts:
+            extract(text)
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='对比链接提取方式在大型转发记录上的耗时')
+    parser.add_argument('--nodes', type=int, default=5000, help='转发记录中的消息条数')
+    parser.add_argument('--link-ratio', type=float, default=0.05, help='含视频链接的消息比例')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快一次')
+    args = parser.parse_args()
+
+    texts = build_forward_log(args.nodes, args.link_ratio)
+    total_chars = sum(len(text) for text in texts)
+    legacy_links = [link for text in texts for link in legacy_extract(text)]
+    scanned_links = [link for text in texts for link in scan_links(text)]
+
+    legacy_time = measure(legacy_extract, texts, args.repeat)
+    scan_time = measure(scan_links, texts, args.repeat)
+    print(f"消息数: {len(texts)}，总字符数: {total_chars}")
+    print(f"{'方式':<10} {'耗时':>10} {'提取条数':>8}")
+    print(f"{'五次findall':<10} {legacy_time * 1000:>8.1f}ms {len(legacy_links):>8}")
+    print(f"{'单次扫描':<10} {scan_time * 1000:>8.1f}ms {len(scanned_links):>8}")
+    print(f"加速比: {legacy_time / scan_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+总结HTML渲染基准测试
+对比原先内联样式的逐行渲染与预编译的短类名渲染在生成的HTML体积和耗时上的差异
+
+用法：
+    python benchmarks/bench_summary_html.py [--points 12] [--repeat 2000]
+"""
+import argparse
+import time
+from typing import Callable
+
+import bench_utils  # noqa: F401  将仓库目录加入 sys.path
+from markdown_html import render_summary_html
+
+
+def legacy_format(summary: str) -> str:
+    """原实现：每次调用导入模块、逐行执行未编译的正则，并内联样式"""
+    import html
+    import re
+
+    # 先进行HTML转义
+    summary = html.escape(summary)
+
+    lines = summary.split('\n')
+    formatted_lines = []
+
+    # Markdown标题级别对应的样式
+    heading_styles = {
+        1: 'font-size: 40px; font-weight: bold; color: #ff6b6b; margin: 32px 0 16px 0; padding-bottom: 10px; border-bottom: 3px solid #e94560;',
+        2: 'font-size: 38px; font-weight: bold; color: #ff6b6b; margin: 28px 0 14px 0; padding-bottom: 8px; border-bottom: 2px solid rgba(233,69,96,0.4);',
+        3: 'font-size: 36px; font-weight: bold; color: #ff8a80; margin: 24px 0 12px 0;',
+        4: 'font-size: 34px; font-weight: bold; color: #ffab91; margin: 20px 0 10px 0;',
+    }
+
+    for line in lines:
+        line = line.strip()
+
+        if not line:
+            formatted_lines.append('<div style="height: 16px;"></div>')
+            continue
+
+        # 处理 **文本** 格式 - 高亮显示
+        line = re.sub(
+            r'\*\*([^*]+)\*\*',
+            r'<span style="background: linear-gradient(135deg, #e94560, #ff6b6b); color: white; padding: 4px 12px; border-radius: 8px; font-weight: bold;">\1</span>',
+            line
+        )
+
+        # 处理 Markdown 标题（#### > ### > ## > #）
+        heading_match = re.match(r'^(#{1,4})\s+(.+)', line)
+        if heading_match:
+            level = len(heading_match.group(1))
+            content = heading_match.group(2)
+            style = heading_styles.get(level, heading_styles[4])
+            line = f'<div style="{style}">{content}</div>'
+        # 处理数字序号开头的段落（如 1. 2. 3.）
+        elif re.match(r'^(\d+)\.\s*(.+)', line):
+            match = re.match(r'^(\d+)\.\s*(.+)', line)
+            num = match.group(1)
+            content = match.group(2)
+            line = f'''<div style="
+                display: flex;
+                align-items: flex-start;
+                margin: 20px 0;
+            ">
+                <span style="
+                    background: linear-gradient(135deg, #e94560, #ff6b6b);
+                    color: white;
+                    min-width: 44px;
+                    height: 44px;
+                    border-radius: 50%;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    font-weight: bold;
+                    font-size: 28px;
+                    margin-right: 18px;
+                    flex-shrink: 0;
+                    box-shadow: 0 3px 6px rgba(233,69,96,0.4);
+                ">{num}</span>
+                <span style="flex: 1; padding-top: 4px;">{content}</span>
+            </div>'''
+        # 处理破折号或横杠开头的列表项
+        elif re.match(r'^[-–—•]\s*(.+)', line):
+            match = re.match(r'^[-–—•]\s*(.+)', line)
+            content = match.group(1)
+            line = f'''<div style="
+                display: flex;
+                align-items: flex-start;
+                margin: 14px 0;
+                padding-left: 14px;
+            ">
+                <span style="
+                    color: #e94560;
+                    margin-right: 14px;
+                    font-size: 28px;
+                    line-height: 1.4;
+                ">▸</span>
+                <span style="flex: 1;">{content}</span>
+            </div>'''
+        # 处理冒号结尾的标题行
+        elif line.endswith('：') or line.endswith(':'):
+            line = f'''<div style="
+                font-weight: bold;
+                color: #ff6b6b;
+                font-size: 36px;
+                margin: 28px 0 14px 0;
+                padding-bottom: 8px;
+                border-bottom: 2px dashed rgba(233,69,96,0.3);
+            ">{line}</div>'''
+        else:
+            line = f'<div style="margin: 14px 0; text-indent: 0;">{line}</div>'
+
+        formatted_lines.append(line)
+
+    return ''.join(formatted_lines)
+
+
+def sample_summary(points: int) -> str:
+    lines = ["## 视频概述", "本期视频讲解了**缓存设计**中的常见问题，并给出了优化建议。", "", "## 主要内容"]
+    for index in range(1, points + 1):
+        lines.append(f"{index}. 第{index}个要点：分析了**命中率**下降的原因，并对比了不同的淘汰策略。")
+        lines.append("- 补充说明：容量设置过小时热点数据会被频繁换出")
+        lines.append("- 作者建议：先统计访问分布，再决定缓存容量")
+    lines.extend(["", "总结：", "合理的容量和过期时间比复杂的淘汰算法更重要。"])
+    return "\n".join(lines)
+
+
+def measure(render: Callable[[str], str], summary: str, repeat: int) -> float:
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        render(summary)
+    return (time.perf_counter() - begin) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='对比总结HTML的体积和渲染耗时')
+    parser.add_argument('--points', type=int, default=12, help='总结中的要点数量')
+    parser.add_argument('--repeat', type=int, default=2000, help='重复次数')
+    args = parser.parse_args()
+
+    summary = sample_summary(args.points)
+    legacy_html = legacy_format(summary).encode('utf-8')
+    new_html = render_summary_html(summary).encode('utf-8')
+    legacy_time = measure(legacy_format, summary, args.repeat)
+    new_time = measure(render_summary_html, summary, args.repeat)
+
+    print(f"总结长度: {len(summary)} 字，{len(summary.splitlines())} 行")
+    print(f"{'实现':<10} {'HTML大小':>10} {'单次耗时':>10}")
+    print(f"{'内联样式':<10} {len(legacy_html) / 1024:>8.1f}KB {legacy_time * 1e6:>8.1f}us")
+    print(f"{'类名样式':<10} {len(new_html) / 1024:>8.1f}KB {new_time * 1e6:>8.1f}us")
+    print(f"体积减少 {(1 - len(new_html) / len(legacy_html)) * 100:.0f}%，耗时为原来的 {new_time / legacy_time:.2f} 倍")
+    print("类名样式在模板中只定义一次（约2KB），不随总结长度增长")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+基准测试公共工具
+提供语音样本准备、本地替身识别器、文本相似度计算和插件模块导入，供各个基准脚本共用
+"""
+import difflib
+import importlib
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Callable, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+# 默认语音样本位置；不存在时尝试用 ffmpeg 的 flite 滤镜合成一段英文语音
+DEFAULT_SAMPLE = os.path.join(BENCH_DIR, 'samples', 'speech_sample.wav')
+SYNTHETIC_TEXT = (
+    'The quick brown fox jumps over the lazy dog. '
+    'This sample is used to compare audio encoding settings for speech recognition. '
+    'Smaller files upload faster, but the transcript should stay the same.'
+)
+
+
+def prepare_sample(path: Optional[str], work_dir: str) -> str:
+    """返回可用的语音样本路径，必要时合成一段样本"""
+    if path:
+        if not os.path.exists(path):
+            raise SystemExit(f"样本文件不存在: {path}")
+        return path
+    if os.path.exists(DEFAULT_SAMPLE):
+        return DEFAULT_SAMPLE
+
+    output = os.path.join(work_dir, 'synthetic_speech.wav')
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f"flite=text='{SYNTHETIC_TEXT}'",
+             '-ar', '16000', '-ac', '1', '-y', output],
+            capture_output=True
+        )
+    except FileNotFoundError:
+        raise SystemExit("未找到ffmpeg，请确保ffmpeg已安装并添加到系统PATH")
+    if result.returncode != 0:
+        raise SystemExit(
+            f"未找到 {DEFAULT_SAMPLE}，且当前 ffmpeg 不支持 flite 合成语音，请通过 --sample 指定一段语音文件"
+        )
+    return output
+
+
+def import_plugin_module(name: str):
+    """以插件包的子模块导入仓库中的模块，使模块内的相对导入（from .x import）可用"""
+    parent = os.path.dirname(REPO_DIR)
+    if parent not in sys.path:
+        sys.path.append(parent)
+    return importlib.import_module(f"{os.path.basename(REPO_DIR)}.{name}")
+
+
+def run_ffmpeg(args: List[str]) -> float:
+    """执行 ffmpeg 命令，返回耗时（秒）"""
+    begin = time.perf_counter()
+    result = subprocess.run(['ffmpeg', '-v', 'error'] + args, capture_output=True)
+    elapsed = time.perf_counter() - begin
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='ignore')[-300:])
+    return elapsed
+
+
+def load_local_transcriber(model_size: str = 'base') -> Optional[Callable[[str], str]]:
+    """加载本地替身识别器（faster-whisper 或 openai-whisper），都未安装时返回None"""
+    try:
+        from faster_whisper import WhisperModel
+        model = WhisperModel(model_size, device='cpu', compute_type='int8')
+
+        def transcribe(path: str) -> str:
+            segments, _ = model.transcribe(path)
+            return ''.join(segment.text for segment in segments)
+        return transcribe
+    except ImportError:
+        pass
+    try:
+        import whisper
+        model = whisper.load_model(model_size)
+        return lambda path: model.transcribe(path)['text']
+    except ImportError:
+        return None
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'[^\w]+', ' ', text.lower()).strip()
+
+
+def similarity(reference: str, text: str) -> float:
+    """按字符计算两段文本的相似度（0~1），忽略大小写和标点"""
+    return difflib.SequenceMatcher(None, _normalize(reference), _normalize(text), autojunk=False).ratio()
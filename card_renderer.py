@@ -0,0 +1,401 @@
+"""
+本地卡片渲染模块
+用 Pillow 按固定版式在本地绘制视频总结卡片，避免把 HTML 模板发送到文转图服务渲染的网络往返
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # 未安装 Pillow 时只能使用 html_render
+    Image = ImageDraw = ImageFont = None
+
+from .markdown_html import parse_summary_blocks, split_inline
+
+# 未配置字体时依次尝试的中文字体
+FONT_CANDIDATES = (
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/wqy-microhei/wqy-microhei.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+)
+
+# 版式参数，与 templates/video_summary.html 保持一致
+CARD_WIDTH = 1080
+CARD_PADDING = 40
+PANEL_PADDING = 36
+PANEL_GAP = 32
+LINE_SPACING = 1.6
+
+BACKGROUND_TOP = (26, 26, 46)
+BACKGROUND_BOTTOM = (15, 52, 96)
+ACCENT = (233, 69, 96)
+ACCENT_LIGHT = (255, 107, 107)
+COMMENT_ACCENT = (91, 134, 229)
+# 标题区域中的半透明白色标签叠加在强调色上的效果
+PILL_COLOR = (238, 116, 136)
+TEXT_COLOR = (240, 240, 240)
+COMMENT_COLOR = (208, 208, 208)
+CODE_COLOR = (255, 209, 128)
+QUOTE_COLOR = (200, 200, 210)
+# 每层列表嵌套的缩进
+LIST_INDENT = 40
+HEADING_STYLES = {
+    1: (40, (255, 107, 107)),
+    2: (38, (255, 107, 107)),
+    3: (36, (255, 138, 128)),
+    4: (34, (255, 171, 145)),
+}
+
+# 字体通常不含彩色表情，绘制前移除
+_EMOJI_PATTERN = re.compile('[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]')
+# 折行单位：连续的英文、数字和半角标点作为一个整体，其余字符单独成为一个单位
+_TOKEN_PATTERN = re.compile(r'[0-9A-Za-z@#%&+\-_.,!?;:\'"/()\[\]]+|.', re.DOTALL)
+
+# (文本, 样式)，样式为 ''、'b'（加粗）或 'code'
+Run = Tuple[str, str]
+
+
+def find_font(font_path: str = '') -> Optional[str]:
+    """返回可用的字体文件路径，配置的字体不存在时回退到系统中文字体，都没有时返回None"""
+    if font_path and os.path.exists(font_path):
+        return font_path
+    for candidate in FONT_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+class PillowCardRenderer:
+    """基于 Pillow 的视频总结卡片渲染器
+
+    先按固定版式计算每个元素的位置和卡片总高度，再一次性绘制并保存为 PNG。
+    生成的图片保存在 output_dir 中，只保留最近 keep_files 张。
+    """
+
+    def __init__(self, output_dir: str, font_path: str = '', width: int = CARD_WIDTH, keep_files: int = 32):
+        self.output_dir = output_dir
+        self.font_path = find_font(font_path)
+        self.width = width
+        self.keep_files = max(1, keep_files)
+        self._fonts: Dict[int, Any] = {}
+        self._char_widths: Dict[Tuple[int, str], float] = {}
+        self._files: Deque[str] = deque()
+        # 字体对象和字宽缓存由线程池中的各个线程共用，FreeType 字体不是线程安全的，
+        # 因此排版、绘制和文件轮换都在锁内串行执行，只有 PNG 编码并行
+        self._lock = threading.Lock()
+
+        # 统计数据
+        self.renders = 0
+        self.render_time = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Pillow 已安装且找到了可用字体"""
+        return Image is not None and self.font_path is not None
+
+    def _font(self, size: int) -> Any:
+        font = self._fonts.get(size)
+        if font is None:
+            font = ImageFont.truetype(self.font_path, size)
+            self._fonts[size] = font
+        return font
+
+    def _text_width(self, text: str, size: int) -> float:
+        """按字符累加宽度，字符宽度按字号缓存"""
+        font = None
+        width = 0.0
+        for char in text:
+            key = (size, char)
+            char_width = self._char_widths.get(key)
+            if char_width is None:
+                font = font or self._font(size)
+                char_width = font.getlength(char)
+                self._char_widths[key] = char_width
+            width += char_width
+        return width
+
+    def _wrap(self, runs: List[Run], size: int, max_width: float) -> List[List[Run]]:
+        """将片段按宽度折行：中文逐字折行，英文单词尽量不拆开"""
+        lines: List[List[Run]] = []
+        line: List[Run] = []
+        line_width = 0.0
+        for text, style in runs:
+            buffer = ''
+            for token in _TOKEN_PATTERN.findall(text):
+                token_width = self._text_width(token, size)
+                if line_width + token_width > max_width and (line or buffer):
+                    if buffer:
+                        line.append((buffer, style))
+                    lines.append(line)
+                    line, buffer, line_width = [], '', 0.0
+                    if token.isspace():
+                        continue
+                if token_width > max_width:
+                    # 超长单词只能逐字拆开
+                    for char in token:
+                        char_width = self._text_width(char, size)
+                        if line_width + char_width > max_width and buffer:
+                            line.append((buffer, style))
+                            lines.append(line)
+                            line, buffer, line_width = [], '', 0.0
+                        buffer += char
+                        line_width += char_width
+                    continue
+                buffer += token
+                line_width += token_width
+            if buffer:
+                line.append((buffer, style))
+        if line or not lines:
+            lines.append(line)
+        return lines
+
+    def _layout_text(self, ops: List[tuple], runs: List[Run], x: float, y: float, max_width: float,
+                     size: int, color: Tuple[int, int, int], bold: bool = False) -> float:
+        """排版一段文本，返回排版后的 y 坐标"""
+        line_height = int(size * LINE_SPACING)
+        for line in self._wrap(runs, size, max_width):
+            cursor = x
+            for text, style in line:
+                if style == 'code':
+                    fill = CODE_COLOR
+                else:
+                    fill = ACCENT_LIGHT if style == 'b' and not bold else color
+                ops.append(('text', (cursor, y + (line_height - size) / 2), text, size, fill, bold or style == 'b'))
+                cursor += self._text_width(text, size)
+            y += line_height
+        return y
+
+    def _layout_summary(self, ops: List[tuple], summary: str, x: float, y: float, max_width: float) -> float:
+        """按 markdown_html.parse_summary_blocks 的分类结果排版总结正文，支持的格式与 HTML 渲染一致"""
+        size = 32
+        for kind, text, level, number in parse_summary_blocks(summary):
+            if kind == 'gap':
+                y += 16
+            elif kind == 'heading':
+                heading_size, color = HEADING_STYLES[level]
+                y += 24
+                y = self._layout_text(ops, split_inline(text), x, y, max_width, heading_size, color, bold=True)
+                if level <= 2:
+                    ops.append(('rect', (x, y + 4, x + max_width, y + 4 + (4 - level)), ACCENT, 0))
+                    y += 12
+                y += 8
+            elif kind == 'ol':
+                y += 12
+                left = x + level * LIST_INDENT
+                diameter = 44
+                ops.append(('ellipse', (left, y + 6, left + diameter, y + 6 + diameter), ACCENT))
+                ops.append(('text', (left + (diameter - self._text_width(number, 28)) / 2,
+                                     y + 6 + (diameter - 28) / 2 - 2), number, 28, (255, 255, 255), True))
+                y = self._layout_text(ops, split_inline(text), left + diameter + 18, y,
+                                      max_width - (left - x) - diameter - 18, size, TEXT_COLOR)
+                y += 8
+            elif kind == 'ul':
+                y += 6
+                left = x + level * LIST_INDENT
+                marker_y = y + int(size * LINE_SPACING) / 2
+                ops.append(('polygon', [(left + 14, marker_y - 9), (left + 14, marker_y + 9),
+                                        (left + 28, marker_y)], ACCENT))
+                y = self._layout_text(ops, split_inline(text), left + 42, y,
+                                      max_width - (left - x) - 42, size, TEXT_COLOR)
+                y += 6
+            elif kind == 'quote':
+                y += 6
+                top = y
+                y = self._layout_text(ops, split_inline(text), x + 24, y, max_width - 24, size, QUOTE_COLOR)
+                ops.append(('rect', (x, top, x + 4, y), ACCENT_LIGHT, 0))
+                y += 6
+            elif kind == 'label':
+                y += 20
+                y = self._layout_text(ops, split_inline(text), x, y, max_width, 36, ACCENT_LIGHT, bold=True)
+                ops.append(('rect', (x, y + 4, x + max_width, y + 6), (120, 50, 80), 0))
+                y += 18
+            elif kind == 'code':
+                y += 10
+                top = y
+                y += 16
+                for code_line in text.split('\n'):
+                    y = self._layout_text(ops, [(code_line, 'code')], x + 24, y, max_width - 48, 28, CODE_COLOR)
+                y += 16
+                ops.insert(0, ('overlay', (x, top, x + max_width, y), (0, 0, 0, 64), 12))
+                y += 10
+            else:
+                y += 6
+                y = self._layout_text(ops, split_inline(text), x, y, max_width, size, TEXT_COLOR)
+                y += 6
+        return y
+
+    def _layout_pills(self, ops: List[tuple], labels: List[str], x: float, y: float, max_width: float,
+                      size: int, fill: tuple, color: tuple) -> float:
+        """排版一组圆角标签，超出宽度时换行"""
+        height = size + 20
+        cursor = x
+        for label in labels:
+            width = self._text_width(label, size) + 44
+            if cursor > x and cursor + width > x + max_width:
+                cursor = x
+                y += height + 16
+            ops.append(('rect', (cursor, y, cursor + width, y + height), fill, height // 2))
+            ops.append(('text', (cursor + 22, y + 8), label, size, color, False))
+            cursor += width + 16
+        return y + height
+
+    def _layout(self, card: Dict[str, Any]) -> Tuple[List[tuple], int]:
+        """计算所有绘制操作和卡片高度"""
+        ops: List[tuple] = []
+        left = CARD_PADDING
+        right = self.width - CARD_PADDING
+        inner_left = left + PANEL_PADDING
+        inner_width = right - left - 2 * PANEL_PADDING
+        y = CARD_PADDING
+
+        # 顶部标题区域
+        top = y
+        header_ops: List[tuple] = []
+        y = self._layout_text(header_ops, [(card['title'], '')], inner_left, y + PANEL_PADDING,
+                              inner_width, 42, (255, 255, 255), bold=True)
+        y = self._layout_pills(header_ops, [
+            f"UP主 {card['owner']}", f"时长 {card['duration']}",
+            f"播放 {card['views']}", f"点赞 {card['likes']}",
+        ], inner_left, y + 24, inner_width, 28, PILL_COLOR, (255, 255, 255))
+        y += PANEL_PADDING
+        ops.append(('rect', (left, top, right, y), ACCENT, 20))
+        ops.extend(header_ops)
+        y += PANEL_GAP
+
+        # 总结区域和热门评论区域
+        sections = [('内容总结', ACCENT, 'summary')]
+        if card.get('comments'):
+            sections.append(('热门评论', COMMENT_ACCENT, 'comments'))
+        for title, accent, key in sections:
+            top = y
+            body_ops: List[tuple] = []
+            y = self._layout_text(body_ops, [(title, '')], inner_left, y + PANEL_PADDING,
+                                  inner_width, 38, accent, bold=True)
+            body_ops.append(('rect', (inner_left, y + 8, inner_left + inner_width, y + 11), accent, 0))
+            y += 28
+            if key == 'summary':
+                y = self._layout_summary(body_ops, card['summary'], inner_left, y, inner_width)
+            else:
+                for comment in card['comments'].split('\n'):
+                    comment = comment.strip()
+                    if not comment:
+                        continue
+                    y += 14
+                    box_top = y
+                    y = self._layout_text(body_ops, [(comment, '')], inner_left + 26, y + 16,
+                                          inner_width - 48, 30, COMMENT_COLOR)
+                    y += 16
+                    body_ops.insert(0, ('overlay', (inner_left, box_top, inner_left + inner_width, y),
+                                        (91, 134, 229, 26), 12))
+                    body_ops.insert(1, ('rect', (inner_left, box_top, inner_left + 4, y), accent, 0))
+                    y += 14
+            y += PANEL_PADDING
+            ops.append(('overlay', (left, top, right, y), (255, 255, 255, 20), 20))
+            ops.extend(body_ops)
+            y += PANEL_GAP
+
+        # 底部统计区域
+        ops.append(('rect', (left, y, right, y + 2), (60, 70, 100), 0))
+        y += 20
+        footer = [f"字幕：{card['subtitle_length']} 字", f"总结：{card['summary_length']} 字"]
+        size = 28
+        height = size + 28
+        for index, label in enumerate(footer):
+            width = self._text_width(label, size) + 56
+            x = left + 8 if index == 0 else right - 8 - width
+            ops.append(('overlay', (x, y, x + width, y + height), (233, 69, 96, 51), height // 2))
+            ops.append(('text', (x + 28, y + 14), label, size, ACCENT_LIGHT, False))
+        y += height + 20 + CARD_PADDING
+        return ops, int(y)
+
+    def _draw(self, ops: List[tuple], height: int) -> Any:
+        """按排版结果绘制图片"""
+        gradient = Image.linear_gradient('L').resize((self.width, height))
+        image = Image.composite(
+            Image.new('RGB', (self.width, height), BACKGROUND_BOTTOM),
+            Image.new('RGB', (self.width, height), BACKGROUND_TOP),
+            gradient
+        ).convert('RGBA')
+
+        # 半透明面板画在同一个图层上，最后合成一次
+        overlay = Image.new('RGBA', image.size, (0, 0, 0, 0))
+        overlay_draw = ImageDraw.Draw(overlay)
+        for op in ops:
+            if op[0] == 'overlay':
+                overlay_draw.rounded_rectangle(op[1], radius=op[3], fill=op[2])
+        image.alpha_composite(overlay)
+
+        draw = ImageDraw.Draw(image)
+        for op in ops:
+            kind = op[0]
+            if kind == 'rect':
+                if op[3]:
+                    draw.rounded_rectangle(op[1], radius=op[3], fill=op[2])
+                else:
+                    draw.rectangle(op[1], fill=op[2])
+            elif kind == 'ellipse':
+                draw.ellipse(op[1], fill=op[2])
+            elif kind == 'polygon':
+                draw.polygon(op[1], fill=op[2])
+            elif kind == 'text':
+                _, xy, text, size, fill, bold = op
+                draw.text(xy, text, font=self._font(size), fill=fill,
+                          stroke_width=1 if bold else 0, stroke_fill=fill)
+        return image.convert('RGB')
+
+    def render(self, card: Dict[str, Any]) -> str:
+        """渲染卡片并保存为 PNG，返回文件路径
+
+        card 的字段与 templates/video_summary.html 的模板数据一致，summary 和 comments 为原始文本。
+        这是同步的 CPU 密集操作，应在线程池中调用。
+        """
+        if not self.available:
+            raise RuntimeError("Pillow 未安装或未找到可用的中文字体")
+        begin = time.perf_counter()
+        card = {key: _EMOJI_PATTERN.sub('', value) if isinstance(value, str) else value
+                for key, value in card.items()}
+        with self._lock:
+            ops, height = self._layout(card)
+            image = self._draw(ops, height)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"card_{uuid.uuid4().hex}.png")
+        image.save(path, format='PNG', compress_level=1)
+        with self._lock:
+            self._files.append(path)
+            while len(self._files) > self.keep_files:
+                old = self._files.popleft()
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+            self.renders += 1
+            self.render_time += time.perf_counter() - begin
+        return path
+
+    def warm_up(self) -> float:
+        """预加载字体和常用字符宽度并试渲染一张卡片，返回耗时（秒）"""
+        begin = time.perf_counter()
+        with self._lock:
+            for size in (28, 30, 32, 34, 36, 38, 40, 42):
+                self._text_width('0123456789：，。视频总结内容字幕评论', size)
+            ops, height = self._layout({
+                'title': '预热', 'owner': '-', 'duration': '00:00', 'views': '0', 'likes': '0',
+                'summary': '## 预热\n1. **预热**\n- 预热', 'comments': '预热',
+                'subtitle_length': 0, 'summary_length': 0,
+            })
+            self._draw(ops, height)
+        return time.perf_counter() - begin
@@ -0,0 +1,86 @@
+"""
+DASH 音频选择模块
+从 playurl 返回的 DASH 音轨中挑选体积最小的音轨，并在主地址和备用 CDN 之间选出响应最快的一个
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+import aiohttp
+from astrbot.api import logger
+
+
+# B站音轨ID对应的码率（kbps），接口未返回 bandwidth 时用于比较
+AUDIO_QUALITY_KBPS = {
+    30216: 64,
+    30232: 132,
+    30280: 192,
+}
+
+# 探测单个CDN地址的超时时间（秒）
+MIRROR_PROBE_TIMEOUT = 3.0
+
+
+def _bitrate(track: Dict[str, Any]) -> int:
+    bandwidth = track.get('bandwidth')
+    if bandwidth:
+        return int(bandwidth)
+    return AUDIO_QUALITY_KBPS.get(track.get('id'), 10 ** 6) * 1000
+
+
+def track_urls(track: Dict[str, Any]) -> List[str]:
+    """返回音轨的主地址和备用地址（去重，保持顺序）"""
+    urls = [track.get('baseUrl') or track.get('base_url')]
+    urls.extend(track.get('backupUrl') or track.get('backup_url') or [])
+    seen = set()
+    result = []
+    for url in urls:
+        if url and url not in seen:
+            seen.add(url)
+            result.append(url)
+    return result
+
+
+def select_dash_audio(dash: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """在普通 DASH 音轨中选择码率最低的一条（语音识别无需高码率），没有音轨时返回None
+
+    杜比全景声和 Hi-Res 无损音轨不参与选择。
+    """
+    tracks = [track for track in dash.get('audio') or [] if track_urls(track)]
+    if not tracks:
+        return None
+    return min(tracks, key=_bitrate)
+
+
+async def _probe(session: aiohttp.ClientSession, url: str, headers: Dict[str, str]) -> str:
+    """用只请求1个字节的 Range 请求探测地址是否可用"""
+    probe_headers = dict(headers, Range='bytes=0-0')
+    async with session.get(url, headers=probe_headers,
+                           timeout=aiohttp.ClientTimeout(total=MIRROR_PROBE_TIMEOUT)) as response:
+        if response.status not in (200, 206):
+            raise aiohttp.ClientResponseError(
+                response.request_info, response.history, status=response.status, message='probe failed'
+            )
+        return url
+
+
+async def race_mirrors(session: aiohttp.ClientSession, urls: List[str], headers: Dict[str, str]) -> Optional[str]:
+    """同时探测所有CDN地址，返回最先成功响应的地址；全部失败时返回None"""
+    if len(urls) <= 1:
+        return urls[0] if urls else None
+
+    begin = time.monotonic()
+    tasks = [asyncio.ensure_future(_probe(session, url, headers)) for url in urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                url = await next_done
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+            logger.info(f"CDN探测完成，选用第{urls.index(url) + 1}/{len(urls)}个地址，耗时{time.monotonic() - begin:.2f}s")
+            return url
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    logger.warning("所有CDN地址探测均失败")
+    return None
@@ -0,0 +1,162 @@
+"""
+DASH 分块下载模块
+用并发的 HTTP Range 请求下载 DASH 音频流，地址过期时刷新地址后从断点继续，按顺序产出数据交给 ffmpeg
+"""
+import asyncio
+import re
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple, TYPE_CHECKING
+import aiohttp
+from astrbot.api import logger
+
+if TYPE_CHECKING:
+    from .http_client import HttpClientManager
+
+
+# 单个 Range 请求的大小
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# 按码率估算字节上限时额外预留的比例和固定余量（初始化段、索引段、分片头）
+BYTE_LIMIT_MARGIN = 1.1
+BYTE_LIMIT_EXTRA = 512 * 1024
+
+_CONTENT_RANGE_PATTERN = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+
+class DownloadError(Exception):
+    """分块下载在刷新地址后仍然失败"""
+
+
+def estimate_audio_bytes(bandwidth: int, seconds: float) -> int:
+    """根据音轨码率（bit/s）估算播放 seconds 秒所需下载的字节数，无法估算时返回0（不限制）"""
+    if not bandwidth or seconds <= 0:
+        return 0
+    return int(bandwidth * seconds / 8 * BYTE_LIMIT_MARGIN) + BYTE_LIMIT_EXTRA
+
+
+class RangedDownloader:
+    """DASH 音频分块下载器
+
+    以 chunk_size 为单位最多同时发出 parallelism 个 Range 请求，按偏移顺序产出数据，
+    只下载到 max_bytes 为止。某个分块失败（地址过期、403 等）时调用 refresh_url 获取新地址，
+    只重新请求失败的分块，已下载的数据不会重复下载。
+    服务器忽略 Range 返回完整文件（200）时，直接使用这份完整数据，不再发出后续的分块请求；
+    Content-Range 中没有文件总大小时逐块顺序请求，直到某个分块不足 chunk_size 为止。
+    """
+
+    def __init__(self, http_client: 'HttpClientManager', headers: Dict[str, str],
+                 refresh_url: Callable[[], Awaitable[Optional[str]]],
+                 chunk_size: int = DOWNLOAD_CHUNK_SIZE, parallelism: int = 4, max_refreshes: int = 2):
+        self.http_client = http_client
+        self.headers = headers
+        self.refresh_url = refresh_url
+        self.chunk_size = max(64 * 1024, chunk_size)
+        self.parallelism = max(1, parallelism)
+        self.max_refreshes = max(0, max_refreshes)
+        self._url = ''
+        self._lock = asyncio.Lock()
+
+        # 统计数据
+        self.bytes_downloaded = 0
+        self.total_size = 0
+        self.refreshes = 0
+
+    async def _refresh(self, failed_url: str) -> bool:
+        """刷新下载地址，多个分块同时失败时只刷新一次"""
+        async with self._lock:
+            if self._url != failed_url:
+                return True
+            if self.refreshes >= self.max_refreshes:
+                return False
+            self.refreshes += 1
+            url = await self.refresh_url()
+            if not url:
+                return False
+            logger.info(f"下载地址已刷新（第{self.refreshes}次），从断点继续下载")
+            self._url = url
+            return True
+
+    async def _fetch(self, start: int, end: int) -> Tuple[bytes, int, bool]:
+        """下载 [start, end] 字节，返回数据、文件总大小和是否为完整文件（服务器不支持 Range）"""
+        while True:
+            url = self._url
+            headers = dict(self.headers, Range=f'bytes={start}-{end}')
+            try:
+                async with self.http_client.session() as session:
+                    async with session.get(url, headers=headers,
+                                           timeout=aiohttp.ClientTimeout(total=60)) as response:
+                        if response.status == 206:
+                            data = await response.read()
+                            match = _CONTENT_RANGE_PATTERN.search(response.headers.get('Content-Range', ''))
+                            total = int(match.group(1)) if match else 0
+                            self.bytes_downloaded += len(data)
+                            return data, total, False
+                        if response.status == 200:
+                            # 服务器不支持 Range，只能整体下载
+                            data = await response.read()
+                            self.bytes_downloaded += len(data)
+                            return data, len(data), True
+                        if response.status == 416:
+                            # 起始位置超出文件末尾：文件大小恰好是分块大小的整数倍
+                            return b'', 0, False
+                        error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {str(e)}"
+
+            logger.warning(f"下载分块 {start}-{end} 失败: {error}")
+            if not await self._refresh(url):
+                raise DownloadError(f"下载分块 {start}-{end} 失败: {error}")
+
+    async def iter_bytes(self, url: str, max_bytes: int = 0) -> AsyncIterator[bytes]:
+        """按顺序产出音频数据，max_bytes 大于0时只下载前 max_bytes 字节"""
+        self._url = url
+        first, total, full = await self._fetch(0, self.chunk_size - 1)
+        self.total_size = total
+        if not total and len(first) >= self.chunk_size:
+            async for data in self._iter_unknown_size(first, max_bytes):
+                yield data
+            return
+        limit = total or len(first)
+        if max_bytes > 0:
+            limit = min(limit, max_bytes)
+        yield first[:limit]
+        if full:
+            return
+
+        pending: Deque[Tuple[int, asyncio.Future]] = deque()
+        next_start = len(first)
+        try:
+            while next_start < limit or pending:
+                while next_start < limit and len(pending) < self.parallelism:
+                    end = min(next_start + self.chunk_size, limit) - 1
+                    pending.append((next_start, asyncio.ensure_future(self._fetch(next_start, end))))
+                    next_start = end + 1
+                start, task = pending.popleft()
+                data, _, full = await task
+                if full:
+                    # 刷新后的地址不支持 Range，完整文件中已包含剩余的全部数据
+                    yield data[start:limit]
+                    return
+                yield data
+        finally:
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
+    async def _iter_unknown_size(self, first: bytes, max_bytes: int) -> AsyncIterator[bytes]:
+        """文件总大小未知时顺序请求分块，分块不足 chunk_size 即视为文件结束"""
+        offset = 0
+        data = first
+        while True:
+            if max_bytes > 0 and offset + len(data) >= max_bytes:
+                yield data[:max_bytes - offset]
+                return
+            yield data
+            offset += len(data)
+            if len(data) < self.chunk_size:
+                self.total_size = offset
+                return
+            data, _, full = await self._fetch(offset, offset + self.chunk_size - 1)
+            if full:
+                self.total_size = len(data)
+                yield data[offset:max_bytes] if max_bytes > 0 else data[offset:]
+                return
@@ -0,0 +1,72 @@
+"""
+HTTP 客户端模块
+为插件内所有 Bilibili / LLM / Whisper 请求提供共享的连接池
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import aiohttp
+from astrbot.api import logger
+
+
+class HttpClientManager:
+    """插件级共享 HTTP 客户端
+
+    所有请求复用同一个 ClientSession：连接器按 host 维护 keep-alive 连接池并缓存 DNS 解析结果，
+    一次总结中对 api.bilibili.com 和 LLM 接口的多次请求可以复用已建立的 TCP/TLS 连接。
+    Session 在第一次使用时才创建，插件卸载时通过 close() 关闭。
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10,
+                 dns_cache_ttl: int = 300, keepalive_timeout: float = 30.0,
+                 total_timeout: float = 300.0, connect_timeout: float = 10.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.total_timeout = total_timeout
+        self.connect_timeout = connect_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取共享 Session，不存在或已关闭时创建"""
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+                timeout = aiohttp.ClientTimeout(
+                    total=self.total_timeout if self.total_timeout > 0 else None,
+                    sock_connect=self.connect_timeout if self.connect_timeout > 0 else None,
+                )
+                # 不保存响应中的 Cookie，保持每个请求只携带显式配置的 Cookie
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=timeout,
+                    cookie_jar=aiohttp.DummyCookieJar()
+                )
+                logger.info(
+                    f"已创建共享HTTP连接池: limit={self.limit}, limit_per_host={self.limit_per_host}, "
+                    f"dns_ttl={self.dns_cache_ttl}s"
+                )
+            return self._session
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """以上下文管理器形式借用共享 Session，退出时不关闭连接"""
+        yield await self.get_session()
+
+    async def close(self) -> None:
+        """关闭共享 Session 及其连接池"""
+        async with self._lock:
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+                logger.info("已关闭共享HTTP连接池")
+            self._session = None
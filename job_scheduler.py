@@ -0,0 +1,127 @@
+"""
+任务调度模块
+限制同时运行的总结任务数，并在群组/用户之间公平轮转排队任务
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Optional
+from astrbot.api import logger
+
+
+class SchedulerBusy(Exception):
+    """排队任务已达上限"""
+
+
+class JobScheduler:
+    """有界的总结任务调度器
+
+    最多同时运行 max_concurrent_jobs 个任务，其余任务按群组/用户分队列等待，
+    空出名额时在各队列之间轮流放行，避免单个群的大量链接占满处理能力。
+    排队总数达到 max_queue_depth 时新任务直接被拒绝。
+    另外为 ffmpeg、Whisper、LLM、渲染等资源分别提供并发上限。
+    """
+
+    def __init__(self, max_concurrent_jobs: int = 3, max_queue_depth: int = 10,
+                 resource_limits: Optional[Dict[str, int]] = None):
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self._queues: 'OrderedDict[Hashable, Deque[asyncio.Future]]' = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._resources: Dict[str, asyncio.Semaphore] = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in (resource_limits or {}).items() if limit > 0
+        }
+
+        # 统计数据
+        self.completed = 0
+        self.rejected = 0
+        self.waited_jobs = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def run(self, group: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """在调度器名额内执行 func，队列已满时抛出 SchedulerBusy"""
+        enqueued_at = time.monotonic()
+        if self._running < self.max_concurrent_jobs and not self._queues:
+            self._running += 1
+        else:
+            if self._queued >= self.max_queue_depth:
+                self.rejected += 1
+                raise SchedulerBusy()
+            future = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(group, deque()).append(future)
+            self._queued += 1
+            logger.info(f"总结任务排队中: group={group}, 排队数={self._queued}")
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 已获得名额但在恢复执行前被取消，归还名额
+                    self._release()
+                else:
+                    self._remove_waiter(group, future)
+                raise
+
+            wait = time.monotonic() - enqueued_at
+            self.waited_jobs += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            logger.info(f"总结任务开始执行: group={group}, 排队等待 {wait:.2f}s")
+
+        try:
+            return await func()
+        finally:
+            self.completed += 1
+            self._release()
+
+    def _remove_waiter(self, group: Hashable, future: asyncio.Future) -> None:
+        queue = self._queues.get(group)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self._queued -= 1
+        if not queue:
+            del self._queues[group]
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """按群组轮转放行排队任务"""
+        while self._running < self.max_concurrent_jobs and self._queues:
+            group, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(group)
+            else:
+                del self._queues[group]
+            if future.done():
+                continue
+            self._running += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def resource(self, name: str) -> AsyncIterator[None]:
+        """占用一个指定资源的并发名额，未配置上限的资源不受限制"""
+        semaphore = self._resources.get(name)
+        if semaphore is None:
+            yield
+            return
+        async with semaphore:
+            yield
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回运行中/排队任务数和排队等待统计"""
+        return {
+            'running': self._running,
+            'queued': self._queued,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'avg_wait': self.total_wait / self.waited_jobs if self.waited_jobs else 0.0,
+            'max_wait': self.max_wait,
+        }
@@ -0,0 +1,158 @@
+"""
+链接扫描模块
+用一个预编译的组合正则单次扫描文本，提取 Bilibili 视频链接并规范化、去重；
+分享卡片的JSON数据用有深度和节点数上限的迭代遍历提取链接
+"""
+import re
+from typing import Any, Iterator, List, Tuple
+
+# av号与BV号互转参数
+_XOR_CODE = 23442827791579
+_MAX_AID = 1 << 51
+_ALPHABET = "FcwAPNKTMug3GV5Lj7EJnHpWsx4tb8haYeviqBz6rkCy12mUSDQX9RdoZf"
+_ENCODE_MAP = (8, 7, 0, 5, 1, 3, 2, 4, 6)
+
+# 完整视频链接优先匹配，链接内部的BV号/av号不会再被单独匹配一次。
+# 开头的前瞻限定了各分支可能的首字符，正则引擎可以快速跳过其余位置
+_LINK_PATTERN = re.compile(
+    r'(?=[abhmwABHMW])(?:'
+    r'(?P<url>(?:https?://)?(?:www\.|m\.)?bilibili\.com/video/'
+    r'(?P<url_id>BV[0-9A-Za-z]{10}|av\d+)(?P<rest>[^\s\'"<>]*))'
+    r'|(?P<short>https?://b23\.tv/[0-9A-Za-z]+)'
+    r'|(?<![0-9A-Za-z])(?P<bv>BV[0-9A-Za-z]{10})(?![0-9A-Za-z])'
+    r'|(?<![0-9A-Za-z])(?P<av>av\d+)(?![0-9A-Za-z]))',
+    re.IGNORECASE
+)
+_PAGE_PATTERN = re.compile(r'[?&]p=(\d+)')
+# 预筛用的关键字，不含任何关键字的文本不可能提取到链接
+_HINT_PATTERN = re.compile(r'bilibili|b23\.tv|bv[0-9a-z]|av\d', re.IGNORECASE)
+
+# 卡片JSON默认遍历上限
+MAX_JSON_DEPTH = 32
+MAX_JSON_NODES = 5000
+
+# B站分享卡片中存放视频地址的已知字段，优先读取
+PRIORITY_PATHS: Tuple[Tuple[str, ...], ...] = (
+    ('meta', 'detail_1', 'qqdocurl'),
+    ('meta', 'news', 'jumpUrl'),
+    ('meta', 'detail_1', 'url'),
+)
+
+
+def av_to_bv(aid: int) -> str:
+    """在本地将av号换算为BV号"""
+    tmp = (_MAX_AID | aid) ^ _XOR_CODE
+    chars = [''] * 9
+    for index in _ENCODE_MAP:
+        chars[index] = _ALPHABET[tmp % 58]
+        tmp //= 58
+    return 'BV1' + ''.join(chars)
+
+
+def normalize_video_id(video_id: str) -> str:
+    """将av号换算为BV号，便于同一视频的不同写法去重；BV号原样返回"""
+    if video_id[:2].lower() == 'av' and video_id[2:].isdigit():
+        return av_to_bv(int(video_id[2:]))
+    return video_id
+
+
+def has_link_hint(text: str) -> bool:
+    """快速判断文本是否可能包含视频链接，用于在完整扫描和JSON解析之前过滤无关消息"""
+    return bool(text) and _HINT_PATTERN.search(text) is not None
+
+
+def _canonical_id(video_id: str) -> str:
+    if video_id[:2].lower() == 'av':
+        return video_id.lower()
+    return 'BV' + video_id[2:]
+
+
+def _iter_links(text: str) -> Iterator[Tuple[str, str]]:
+    """按出现顺序产出 (去重键, 规范化链接)"""
+    for match in _LINK_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == 'short':
+            link = match.group('short')
+            yield link, link
+            continue
+
+        if kind == 'url':
+            video_id = _canonical_id(match.group('url_id'))
+            page = _PAGE_PATTERN.search(match.group('rest'))
+            if page:
+                yield f"{normalize_video_id(video_id)}#p{page.group(1)}", \
+                    f"https://www.bilibili.com/video/{video_id}?p={page.group(1)}"
+                continue
+        else:
+            video_id = _canonical_id(match.group(kind))
+        yield normalize_video_id(video_id), video_id
+
+
+def scan_links(text: str) -> List[str]:
+    """提取文本中的视频链接，按出现顺序去重
+
+    BV号和av号返回规范写法；完整视频链接只保留视频ID和分P参数；b23.tv 短链接原样返回。
+    """
+    links = {}
+    for key, link in _iter_links(text):
+        links.setdefault(key, link)
+    return list(links.values())
+
+
+def dedupe_links(links: List[str]) -> List[str]:
+    """合并多段文本的扫描结果，同一视频（av号、BV号、完整链接）只保留第一次出现的写法"""
+    result = {}
+    for link in links:
+        key = next(_iter_links(link), (link,))[0]
+        result.setdefault(key, link)
+    return list(result.values())
+
+
+def _get_path(obj: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def iter_json_strings(obj: Any, max_depth: int = MAX_JSON_DEPTH,
+                      max_nodes: int = MAX_JSON_NODES) -> Iterator[str]:
+    """按文档顺序逐个产出JSON结构中的字符串值
+
+    超过 max_depth 层的容器不再展开，访问的节点数达到 max_nodes 后停止。
+    """
+    stack = [(obj, 0)]
+    visited = 0
+    while stack and visited < max_nodes:
+        node, depth = stack.pop()
+        visited += 1
+        if isinstance(node, str):
+            yield node
+        elif depth < max_depth:
+            if isinstance(node, dict):
+                children = node.values()
+            elif isinstance(node, list):
+                children = node
+            else:
+                continue
+            # 反向压栈，保证出栈顺序与原始顺序一致
+            stack.extend((child, depth + 1) for child in reversed(list(children)))
+
+
+def extract_links_from_json(obj: Any, max_depth: int = MAX_JSON_DEPTH,
+                            max_nodes: int = MAX_JSON_NODES) -> List[str]:
+    """从卡片JSON中提取视频链接，先读已知字段，再遍历全部字符串，找到链接的第一个字段即返回"""
+    for path in PRIORITY_PATHS:
+        value = _get_path(obj, path)
+        if isinstance(value, str) and has_link_hint(value):
+            links = scan_links(value)
+            if links:
+                return links
+
+    for value in iter_json_strings(obj, max_depth, max_nodes):
+        if has_link_hint(value):
+            links = scan_links(value)
+            if links:
+                return links
+    return []
@@ -0,0 +1,78 @@
+"""
+LLM 流式响应模块
+解析 OpenAI 兼容接口的 SSE 流，并按模型统计首字延迟和生成速度
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict
+import aiohttp
+
+
+class StreamStalled(Exception):
+    """两次数据块之间的间隔超过了允许的空闲时间"""
+
+
+async def iter_sse_events(response: aiohttp.ClientResponse, idle_timeout: float) -> AsyncIterator[Dict[str, Any]]:
+    """逐个产出 SSE 流中 data 行的 JSON 对象，遇到 [DONE] 结束
+
+    两行数据之间等待超过 idle_timeout 秒时抛出 StreamStalled。
+    """
+    while True:
+        try:
+            line = await asyncio.wait_for(response.content.readline(), timeout=idle_timeout)
+        except asyncio.TimeoutError:
+            raise StreamStalled(f"超过 {idle_timeout}s 未收到新数据")
+        if not line:
+            return
+        line = line.decode('utf-8', errors='ignore').strip()
+        if not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return
+        try:
+            yield json.loads(data)
+        except json.JSONDecodeError:
+            continue
+
+
+class LLMMetrics:
+    """按模型累计 LLM 调用耗时、首字延迟和生成速度"""
+
+    def __init__(self):
+        self._models: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, model: str) -> Dict[str, float]:
+        return self._models.setdefault(model, {
+            'requests': 0, 'failures': 0, 'total_time': 0.0,
+            'streams': 0, 'ttft_total': 0.0, 'tokens': 0, 'generate_time': 0.0,
+        })
+
+    def record(self, model: str, elapsed: float, success: bool) -> None:
+        """记录一次请求的总耗时"""
+        entry = self._entry(model)
+        entry['requests'] += 1
+        entry['total_time'] += elapsed
+        if not success:
+            entry['failures'] += 1
+
+    def record_stream(self, model: str, ttft: float, tokens: int, generate_time: float) -> None:
+        """记录一次流式请求的首字延迟、输出token数和生成耗时"""
+        entry = self._entry(model)
+        entry['streams'] += 1
+        entry['ttft_total'] += ttft
+        entry['tokens'] += tokens
+        entry['generate_time'] += generate_time
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """返回每个模型的平均耗时、平均首字延迟和平均生成速度"""
+        result = {}
+        for model, entry in self._models.items():
+            result[model] = {
+                'requests': entry['requests'],
+                'failures': entry['failures'],
+                'avg_time': entry['total_time'] / entry['requests'] if entry['requests'] else 0.0,
+                'avg_ttft': entry['ttft_total'] / entry['streams'] if entry['streams'] else None,
+                'tokens_per_sec': entry['tokens'] / entry['generate_time'] if entry['generate_time'] > 0 else None,
+            }
+        return result
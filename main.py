@@ -5,8 +5,9 @@ import os
 import tempfile
 import hashlib
 import time
+from contextlib import aclosing
 from functools import reduce
-from typing import Optional, Dict, Any, List, AsyncGenerator
+from typing import Optional, Dict, Any, List, Tuple, AsyncGenerator
 from urllib.parse import urlparse, parse_qs, urlencode
 import aiohttp
 from astrbot.api.event import filter, AstrMessageEvent
@@ -14,11 +15,29 @@ from astrbot.api.star import Context, Star, register
 from astrbot.api import logger, AstrBotConfig
 import astrbot.api.message_components as Comp
 from astrbot.api.event import MessageChain
-from .audio_service import AudioService
+from .audio_service import AudioService, AudioBufferOverflow
+from .http_client import HttpClientManager
+from .summary_cache import SummaryCache
+from .transcript_cache import TranscriptCache, SUBTITLE_SOURCE
+from .dash_audio import select_dash_audio, track_urls, race_mirrors
+from .dash_downloader import RangedDownloader, estimate_audio_bytes
+from .ttl_cache import TTLCache, url_deadline_ttl
+from .card_renderer import PillowCardRenderer
+from .markdown_html import render_summary_html, render_comments_html
+from .link_scanner import scan_links, dedupe_links, normalize_video_id, has_link_hint, extract_links_from_json
+from .single_flight import SingleFlight
+from .stage_executor import StageGraph, StageError
+from .rate_limiter import AdaptiveRateLimiter
+from .job_scheduler import JobScheduler, SchedulerBusy
+from .llm_stream import iter_sse_events, StreamStalled, LLMMetrics
+from .text_chunker import split_text_chunks
+from .prompt_budget import PromptBudget, estimate_tokens, prompt_budget_for_model
+
+PLUGIN_NAME = "astrbot_plugin_bilibili_summary"
 
 
 @register(
-    "astrbot_plugin_bilibili_summary",
+    PLUGIN_NAME,
     "蛇叔",
     "自动检测消息中的 B站视频链接，获取字幕和热门评论并使用 LLM 生成内容总结。",
     "1.4.0",
@@ -36,10 +55,22 @@ class BilibiliSummaryPlugin(Star):
         self.bilibili_cookie_text: str = self.config.get("bilibili_cookie", "")
         self.bilibili_cookie_str: str = self._parse_netscape_cookies(self.bilibili_cookie_text)
         self.request_interval: float = self.config.get("request_interval", 2.0)
+        self.rate_limit_burst: int = self.config.get("rate_limit_burst", 3)
         self.max_subtitle_length: int = self.config.get("max_subtitle_length", 8000)
+        self.enable_chunked_summary: bool = self.config.get("enable_chunked_summary", False)
+        self.summary_chunk_size: int = self.config.get("summary_chunk_size", 6000)
+        self.summary_chunk_overlap: int = self.config.get("summary_chunk_overlap", 200)
+        self.summary_chunk_parallelism: int = self.config.get("summary_chunk_parallelism", 3)
+        self.prompt_token_budget: int = self.config.get("prompt_token_budget", 0)
+        self._unknown_context_models: set = set()
         self.summary_prompt: str = self.config.get("summary_prompt",
             "请根据以下视频字幕和简介，生成一个详细完整的视频内容总结。总结应该包含视频的主要内容、关键信息和要点，尽可能详细。请用中文回答。")
 
+        # LLM流式输出配置
+        self.enable_llm_stream: bool = self.config.get("enable_llm_stream", False)
+        self.llm_stream_idle_timeout: float = self.config.get("llm_stream_idle_timeout", 30.0)
+        self.llm_max_output_chars: int = self.config.get("llm_max_output_chars", 20000)
+
         # 音频转文字配置
         self.enable_audio_transcription: bool = self.config.get("enable_audio_transcription", True)
         self.audio_extract_duration: int = self.config.get("audio_extract_duration", 300)
@@ -47,6 +78,59 @@ class BilibiliSummaryPlugin(Star):
         self.whisper_api_url: str = self.config.get("whisper_api_url", "https://api.openai.com/v1/audio/transcriptions")
         self.whisper_model: str = self.config.get("whisper_model", "whisper-1")
         self.audio_language: str = self.config.get("audio_language", "zh")
+        self.whisper_segment_seconds: int = self.config.get("whisper_segment_seconds", 0)
+        self.whisper_segment_overlap: int = self.config.get("whisper_segment_overlap", 2)
+        self.whisper_segment_parallelism: int = self.config.get("whisper_segment_parallelism", 3)
+        self.audio_stream_mode: bool = self.config.get("audio_stream_mode", False)
+        self.audio_stream_max_mb: int = self.config.get("audio_stream_max_mb", 25)
+        self.audio_encoding_profile: str = self.config.get("audio_encoding_profile", "mp3-64k")
+        self.enable_silence_trim: bool = self.config.get("enable_silence_trim", False)
+        self.silence_threshold_db: float = self.config.get("silence_threshold_db", -35.0)
+        self.silence_min_duration: float = self.config.get("silence_min_duration", 1.0)
+        self.audio_speed_factor: float = self.config.get("audio_speed_factor", 1.0)
+        self.audio_native_download: bool = self.config.get("audio_native_download", False)
+        self.audio_download_parallelism: int = self.config.get("audio_download_parallelism", 4)
+
+        # 连接池配置
+        self.http_pool_limit: int = self.config.get("http_pool_limit", 100)
+        self.http_pool_limit_per_host: int = self.config.get("http_pool_limit_per_host", 10)
+        self.http_dns_cache_ttl: int = self.config.get("http_dns_cache_ttl", 300)
+        self.http_keepalive_timeout: float = self.config.get("http_keepalive_timeout", 30.0)
+        self.http_timeout: float = self.config.get("http_timeout", 300.0)
+        self.http_connect_timeout: float = self.config.get("http_connect_timeout", 10.0)
+
+        # 总结缓存配置
+        self.enable_summary_cache: bool = self.config.get("enable_summary_cache", True)
+        self.summary_cache_ttl: int = self.config.get("summary_cache_ttl", 604800)
+        self.summary_cache_max_entries: int = self.config.get("summary_cache_max_entries", 1000)
+        self.summary_cache_max_size_mb: int = self.config.get("summary_cache_max_size_mb", 64)
+        self.enable_transcript_cache: bool = self.config.get("enable_transcript_cache", True)
+        self.transcript_cache_max_size_mb: int = self.config.get("transcript_cache_max_size_mb", 128)
+
+        # 多链接配置：first 只处理第一个链接，separate 逐个输出，combined 合并为一张卡片
+        self.multi_link_mode: str = self.config.get("multi_link_mode", "first")
+        self.max_links_per_message: int = self.config.get("max_links_per_message", 5)
+
+        # 多P视频配置
+        self.summarize_all_parts: bool = self.config.get("summarize_all_parts", False)
+        self.max_parts: int = self.config.get("max_parts", 10)
+        self.part_parallelism: int = self.config.get("part_parallelism", 2)
+
+        # 接口响应缓存配置
+        self.view_cache_ttl: int = self.config.get("view_cache_ttl", 600)
+        self.view_refresh_interval: int = self.config.get("view_refresh_interval", 60)
+
+        # 任务调度配置
+        self.max_concurrent_jobs: int = self.config.get("max_concurrent_jobs", 3)
+        self.max_queue_depth: int = self.config.get("max_queue_depth", 10)
+        self.max_concurrent_ffmpeg: int = self.config.get("max_concurrent_ffmpeg", 2)
+        self.max_concurrent_whisper: int = self.config.get("max_concurrent_whisper", 2)
+        self.max_concurrent_llm: int = self.config.get("max_concurrent_llm", 3)
+        self.max_concurrent_render: int = self.config.get("max_concurrent_render", 2)
+
+        # 卡片渲染后端：html 使用 AstrBot 文转图服务，pillow 在本地绘制
+        self.card_renderer: str = self.config.get("card_renderer", "html")
+        self.card_font_path: str = self.config.get("card_font_path", "")
         
         # 验证配置
         if not self.openai_api_key:
@@ -54,12 +138,32 @@ class BilibiliSummaryPlugin(Star):
         if not self.bilibili_cookie_str:
             logger.warning("Bilibili Summary插件: 未配置Bilibili Cookie，可能无法获取字幕")
             
+        # 共享HTTP连接池（首次请求时创建）
+        self.http_client = HttpClientManager(
+            limit=self.http_pool_limit,
+            limit_per_host=self.http_pool_limit_per_host,
+            dns_cache_ttl=self.http_dns_cache_ttl,
+            keepalive_timeout=self.http_keepalive_timeout,
+            total_timeout=self.http_timeout,
+            connect_timeout=self.http_connect_timeout
+        )
+
         # 初始化音频服务
         self.audio_service = AudioService(
+            http_client=self.http_client,
             whisper_api_key=self.whisper_api_key,
             whisper_api_url=self.whisper_api_url,
             whisper_model=self.whisper_model,
-            audio_language=self.audio_language
+            audio_language=self.audio_language,
+            segment_seconds=self.whisper_segment_seconds,
+            segment_overlap=self.whisper_segment_overlap,
+            segment_parallelism=self.whisper_segment_parallelism,
+            stream_max_bytes=self.audio_stream_max_mb * 1024 * 1024,
+            encoding_profile=self.audio_encoding_profile,
+            trim_silence=self.enable_silence_trim,
+            silence_threshold_db=self.silence_threshold_db,
+            silence_min_duration=self.silence_min_duration,
+            speed_factor=self.audio_speed_factor
         )
 
         logger.info("视频总结插件: 初始化完成，支持Bilibili视频总结")
@@ -79,6 +183,46 @@ class BilibiliSummaryPlugin(Star):
         self._wbi_keys_cache_ttl = 3600  # 缓存1小时
         self._wbi_keys_lock = asyncio.Lock()
 
+        # 插件数据目录和总结缓存（首次使用时创建）
+        self._data_dir: Optional[str] = None
+        self._summary_cache: Optional[SummaryCache] = None
+        self._card_renderer: Optional[PillowCardRenderer] = None
+        self._transcript_cache: Optional[TranscriptCache] = None
+
+        # B站接口限流：每个接口族平均每 request_interval 秒一次请求
+        self.rate_limiter = AdaptiveRateLimiter(
+            base_rate=1 / self.request_interval if self.request_interval > 0 else 0,
+            burst=self.rate_limit_burst
+        )
+
+        # view 接口响应缓存（播放量等统计在后台刷新）和 playurl 下载地址缓存（在 deadline 前有效）
+        self._view_cache = TTLCache(max_entries=256)
+        self._playurl_cache = TTLCache(max_entries=256)
+        self._view_refreshing: set = set()
+        self._background_tasks: set = set()
+
+        # 消息预筛统计：收到的消息数和通过预筛、进行完整解析的消息数
+        self._messages_seen = 0
+        self._messages_parsed = 0
+
+        # 合并同一视频的并发请求
+        self._single_flight = SingleFlight()
+
+        # LLM调用统计
+        self.llm_metrics = LLMMetrics()
+
+        # 总结任务调度：全局并发上限、按群轮转排队、各类资源并发上限
+        self.scheduler = JobScheduler(
+            max_concurrent_jobs=self.max_concurrent_jobs,
+            max_queue_depth=self.max_queue_depth,
+            resource_limits={
+                'ffmpeg': self.max_concurrent_ffmpeg,
+                'whisper': self.max_concurrent_whisper,
+                'llm': self.max_concurrent_llm,
+                'render': self.max_concurrent_render,
+            }
+        )
+
     @staticmethod
     def _parse_netscape_cookies(cookie_text: str) -> str:
         """解析 Netscape 格式的 Cookie 文本，提取 bilibili.com 域名的 cookie
@@ -147,10 +291,12 @@ class BilibiliSummaryPlugin(Star):
                 headers['Cookie'] = self.bilibili_cookie_str
 
             try:
-                async with aiohttp.ClientSession() as session:
+                async with self.http_client.session() as session:
+                    await self.rate_limiter.acquire('nav')
                     async with session.get('https://api.bilibili.com/x/web-interface/nav', headers=headers) as response:
                         if response.status == 200:
                             data = await response.json()
+                            self.rate_limiter.report('nav', response.status, data.get('code'))
                             # wbi_img 在未登录(code=-101)时也会返回，始终尝试提取
                             wbi_img = data.get('data', {}).get('wbi_img', {})
                             img_url = wbi_img.get('img_url', '')
@@ -168,6 +314,7 @@ class BilibiliSummaryPlugin(Star):
                             else:
                                 logger.warning(f"获取wbi keys失败: 响应中缺少wbi_img数据")
                         else:
+                            self.rate_limiter.report('nav', response.status)
                             logger.warning(f"获取wbi keys HTTP失败: {response.status}")
             except Exception as e:
                 logger.error(f"获取wbi keys异常: {type(e).__name__}: {str(e)}")
@@ -209,138 +356,106 @@ class BilibiliSummaryPlugin(Star):
             logger.info("配置保存成功")
         except Exception as e:
             logger.error(f"保存配置失败: {type(e).__name__}: {str(e)}")
-    
-    def _format_summary_html(self, summary: str) -> str:
-        """将总结文本格式化为带样式的HTML
-
-        识别并高亮：
-        - Markdown标题（# ## ### ####）
-        - 数字序号开头的段落（如 1. 2. 3.）
-        - 星号包围的重点内容（如 **重点**）
-        - 破折号或横杠开头的列表项
-        - 冒号结尾的标题行
-        """
-        import html
-        import re
-
-        # 先进行HTML转义
-        summary = html.escape(summary)
-
-        lines = summary.split('\n')
-        formatted_lines = []
 
-        # Markdown标题级别对应的样式
-        heading_styles = {
-            1: 'font-size: 40px; font-weight: bold; color: #ff6b6b; margin: 32px 0 16px 0; padding-bottom: 10px; border-bottom: 3px solid #e94560;',
-            2: 'font-size: 38px; font-weight: bold; color: #ff6b6b; margin: 28px 0 14px 0; padding-bottom: 8px; border-bottom: 2px solid rgba(233,69,96,0.4);',
-            3: 'font-size: 36px; font-weight: bold; color: #ff8a80; margin: 24px 0 12px 0;',
-            4: 'font-size: 34px; font-weight: bold; color: #ffab91; margin: 20px 0 10px 0;',
-        }
-
-        for line in lines:
-            line = line.strip()
+    def _get_data_dir(self) -> str:
+        """获取插件数据目录，优先使用 AstrBot 的 plugin_data 目录"""
+        if self._data_dir is None:
+            try:
+                from astrbot.api.star import StarTools
+                self._data_dir = str(StarTools.get_data_dir(PLUGIN_NAME))
+            except Exception as e:
+                logger.warning(f"获取插件数据目录失败，使用临时目录: {type(e).__name__}: {str(e)}")
+                self._data_dir = os.path.join(tempfile.gettempdir(), PLUGIN_NAME)
+                os.makedirs(self._data_dir, exist_ok=True)
+        return self._data_dir
+
+    def _get_summary_cache(self) -> Optional[SummaryCache]:
+        """获取总结缓存实例，未启用时返回None"""
+        if not self.enable_summary_cache:
+            return None
+        if self._summary_cache is None:
+            self._summary_cache = SummaryCache(
+                db_path=os.path.join(self._get_data_dir(), 'summary_cache.db'),
+                ttl=self.summary_cache_ttl,
+                max_entries=self.summary_cache_max_entries,
+                max_size_bytes=self.summary_cache_max_size_mb * 1024 * 1024
+            )
+        return self._summary_cache
 
-            if not line:
-                formatted_lines.append('<div style="height: 16px;"></div>')
-                continue
+    def _get_transcript_cache(self) -> Optional[TranscriptCache]:
+        """获取字幕/转写缓存实例，未启用时返回None"""
+        if not self.enable_transcript_cache:
+            return None
+        if self._transcript_cache is None:
+            self._transcript_cache = TranscriptCache(
+                db_path=os.path.join(self._get_data_dir(), 'transcript_cache.db'),
+                max_size_bytes=self.transcript_cache_max_size_mb * 1024 * 1024
+            )
+        return self._transcript_cache
 
-            # 处理 **文本** 格式 - 高亮显示
-            line = re.sub(
-                r'\*\*([^*]+)\*\*',
-                r'<span style="background: linear-gradient(135deg, #e94560, #ff6b6b); color: white; padding: 4px 12px; border-radius: 8px; font-weight: bold;">\1</span>',
-                line
+    def _get_card_renderer(self) -> Optional[PillowCardRenderer]:
+        """获取本地卡片渲染器，未启用或不可用（未安装Pillow、缺少中文字体）时返回None"""
+        if self.card_renderer != 'pillow':
+            return None
+        if self._card_renderer is None:
+            self._card_renderer = PillowCardRenderer(
+                output_dir=os.path.join(self._get_data_dir(), 'cards'),
+                font_path=self.card_font_path
             )
+            if not self._card_renderer.available:
+                logger.warning("本地卡片渲染不可用（未安装Pillow或未找到中文字体），将使用html_render")
+        return self._card_renderer if self._card_renderer.available else None
+
+    async def _get_cached_transcript(self, cid: int, source: str) -> Optional[str]:
+        """查询分P的缓存字幕或转写文本"""
+        cache = self._get_transcript_cache()
+        if not cache:
+            return None
+        return await cache.get(cid, source)
 
-            # 处理 Markdown 标题（#### > ### > ## > #）
-            heading_match = re.match(r'^(#{1,4})\s+(.+)', line)
-            if heading_match:
-                level = len(heading_match.group(1))
-                content = heading_match.group(2)
-                style = heading_styles.get(level, heading_styles[4])
-                line = f'<div style="{style}">{content}</div>'
-            # 处理数字序号开头的段落（如 1. 2. 3.）
-            elif re.match(r'^(\d+)\.\s*(.+)', line):
-                match = re.match(r'^(\d+)\.\s*(.+)', line)
-                num = match.group(1)
-                content = match.group(2)
-                line = f'''<div style="
-                    display: flex;
-                    align-items: flex-start;
-                    margin: 20px 0;
-                ">
-                    <span style="
-                        background: linear-gradient(135deg, #e94560, #ff6b6b);
-                        color: white;
-                        min-width: 44px;
-                        height: 44px;
-                        border-radius: 50%;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        font-weight: bold;
-                        font-size: 28px;
-                        margin-right: 18px;
-                        flex-shrink: 0;
-                        box-shadow: 0 3px 6px rgba(233,69,96,0.4);
-                    ">{num}</span>
-                    <span style="flex: 1; padding-top: 4px;">{content}</span>
-                </div>'''
-            # 处理破折号或横杠开头的列表项
-            elif re.match(r'^[-–—•]\s*(.+)', line):
-                match = re.match(r'^[-–—•]\s*(.+)', line)
-                content = match.group(1)
-                line = f'''<div style="
-                    display: flex;
-                    align-items: flex-start;
-                    margin: 14px 0;
-                    padding-left: 14px;
-                ">
-                    <span style="
-                        color: #e94560;
-                        margin-right: 14px;
-                        font-size: 28px;
-                        line-height: 1.4;
-                    ">▸</span>
-                    <span style="flex: 1;">{content}</span>
-                </div>'''
-            # 处理冒号结尾的标题行
-            elif line.endswith('：') or line.endswith(':'):
-                line = f'''<div style="
-                    font-weight: bold;
-                    color: #ff6b6b;
-                    font-size: 36px;
-                    margin: 28px 0 14px 0;
-                    padding-bottom: 8px;
-                    border-bottom: 2px dashed rgba(233,69,96,0.3);
-                ">{line}</div>'''
-            else:
-                line = f'<div style="margin: 14px 0; text-indent: 0;">{line}</div>'
+    async def _store_cached_transcript(self, video_info: Dict[str, Any], source: str, text: str) -> None:
+        """写入字幕或转写文本缓存"""
+        cache = self._get_transcript_cache()
+        if not cache:
+            return
+        await cache.set(video_info['cid'], source, video_info['aid'], video_info.get('bvid') or '', text)
 
-            formatted_lines.append(line)
+    def _summary_cache_params(self) -> tuple:
+        """返回影响总结结果的参数：提示词哈希和模型名"""
+        prompt_hash = hashlib.sha256(self.summary_prompt.encode('utf-8')).hexdigest()[:16]
+        return prompt_hash, self.openai_model
 
-        return ''.join(formatted_lines)
+    async def _get_cached_summary(self, video_id: str, page: int = 1) -> Optional[Dict[str, Any]]:
+        """查询视频的缓存总结"""
+        cache = self._get_summary_cache()
+        if not cache:
+            return None
+        prompt_hash, model = self._summary_cache_params()
+        return await cache.get(video_id, page, prompt_hash, model)
+
+    async def _store_cached_summary(self, video_info: Dict[str, Any], summary: str,
+                                    subtitle_length: int, comments_text: str, page: int = 1) -> None:
+        """写入视频总结缓存"""
+        cache = self._get_summary_cache()
+        if not cache:
+            return
+        prompt_hash, model = self._summary_cache_params()
+        entry = {
+            'video_info': video_info,
+            'summary': summary,
+            'subtitle_length': subtitle_length,
+            'comments': comments_text
+        }
+        await cache.set(video_info['aid'], video_info['cid'], video_info.get('bvid') or '',
+                        page, prompt_hash, model, entry)
+    
+    def _format_summary_html(self, summary: str) -> str:
+        """将总结文本格式化为HTML，样式类定义在 templates/video_summary.html 中"""
+        return render_summary_html(summary)
 
     def _format_comments_html(self, comments: str) -> str:
-        """将评论文本格式化为带样式的HTML，每条评论独立展示"""
-        import html as html_module
-
-        lines = comments.split('\n')
-        formatted = []
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            escaped = html_module.escape(line)
-            formatted.append(f'''<div style="
-                margin: 14px 0;
-                padding: 16px 22px;
-                background: rgba(91,134,229,0.1);
-                border-left: 4px solid #5b86e5;
-                border-radius: 0 12px 12px 0;
-                line-height: 1.8;
-            ">{escaped}</div>''')
-
-        return ''.join(formatted)
+        """将评论文本格式化为HTML，每条评论独立展示"""
+        return render_comments_html(comments)
 
     async def render_summary_card(self, platform_icon: str, title: str, owner: str,
                                    duration: str, views: str, likes: str,
@@ -362,6 +477,26 @@ class BilibiliSummaryPlugin(Star):
         Returns:
             图片URL或路径，失败返回None
         """
+        renderer = self._get_card_renderer()
+        if renderer:
+            try:
+                card = {
+                    "title": title,
+                    "owner": owner,
+                    "duration": duration,
+                    "views": views,
+                    "likes": likes,
+                    "summary": summary,
+                    "subtitle_length": subtitle_length,
+                    "summary_length": len(summary),
+                    "comments": comments
+                }
+                image_path = await asyncio.get_running_loop().run_in_executor(None, renderer.render, card)
+                logger.info(f"成功在本地渲染视频总结卡片")
+                return image_path
+            except Exception as e:
+                logger.error(f"本地渲染视频总结卡片失败，改用html_render: {type(e).__name__}: {str(e)}")
+
         try:
             # 格式化总结内容为带样式的HTML
             summary_html = self._format_summary_html(summary)
@@ -391,50 +526,62 @@ class BilibiliSummaryPlugin(Star):
             logger.error(f"渲染视频总结卡片失败: {type(e).__name__}: {str(e)}")
             return None
 
-    def extract_video_links_from_message(self, event: AstrMessageEvent) -> List[str]:
-        """从消息链中提取所有可能的bilibili链接"""
+    @staticmethod
+    def _component_raw_text(component: Any) -> str:
+        """获取消息组件的原始文本用于预筛，不解析JSON；不会包含链接的组件类型返回空字符串"""
+        if isinstance(component, Comp.Plain):
+            return component.text or ''
+        if hasattr(component, 'type') and component.type == 'Json':
+            data = getattr(component, 'data', None)
+            return data if isinstance(data, str) else str(data or '')
+        if isinstance(component, (Comp.Reply, Comp.Forward)):
+            return str(component)
+        return ''
+
+    def _candidate_components(self, event: AstrMessageEvent) -> List[Any]:
+        """预筛消息链，只保留可能包含视频链接的组件"""
+        return [
+            component for component in event.message_obj.message
+            if has_link_hint(self._component_raw_text(component))
+        ]
+
+    def extract_video_links_from_message(self, event: AstrMessageEvent,
+                                         components: Optional[List[Any]] = None) -> List[str]:
+        """从消息链中提取所有可能的bilibili链接
+
+        Args:
+            event: 消息事件
+            components: 已经过预筛的组件，为None时解析整条消息链
+        """
         bilibili_links = []
 
         # 从消息链中提取链接
-        for component in event.message_obj.message:
+        for component in event.message_obj.message if components is None else components:
             if isinstance(component, Comp.Plain):
                 text = component.text
                 bilibili_extracted = self.extract_links_from_text(text)
                 bilibili_links.extend(bilibili_extracted)
 
             elif isinstance(component, Comp.Reply):
-                logger.info(f"检测到引用消息: {component}")
+                logger.debug(f"检测到引用消息: {component}")
                 b_links = self.extract_from_reply(event, component)
                 bilibili_links.extend(b_links)
 
             elif isinstance(component, Comp.Forward):
-                logger.info(f"检测到转发消息: {component}")
+                logger.debug(f"检测到转发消息: {component}")
                 b_links = self.extract_from_forward_message(component)
                 bilibili_links.extend(b_links)
 
             elif hasattr(component, 'type') and component.type == 'Json':
-                logger.info(f"检测到JSON消息组件: {component}")
+                logger.debug(f"检测到JSON消息组件: {component}")
                 b_links = self.extract_from_json_component(component)
                 bilibili_links.extend(b_links)
 
-        return bilibili_links
+        return dedupe_links(bilibili_links)
 
     def extract_links_from_text(self, text: str) -> List[str]:
-        """从文本中提取bilibili链接"""
-        links = []
-        url_patterns = [
-            r'https?://(?:www\.)?bilibili\.com/video/[^\s\'"<>]+',
-            r'https?://m\.bilibili\.com/video/[^\s\'"<>]+',
-            r'https?://b23\.tv/[^\s\'"<>]+',
-            r'BV[a-zA-Z0-9]{10}',
-            r'av\d+',
-        ]
-
-        for pattern in url_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            links.extend(matches)
-
-        return links
+        """从文本中提取bilibili链接（规范化并按出现顺序去重）"""
+        return scan_links(text)
 
     def _extract_texts_from_component_list(self, items: list) -> List[str]:
         """从消息组件列表中提取文本字符串"""
@@ -448,20 +595,6 @@ class BilibiliSummaryPlugin(Star):
                 texts.append(str(item.text))
         return texts
 
-    @staticmethod
-    def _extract_strings_from_json(obj: Any) -> List[str]:
-        """递归提取JSON结构中的所有字符串值"""
-        strings = []
-        if isinstance(obj, dict):
-            for v in obj.values():
-                strings.extend(BilibiliSummaryPlugin._extract_strings_from_json(v))
-        elif isinstance(obj, list):
-            for item in obj:
-                strings.extend(BilibiliSummaryPlugin._extract_strings_from_json(item))
-        elif isinstance(obj, str):
-            strings.append(obj)
-        return strings
-
     def extract_from_json_component(self, json_component: Any) -> List[str]:
         """从JSON消息组件中提取bilibili链接"""
         bilibili_links = []
@@ -476,22 +609,9 @@ class BilibiliSummaryPlugin(Star):
                     json_data = json_component.data
 
             if json_data:
-                # 递归搜索JSON中的所有字符串值
-                for s in self._extract_strings_from_json(json_data):
-                    bilibili_links.extend(self.extract_links_from_text(s))
-
-                # 特别处理bilibili小程序卡片
-                if isinstance(json_data, dict):
-                    detail = json_data.get('meta', {}).get('detail_1', {})
-                    if detail:
-                        title = detail.get('title', '')
-                        if '哔哩哔哩' in title or 'bilibili' in title.lower():
-                            for key in ('qqdocurl', 'url'):
-                                val = detail.get(key, '')
-                                if val:
-                                    bilibili_links.extend(self.extract_links_from_text(val))
-
-                logger.info(f"从JSON组件中提取到Bilibili链接: {bilibili_links}")
+                # 优先读取B站卡片的已知字段，再有限遍历其余字符串
+                bilibili_links.extend(extract_links_from_json(json_data))
+                logger.debug(f"从JSON组件中提取到Bilibili链接: {bilibili_links}")
 
         except (json.JSONDecodeError, KeyError, AttributeError) as e:
             logger.warning(f"解析JSON消息组件失败: {type(e).__name__}: {str(e)}")
@@ -505,7 +625,7 @@ class BilibiliSummaryPlugin(Star):
         bilibili_links = []
 
         try:
-            logger.info(f"引用消息详情: {reply_component}")
+            logger.debug(f"引用消息详情: {reply_component}")
 
             if hasattr(reply_component, 'text') and reply_component.text:
                 text = reply_component.text
@@ -586,7 +706,7 @@ class BilibiliSummaryPlugin(Star):
                     if isinstance(data, str):
                         try:
                             json_data = json.loads(data)
-                            content_sources.extend(self._extract_strings_from_json(json_data))
+                            bilibili_links.extend(extract_links_from_json(json_data))
                         except json.JSONDecodeError:
                             content_sources.append(data)
                     elif isinstance(data, dict):
@@ -605,8 +725,7 @@ class BilibiliSummaryPlugin(Star):
             logger.error(f"解析转发消息时发生未预期错误: {type(e).__name__}: {str(e)}")
 
         # 去重
-        bilibili_links = list(dict.fromkeys(bilibili_links))
-        return bilibili_links
+        return dedupe_links(bilibili_links)
 
     def parse_bilibili_url(self, input_str: str) -> Optional[str]:
         """解析bilibili视频链接，提取BV号或AV号"""
@@ -661,19 +780,40 @@ class BilibiliSummaryPlugin(Star):
 
         return None
 
+    @staticmethod
+    def normalize_video_id(video_id: str) -> str:
+        """将av号在本地换算为BV号，便于同一视频的不同写法去重；BV号原样返回"""
+        return normalize_video_id(video_id)
+
+    @staticmethod
+    def parse_page_number(input_str: str) -> Optional[int]:
+        """解析链接中的分P参数（?p=N），没有指定时返回None"""
+        try:
+            page = parse_qs(urlparse(input_str.strip()).query).get('p')
+            if page and page[0].isdigit() and int(page[0]) > 0:
+                return int(page[0])
+        except ValueError:
+            pass
+        return None
+
     async def resolve_short_url(self, short_url: str) -> Optional[str]:
         """解析b23.tv短链接"""
+        location = await self._resolve_short_location(short_url)
+        return self.parse_bilibili_url(location) if location else None
+
+    async def _resolve_short_location(self, short_url: str) -> Optional[str]:
+        """获取b23.tv短链接重定向到的完整链接"""
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
 
-            async with aiohttp.ClientSession() as session:
+            async with self.http_client.session() as session:
                 async with session.get(short_url, headers=headers, allow_redirects=False) as response:
                     if response.status in [301, 302, 303, 307, 308]:
                         location = response.headers.get('Location')
                         if location:
-                            return self.parse_bilibili_url(location)
+                            return location
 
             return None
         except aiohttp.ClientError as e:
@@ -698,17 +838,21 @@ class BilibiliSummaryPlugin(Star):
                 'Referer': 'https://www.bilibili.com/'
             }
 
-            async with aiohttp.ClientSession() as session:
+            async with self.http_client.session() as session:
+                await self.rate_limiter.acquire('view')
                 async with session.get(url, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
+                        self.rate_limiter.report('view', response.status, data.get('code'))
                         if data.get('code') == 0:
                             bvid = data.get('data', {}).get('bvid')
                             if bvid:
                                 logger.info(f"成功转换AV号到BV号: {av_id} -> {bvid}")
                                 return bvid
+                    else:
+                        self.rate_limiter.report('view', response.status)
+                        logger.warning(f"AV号转换HTTP请求失败: status={response.status}")
 
-            await asyncio.sleep(self.request_interval)
             return None
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
@@ -726,9 +870,19 @@ class BilibiliSummaryPlugin(Star):
 
         当检测到视频链接时，自动触发总结功能并阻止消息传递给AI聊天处理器
         """
+        # 插件管理指令中的视频ID不触发总结
+        if event.message_str.strip().lstrip('/').startswith('bili_'):
+            return
+
+        # 预筛：消息中没有任何链接关键字时直接放行，不做完整解析
+        self._messages_seen += 1
+        components = self._candidate_components(event)
+        if not components:
+            return
+        self._messages_parsed += 1
 
         # 从当前消息中提取链接
-        bilibili_links = self.extract_video_links_from_message(event)
+        bilibili_links = self.extract_video_links_from_message(event, components)
 
         # 如果没有找到任何视频链接，直接返回，让消息继续传递给其他处理器
         if not bilibili_links:
@@ -743,185 +897,678 @@ class BilibiliSummaryPlugin(Star):
             return
 
         # 处理Bilibili视频
+        if self.multi_link_mode != 'first' and len(bilibili_links) > 1:
+            logger.info(f"自动检测到{len(bilibili_links)}个bilibili链接")
+            async for result in self.process_bilibili_videos(event, bilibili_links):
+                yield result
+            return
+
         video_input = bilibili_links[0]
         logger.info(f"自动检测到bilibili链接: {video_input}")
         async for result in self.process_bilibili_video(event, video_input):
             yield result
-    
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("bili_cache")
+    async def bili_cache(self, event: AstrMessageEvent, action: str = "info", target: str = "") -> AsyncGenerator:
+        """查看或清理视频总结缓存和字幕/转写缓存（仅管理员）
+
+        用法：
+        /bili_cache info            查看缓存状态
+        /bili_cache purge BV号/av号  清除指定视频的缓存
+        /bili_cache purge all       清空全部缓存
+        /bili_cache cleanup         清理过期和超出上限的条目
+        """
+        cache = self._get_summary_cache()
+        transcripts = self._get_transcript_cache()
+        if not cache and not transcripts:
+            yield event.plain_result("总结缓存未启用")
+            return
+
+        try:
+            if action == "info":
+                lines = []
+                if cache:
+                    stats = await cache.stats()
+                    total = stats['hits'] + stats['misses']
+                    hit_rate = f"{stats['hits'] / total * 100:.1f}%" if total else "--"
+                    lines += [
+                        "📦 总结缓存状态",
+                        f"条目数：{stats['entries']} / {self.summary_cache_max_entries}",
+                        f"占用：{stats['size_bytes'] / 1024 / 1024:.2f}MB / {self.summary_cache_max_size_mb}MB",
+                        f"有效期：{self.summary_cache_ttl // 3600} 小时",
+                        f"本次运行命中：{stats['hits']} / {total}（{hit_rate}）",
+                    ]
+                    if stats['oldest']:
+                        lines.append(f"最早条目：{time.strftime('%Y-%m-%d %H:%M', time.localtime(stats['oldest']))}")
+                if transcripts:
+                    stats = await transcripts.stats()
+                    total = stats['hits'] + stats['misses']
+                    hit_rate = f"{stats['hits'] / total * 100:.1f}%" if total else "--"
+                    lines += [
+                        "📝 字幕/转写缓存状态",
+                        f"条目数：{stats['entries']}",
+                        f"占用：{stats['size_bytes'] / 1024 / 1024:.2f}MB / {self.transcript_cache_max_size_mb}MB"
+                        f"（压缩前 {stats['raw_bytes'] / 1024 / 1024:.2f}MB）",
+                        f"本次运行命中：{stats['hits']} / {total}（{hit_rate}）",
+                    ]
+                yield event.plain_result("\n".join(lines))
+            elif action == "purge":
+                video_id = None
+                if target != "all":
+                    video_id = self.parse_bilibili_url(target)
+                    if not video_id or video_id.startswith('http'):
+                        yield event.plain_result("用法：/bili_cache purge <BV号/av号|all>")
+                        return
+                removed = await cache.purge(video_id) if cache else 0
+                removed_texts = await transcripts.purge(video_id) if transcripts else 0
+                yield event.plain_result(f"已清除 {removed} 条总结缓存，{removed_texts} 条字幕/转写缓存")
+            elif action == "cleanup":
+                removed = await cache.cleanup() if cache else 0
+                yield event.plain_result(f"已清理 {removed} 条过期或超限的总结缓存")
+            else:
+                yield event.plain_result("用法：/bili_cache <info|purge|cleanup> [BV号/av号|all]")
+        except Exception as e:
+            logger.error(f"操作总结缓存失败: {type(e).__name__}: {str(e)}")
+            yield event.plain_result("❌ 操作总结缓存失败，请查看日志")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("bili_stats")
+    async def bili_stats(self, event: AstrMessageEvent) -> AsyncGenerator:
+        """查看插件运行统计（仅管理员）"""
+        lines = [
+            "📊 视频总结插件运行统计",
+            f"处理流程：执行 {self._single_flight.executed} 次，进行中 {self._single_flight.inflight} 个",
+            f"合并重复请求：{self._single_flight.coalesced} 次",
+        ]
+        parsed_ratio = self._messages_parsed / self._messages_seen * 100 if self._messages_seen else 0
+        lines.append(
+            f"消息预筛：收到 {self._messages_seen} 条，完整解析 {self._messages_parsed} 条（{parsed_ratio:.1f}%）"
+        )
+        jobs = self.scheduler.snapshot()
+        lines.append(
+            f"任务调度：运行 {jobs['running']} 个，排队 {jobs['queued']} 个，"
+            f"已完成 {jobs['completed']} 个，队列满拒绝 {jobs['rejected']} 次"
+        )
+        lines.append(f"排队等待：平均 {jobs['avg_wait']:.2f}s，最长 {jobs['max_wait']:.2f}s")
+        audio = self.audio_service.stream_stats()
+        if audio['jobs'] or audio['overflows']:
+            lines.append(
+                f"音频流式提取：{audio['jobs']} 次，共传输 {audio['bytes'] / 1024 / 1024:.2f}MB，"
+                f"缓冲峰值 {audio['peak_buffer'] / 1024 / 1024:.2f}MB，超限回退 {audio['overflows']} 次"
+            )
+        trim = self.audio_service.trim_stats()
+        if trim['jobs']:
+            lines.append(
+                f"静音剪除：{trim['jobs']} 次，共剪除 {trim['seconds']:.0f}s，"
+                f"减少上传 {trim['bytes'] / 1024 / 1024:.2f}MB"
+            )
+        if self._card_renderer is not None and self._card_renderer.renders:
+            renderer = self._card_renderer
+            lines.append(
+                f"本地卡片渲染：{renderer.renders} 张，平均 {renderer.render_time / renderer.renders:.2f}s"
+            )
+        for model, info in self.llm_metrics.snapshot().items():
+            line = f"模型 {model}：请求 {info['requests']} 次（失败 {info['failures']}），平均耗时 {info['avg_time']:.2f}s"
+            if info['avg_ttft'] is not None:
+                line += f"，平均首字延迟 {info['avg_ttft']:.2f}s"
+            if info['tokens_per_sec'] is not None:
+                line += f"，{info['tokens_per_sec']:.1f} tokens/s"
+            lines.append(line)
+        lines.append(
+            f"接口缓存：视频信息命中 {self._view_cache.hits} 次（未命中 {self._view_cache.misses}），"
+            f"下载地址命中 {self._playurl_cache.hits} 次（未命中 {self._playurl_cache.misses}）"
+        )
+        for family, info in self.rate_limiter.snapshot().items():
+            lines.append(
+                f"接口 {family}：{info['rate']:.3f} 次/秒，限流等待 {info['throttled']} 次"
+                f"（共 {info['wait_time']:.1f}s）"
+            )
+        yield event.plain_result("\n".join(lines))
+
     async def process_bilibili_video(self, event: AstrMessageEvent, video_input: str) -> AsyncGenerator:
         """处理Bilibili视频"""
+        target = await self._resolve_video_target(video_input)
+        if not target:
+            yield event.plain_result("❌ 无法识别的Bilibili视频链接或ID格式，请检查后重试")
+            return
+
+        group = event.get_group_id() or event.get_sender_id()
+        kind, content = await self._summarize_target(group, target)
+        if kind == 'image':
+            yield event.image_result(content)
+        else:
+            yield event.plain_result(content)
+
+    async def process_bilibili_videos(self, event: AstrMessageEvent, video_inputs: List[str]) -> AsyncGenerator:
+        """并发处理一条消息中的多个视频，按链接出现顺序输出
+
+        链接按解析后的视频（BV号和分P）去重，最多处理 max_links_per_message 个；
+        multi_link_mode 为 combined 时合并为一张卡片，否则每个视频单独输出。
+        """
+        resolved = await asyncio.gather(*(self._resolve_video_target(v) for v in video_inputs))
+        targets = []
+        seen = set()
+        for target in resolved:
+            if not target:
+                continue
+            key = (self.normalize_video_id(target[0]),) + target[1:]
+            if key in seen:
+                continue
+            seen.add(key)
+            targets.append(target)
+        if not targets:
+            yield event.plain_result("❌ 无法识别的Bilibili视频链接或ID格式，请检查后重试")
+            return
+        if len(targets) > self.max_links_per_message:
+            logger.info(f"消息中有{len(targets)}个视频，只处理前{self.max_links_per_message}个")
+            targets = targets[:self.max_links_per_message]
+        logger.info(f"并发处理消息中的{len(targets)}个视频: {[t[0] for t in targets]}")
+
+        group = event.get_group_id() or event.get_sender_id()
+        combined = self.multi_link_mode == 'combined' and len(targets) > 1
+        results = await asyncio.gather(*(
+            self._summarize_target(group, target, render=not combined) for target in targets
+        ))
+
+        if combined:
+            kind, content = await self._build_combined_output(targets, results)
+            results = [(kind, content)]
+        for kind, content in results:
+            if kind == 'image':
+                yield event.image_result(content)
+            else:
+                yield event.plain_result(content)
+
+    async def _resolve_video_target(self, video_input: str) -> Optional[Tuple[str, int, bool]]:
+        """解析链接为 (视频ID, 分P序号, 是否总结全部分P)，无法识别时返回None"""
         # 解析输入的视频标识
-        video_id = self.parse_bilibili_url(video_input.strip())
+        video_input = video_input.strip()
+        video_id = self.parse_bilibili_url(video_input)
 
         # 如果是短链接，需要先解析
-        if video_input.strip().startswith('https://b23.tv/'):
-            video_id = await self.resolve_short_url(video_input.strip())
+        if video_input.startswith('https://b23.tv/'):
+            video_input = await self._resolve_short_location(video_input) or ''
+            video_id = self.parse_bilibili_url(video_input) if video_input else None
 
         if not video_id:
-            yield event.plain_result("❌ 无法识别的Bilibili视频链接或ID格式，请检查后重试")
-            return
+            return None
 
+        # 链接指定了分P时只总结该分P，否则按配置总结第一个分P或全部分P
+        page = self.parse_page_number(video_input)
+        all_parts = page is None and self.summarize_all_parts
+        return video_id, page or 1, all_parts
+
+    async def _summarize_target(self, group: Any, target: Tuple[str, int, bool],
+                                render: bool = True) -> Tuple[str, Any]:
+        """在调度器名额内总结一个视频，同一视频的并发请求共享同一次处理流程
+
+        合并键使用换算后的BV号，av号和BV号请求同一视频时也会合并；流程只产出总结数据，
+        各请求拿到结果后再分别渲染，单独输出和合并输出因此可以共享同一次流程。
+        """
+        video_id, page, all_parts = target
+        normalized = self.normalize_video_id(video_id)
+        flight_key = f"{normalized}#all" if all_parts else f"{normalized}#p{page}"
         try:
-            # 获取视频基本信息
-            video_info = await self.get_video_info(video_id)
-            if not video_info:
-                yield event.plain_result("❌ 获取视频信息失败，请检查BV号是否正确")
-                return
-
-            aid = video_info.get('aid')
-            cid = video_info.get('cid')
-            title = video_info.get('title', '未知标题')
-            desc = video_info.get('desc', '')
-            pic_url = video_info.get('pic', '')
-            owner = video_info.get('owner', '未知UP主')
-            view_count = video_info.get('view', 0)
-            like_count = video_info.get('like', 0)
-            duration = video_info.get('duration', 0)
-
-            if not aid or not cid:
-                yield event.plain_result("❌ 无法获取视频的aid或cid")
-                return
-            
-            # 格式化时长
-            minutes = duration // 60
-            seconds = duration % 60
-            duration_str = f"{minutes:02d}:{seconds:02d}" if duration > 0 else "--:--"
-            
-            # 格式化播放量和点赞数
-            def format_count(count):
-                if count >= 100000000:  # 亿
-                    return f"{count / 100000000:.1f}亿"
-                elif count >= 10000:  # 万
-                    return f"{count / 10000:.1f}万"
-                else:
-                    return str(count)
-            
-            view_str = format_count(view_count)
-            like_str = format_count(like_count)
-            
-            # 静默模式：不发送中间状态消息
-            logger.info(f"正在处理B站视频: {title}")
+            kind, content = await self._single_flight.do(
+                flight_key,
+                lambda: self.scheduler.run(
+                    group, lambda: self._run_video_pipeline(video_id, page, all_parts, render=False)
+                )
+            )
+        except SchedulerBusy:
+            logger.warning(f"总结任务队列已满，拒绝处理: {video_id}")
+            return ('text', "⏳ 当前排队的视频总结任务过多，请稍后再试")
+        if kind != 'summary' or not render:
+            return kind, content
+        return await self._summary_output(
+            content['video_info'], content['summary'], content['subtitle_length'], content['comments']
+        )
 
-            # 获取字幕
-            subtitle_text = await self.get_subtitle(aid, cid)
-            subtitle_length = 0  # 记录字幕字数
-            
-            # 如果没有字幕且启用了音频转文字功能
-            if not subtitle_text and self.enable_audio_transcription:
-                logger.info("未找到字幕，尝试使用音频转文字功能")
-                
-                # 尝试最多2次获取和提取音频
-                audio_path = None
-                for attempt in range(2):
-                    # 获取视频下载地址（每次都重新获取，因为URL可能过期）
-                    video_url = await self.get_video_download_url(aid, cid)
-                    if not video_url:
-                        yield event.plain_result("❌ 无法获取视频下载地址")
-                        return
-                    
-                    # 提取音频
-                    audio_path = await self.audio_service.extract_audio_from_video(video_url, self.audio_extract_duration)
-                    if audio_path:
-                        break
-                    
-                    if attempt == 0:
-                        logger.info(f"第{attempt + 1}次尝试失败，等待2秒后重试...")
-                        await asyncio.sleep(2)
-                
-                if not audio_path:
-                    yield event.plain_result("❌ 音频提取失败。可能原因：\n1. B站视频URL已过期\n2. 网络连接问题\n3. ffmpeg未正确安装\n\n建议：稍后重试或检查有无字幕的视频")
-                    return
-                
-                # 转换为文字
-                subtitle_text = await self.audio_service.transcribe_audio(audio_path, self.openai_api_key)
-                if not subtitle_text:
-                    yield event.plain_result("❌ 语音识别失败，请检查Whisper API配置")
-                    return
-                
-                logger.info(f"音频转文字成功，文本长度: {len(subtitle_text)}字符")
-            elif not subtitle_text:
-                yield event.plain_result("❌ 未找到可用的字幕，且音频转文字功能未启用")
-                return
-            
-            # 记录字幕字数
-            subtitle_length = len(subtitle_text)
+    async def _build_combined_output(self, targets: List[Tuple[str, int, bool]],
+                                     results: List[Tuple[str, Any]]) -> Tuple[str, str]:
+        """将多个视频的总结合并为一张卡片，失败的视频保留错误提示"""
+        sections = []
+        owners = []
+        total_duration = 0
+        total_views = 0
+        total_likes = 0
+        subtitle_length = 0
+        for index, (target, (kind, content)) in enumerate(zip(targets, results), start=1):
+            if kind != 'summary':
+                sections.append(f"## {index}. {target[0]}\n{content}")
+                continue
+            info = content['video_info']
+            sections.append(f"## {index}. {info.get('title', '未知标题')}\n{content['summary']}")
+            owner = info.get('owner')
+            if owner and owner not in owners:
+                owners.append(owner)
+            total_duration += info.get('duration', 0) or 0
+            total_views += info.get('view', 0) or 0
+            total_likes += info.get('like', 0) or 0
+            subtitle_length += content['subtitle_length']
+
+        merged_info = {
+            'title': f"{len(targets)}个视频的内容总结",
+            'owner': "、".join(owners[:3]) + ("等" if len(owners) > 3 else "") if owners else "未知UP主",
+            'duration': total_duration,
+            'view': total_views,
+            'like': total_likes,
+        }
+        return await self._build_summary_output(merged_info, "\n\n".join(sections), subtitle_length, "")
 
-            # 获取热门评论
-            comments_text = await self.get_comments(aid)
-            if comments_text:
-                logger.info("已获取热门评论，将纳入总结")
-
-            # 生成总结
-            summary = await self.generate_summary(title, desc, subtitle_text, comments=comments_text or "")
-            if summary:
-                logger.info(f"总结生成成功，长度: {len(summary)}字符")
-                
-                # 尝试渲染为图片
-                image_url = await self.render_summary_card(
-                    platform_icon="📺",
-                    title=title,
-                    owner=owner,
-                    duration=duration_str,
-                    views=view_str,
-                    likes=like_str,
-                    summary=summary,
-                    subtitle_length=subtitle_length,
-                    comments=comments_text or ""
+    async def _run_video_pipeline(self, video_id: str, page: int = 1, all_parts: bool = False,
+                                  render: bool = True) -> Tuple[str, Any]:
+        """执行视频总结流程
+
+        Args:
+            video_id: BV号或av号
+            page: 要总结的分P序号（从1开始）
+            all_parts: 为True时总结全部分P并合并为一张卡片
+            render: 为False时不渲染卡片，返回总结数据供合并输出
+
+        Returns:
+            ('image', 图片URL或路径)、('text', 文本消息)，
+            或 render 为False时的 ('summary', {'video_info', 'summary', 'subtitle_length', 'comments'})
+        """
+        try:
+            if all_parts:
+                return await self._summarize_all_parts(video_id, render)
+
+            # 命中总结缓存时跳过所有上游请求，直接渲染
+            cached = await self._get_cached_summary(video_id, page)
+            if cached:
+                logger.info(f"命中总结缓存: {video_id} P{page}")
+                return await self._summary_output(
+                    cached['video_info'], cached['summary'],
+                    cached['subtitle_length'], cached.get('comments', ''), render
                 )
-                
-                if image_url:
-                    # 成功渲染为图片
-                    yield event.image_result(image_url)
-                else:
-                    # 渲染失败，回退到纯文本输出
-                    logger.warning("图片渲染失败，使用纯文本输出")
-                    output_parts = [
-                        f"📺 【{title}】",
-                        f"",
-                        f"👤 UP主：{owner}",
-                        f"⏱️ 时长：{duration_str}  |  👀 {view_str}  |  👍 {like_str}",
-                        f"",
-                        f"{'─' * 30}",
-                        f"📋 内容总结",
-                        f"{'─' * 30}",
-                        f"",
-                        summary,
-                    ]
-                    if comments_text:
-                        output_parts.extend([
-                            f"",
-                            f"{'─' * 30}",
-                            f"💬 热门评论",
-                            f"{'─' * 30}",
-                            f"",
-                            comments_text,
-                        ])
-                    output_parts.extend([
-                        f"",
-                        f"{'─' * 30}",
-                        f"📊 字幕：{subtitle_length} 字  |  总结：{len(summary)} 字"
-                    ])
-                    yield event.plain_result("\n".join(output_parts))
-            else:
-                yield event.plain_result("❌ 生成总结失败")
 
+            graph = StageGraph(f"视频总结[{video_id} P{page}]")
+            graph.add('info', lambda _: self._stage_video_info(video_id, page))
+            graph.add('transcript', lambda r: self._stage_transcript(r['info']), deps=['info'])
+            # 评论只依赖aid，与字幕/音频转写并发获取；失败时不影响总结
+            graph.add('comments', lambda r: self.get_comments(r['info']['aid']), deps=['info'], required=False)
+            graph.add('summary', lambda r: self._stage_summary(r['info'], r['transcript'], r['comments'], page),
+                      deps=['info', 'transcript', 'comments'])
+            graph.add('render', lambda r: self._summary_output(
+                r['info'], r['summary'], len(r['transcript']), r['comments'] or "", render
+            ), deps=['info', 'transcript', 'comments', 'summary'])
+
+            results = await graph.run()
+            return results['render']
+
+        except StageError as e:
+            return ('text', str(e))
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
-            yield event.plain_result("❌ 网络请求失败，请检查网络连接后重试")
+            return ('text', "❌ 网络请求失败，请检查网络连接后重试")
         except (ValueError, KeyError) as e:
             logger.error(f"数据解析失败: {type(e).__name__}: {str(e)}")
-            yield event.plain_result("❌ 数据解析失败，可能是视频信息格式异常")
+            return ('text', "❌ 数据解析失败，可能是视频信息格式异常")
         except OSError as e:
             logger.error(f"文件操作失败: {type(e).__name__}: {str(e)}")
-            yield event.plain_result("❌ 文件操作失败，请检查系统权限和磁盘空间")
+            return ('text', "❌ 文件操作失败，请检查系统权限和磁盘空间")
         except asyncio.CancelledError:
             raise
         except Exception as e:
             logger.error(f"处理请求时发生未预期错误: {type(e).__name__}: {str(e)}")
-            yield event.plain_result(f"❌ 处理请求时发生错误，请联系管理员")
+            return ('text', f"❌ 处理请求时发生错误，请联系管理员")
+
+    async def _summary_output(self, video_info: Dict[str, Any], summary: str, subtitle_length: int,
+                              comments_text: str, render: bool = True) -> Tuple[str, Any]:
+        """渲染总结卡片，render 为False时原样返回总结数据"""
+        if render:
+            return await self._build_summary_output(video_info, summary, subtitle_length, comments_text)
+        return ('summary', {
+            'video_info': video_info,
+            'summary': summary,
+            'subtitle_length': subtitle_length,
+            'comments': comments_text
+        })
+
+    async def _summarize_all_parts(self, video_id: str, render: bool = True) -> Tuple[str, Any]:
+        """并发总结全部分P（受 max_parts 和 part_parallelism 限制），合并为一张概览卡片
+
+        每个分P的总结按分P序号单独缓存，评论只获取一次，同时用于各分P的总结并附在合并后的卡片上，
+        因此写入的缓存与单独请求该分P（?p=N）时生成的总结一致。
+        """
+        video_info = await self._stage_video_info(video_id, page=None)
+        pages = video_info.get('pages') or []
+        if len(pages) <= 1:
+            return await self._run_video_pipeline(video_id, render=render)
+
+        selected = pages[:max(1, self.max_parts)]
+        logger.info(f"视频共{len(pages)}个分P，总结其中{len(selected)}个（并发{self.part_parallelism}）")
+        comments_task = asyncio.ensure_future(self.get_comments(video_info['aid']))
+        semaphore = asyncio.Semaphore(max(1, self.part_parallelism))
+
+        async def shared_comments() -> Optional[str]:
+            # shield：某个分P被取消时不影响其他分P共用的评论请求；失败在合并时统一记录
+            try:
+                return await asyncio.shield(comments_task)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                return None
+
+        async def summarize_part(page: int) -> Tuple[str, int]:
+            async with semaphore:
+                cached = await self._get_cached_summary(video_id, page)
+                if cached:
+                    logger.info(f"命中总结缓存: {video_id} P{page}")
+                    return cached['summary'], cached['subtitle_length']
+                part_info = self._select_page(video_info, page)
+                transcript = await self._stage_transcript(part_info)
+                summary = await self._stage_summary(part_info, transcript, await shared_comments(), page)
+                return summary, len(transcript)
+
+        try:
+            results = await asyncio.gather(
+                *(summarize_part(page) for page in range(1, len(selected) + 1)),
+                return_exceptions=True
+            )
+        except BaseException:
+            comments_task.cancel()
+            raise
+
+        sections = []
+        subtitle_length = 0
+        errors = []
+        for page, (part, result) in enumerate(zip(selected, results), start=1):
+            heading = f"## P{page} {part.get('part') or ''}".rstrip()
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                logger.error(f"分P{page}总结失败: {type(result).__name__}: {str(result)}")
+                errors.append(result)
+                sections.append(f"{heading}\n（该分P总结失败）")
+                continue
+            summary, length = result
+            subtitle_length += length
+            sections.append(f"{heading}\n{summary}")
+
+        if len(errors) == len(selected):
+            comments_task.cancel()
+            first = errors[0]
+            raise first if isinstance(first, StageError) else StageError("❌ 所有分P总结均失败")
+        if len(pages) > len(selected):
+            sections.append(f"（共{len(pages)}个分P，仅总结了前{len(selected)}个）")
+
+        try:
+            comments_text = await comments_task
+        except Exception as e:
+            logger.warning(f"获取热门评论失败: {type(e).__name__}: {str(e)}")
+            comments_text = None
+
+        merged_info = dict(video_info, title=f"{video_info.get('title', '未知标题')}（共{len(pages)}P）")
+        return await self._summary_output(merged_info, "\n\n".join(sections), subtitle_length,
+                                          comments_text or "", render)
+
+    @staticmethod
+    def _select_page(video_info: Dict[str, Any], page: int) -> Dict[str, Any]:
+        """返回指定分P的视频信息：cid、时长替换为该分P的值，多P视频的标题附加分P名称"""
+        pages = video_info.get('pages') or []
+        if page > max(1, len(pages)):
+            raise StageError(f"❌ 该视频只有{len(pages)}个分P，没有P{page}")
+        info = dict(video_info, page=page)
+        if len(pages) > 1:
+            part = pages[page - 1]
+            info['cid'] = part.get('cid')
+            info['duration'] = part.get('duration') or info.get('duration', 0)
+            if part.get('part'):
+                info['title'] = f"{info.get('title', '未知标题')}（P{page} {part['part']}）"
+        return info
+
+    async def _stage_video_info(self, video_id: str, page: Optional[int] = 1) -> Dict[str, Any]:
+        """阶段：获取视频基本信息，并选定要总结的分P（page 为None时不选择）"""
+        video_info = await self.get_video_info(video_id)
+        if not video_info:
+            raise StageError("❌ 获取视频信息失败，请检查BV号是否正确")
+        if page is not None:
+            video_info = self._select_page(video_info, page)
+        if not video_info.get('aid') or not video_info.get('cid'):
+            raise StageError("❌ 无法获取视频的aid或cid")
+
+        # 静默模式：不发送中间状态消息
+        logger.info(f"正在处理B站视频: {video_info.get('title', '未知标题')}")
+        return video_info
+
+    async def _stage_transcript(self, video_info: Dict[str, Any]) -> str:
+        """阶段：获取字幕，没有字幕时提取音频并转写"""
+        aid = video_info['aid']
+        cid = video_info['cid']
+
+        # 获取字幕，优先使用缓存
+        subtitle_text = await self._get_cached_transcript(cid, SUBTITLE_SOURCE)
+        if subtitle_text:
+            logger.info(f"命中字幕缓存({len(subtitle_text)}字符)")
+            return subtitle_text
+        subtitle_text = await self.get_subtitle(aid, cid)
+        if subtitle_text:
+            await self._store_cached_transcript(video_info, SUBTITLE_SOURCE, subtitle_text)
+            return subtitle_text
+
+        if not self.enable_audio_transcription:
+            raise StageError("❌ 未找到可用的字幕，且音频转文字功能未启用")
+
+        # 没有字幕且启用了音频转文字功能，相同提取参数下的转写结果可直接复用
+        transcript_source = self.audio_service.transcript_signature(self.audio_extract_duration)
+        subtitle_text = await self._get_cached_transcript(cid, transcript_source)
+        if subtitle_text:
+            logger.info(f"命中语音转写缓存({len(subtitle_text)}字符)")
+            return subtitle_text
+        logger.info("未找到字幕，尝试使用音频转文字功能")
+
+        # 流式模式下音频不落盘，分段识别需要临时文件，因此两者互斥
+        stream_mode = self.audio_stream_mode and self.whisper_segment_seconds <= 0
+
+        # 尝试最多2次获取和提取音频
+        audio_path = None
+        audio_data = None
+        for attempt in range(2):
+            # 获取视频下载地址（每次都重新获取，因为URL可能过期）
+            # 重试时缓存的地址可能已失效，强制刷新
+            source = await self.get_audio_source(aid, cid, refresh=attempt > 0)
+            if not source:
+                raise StageError("❌ 无法获取视频下载地址")
+            video_url = source['url']
+            # DASH音频流可由插件分块下载后交给ffmpeg，地址过期时断点续传
+            native = self.audio_native_download and source['dash']
+
+            # 提取音频
+            async with self.scheduler.resource('ffmpeg'):
+                if stream_mode:
+                    try:
+                        chunks = self._download_audio_chunks(aid, cid, source) if native else None
+                        audio_data = await self.audio_service.extract_audio_to_memory(
+                            video_url, self.audio_extract_duration, chunks=chunks)
+                    except AudioBufferOverflow:
+                        logger.info("音频超过内存缓冲上限，改用临时文件提取")
+                        stream_mode = False
+                if not stream_mode:
+                    if native:
+                        audio_path = await self.audio_service.extract_audio_from_chunks(
+                            self._download_audio_chunks(aid, cid, source), self.audio_extract_duration)
+                    else:
+                        audio_path = await self.audio_service.extract_audio_from_video(video_url, self.audio_extract_duration)
+            if audio_data:
+                break
+            if audio_path:
+                break
+
+            if attempt == 0:
+                logger.info(f"第{attempt + 1}次尝试失败，等待2秒后重试...")
+                await asyncio.sleep(2)
+
+        if not audio_path and not audio_data:
+            raise StageError("❌ 音频提取失败。可能原因：\n1. B站视频URL已过期\n2. 网络连接问题\n3. ffmpeg未正确安装\n\n建议：稍后重试或检查有无字幕的视频")
+
+        # 转换为文字
+        async with self.scheduler.resource('whisper'):
+            if audio_data:
+                subtitle_text = await self.audio_service.transcribe_audio_bytes(audio_data, self.openai_api_key)
+            else:
+                subtitle_text = await self.audio_service.transcribe_audio(audio_path, self.openai_api_key)
+        if not subtitle_text:
+            raise StageError("❌ 语音识别失败，请检查Whisper API配置")
+
+        logger.info(f"音频转文字成功，文本长度: {len(subtitle_text)}字符")
+        await self._store_cached_transcript(video_info, transcript_source, subtitle_text)
+        return subtitle_text
+
+    async def _download_audio_chunks(self, aid: int, cid: int, source: Dict[str, Any]) -> AsyncGenerator:
+        """分块下载DASH音频流，只下载提取时长所需的字节数"""
+        async def refresh_url() -> Optional[str]:
+            refreshed = await self.get_audio_source(aid, cid, refresh=True)
+            return refreshed['url'] if refreshed and refreshed['dash'] else None
+
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+            'Referer': 'https://www.bilibili.com/'
+        }
+        downloader = RangedDownloader(self.http_client, headers, refresh_url,
+                                      parallelism=self.audio_download_parallelism)
+        # 提取时长按加速后的音频计算，对应的视频时长需乘以加速倍率
+        seconds = self.audio_extract_duration * self.audio_service.speed_factor
+        max_bytes = estimate_audio_bytes(source['bandwidth'], seconds)
+        try:
+            async for chunk in downloader.iter_bytes(source['url'], max_bytes):
+                yield chunk
+        finally:
+            logger.info(
+                f"音频分块下载结束：已下载 {downloader.bytes_downloaded / 1024 / 1024:.2f}MB"
+                f"（文件共 {downloader.total_size / 1024 / 1024:.2f}MB），刷新地址 {downloader.refreshes} 次"
+            )
+
+    async def _stage_summary(self, video_info: Dict[str, Any], subtitle_text: str,
+                             comments_text: Optional[str], page: int = 1) -> str:
+        """阶段：调用LLM生成总结并写入缓存"""
+        if comments_text:
+            logger.info("已获取热门评论，将纳入总结")
+
+        summary = await self.generate_summary(
+            video_info.get('title', '未知标题'), video_info.get('desc', ''),
+            subtitle_text, comments=comments_text or ""
+        )
+        if not summary:
+            raise StageError("❌ 生成总结失败")
+
+        logger.info(f"总结生成成功，长度: {len(summary)}字符")
+        await self._store_cached_summary(video_info, summary, len(subtitle_text), comments_text or "", page)
+        return summary
+
+    async def _build_summary_output(self, video_info: Dict[str, Any], summary: str,
+                                    subtitle_length: int, comments_text: str) -> Tuple[str, str]:
+        """将总结渲染为卡片图片，渲染失败时回退为纯文本"""
+        title = video_info.get('title', '未知标题')
+        owner = video_info.get('owner', '未知UP主')
+        view_count = video_info.get('view', 0)
+        like_count = video_info.get('like', 0)
+        duration = video_info.get('duration', 0)
+
+        # 格式化时长
+        minutes = duration // 60
+        seconds = duration % 60
+        duration_str = f"{minutes:02d}:{seconds:02d}" if duration > 0 else "--:--"
+        
+        # 格式化播放量和点赞数
+        def format_count(count):
+            if count >= 100000000:  # 亿
+                return f"{count / 100000000:.1f}亿"
+            elif count >= 10000:  # 万
+                return f"{count / 10000:.1f}万"
+            else:
+                return str(count)
+        
+        view_str = format_count(view_count)
+        like_str = format_count(like_count)
+
+        # 尝试渲染为图片
+        async with self.scheduler.resource('render'):
+            image_url = await self.render_summary_card(
+                platform_icon="📺",
+                title=title,
+                owner=owner,
+                duration=duration_str,
+                views=view_str,
+                likes=like_str,
+                summary=summary,
+                subtitle_length=subtitle_length,
+                comments=comments_text
+            )
+        
+        if image_url:
+            # 成功渲染为图片
+            return ('image', image_url)
+        else:
+            # 渲染失败，回退到纯文本输出
+            logger.warning("图片渲染失败，使用纯文本输出")
+            output_parts = [
+                f"📺 【{title}】",
+                f"",
+                f"👤 UP主：{owner}",
+                f"⏱️ 时长：{duration_str}  |  👀 {view_str}  |  👍 {like_str}",
+                f"",
+                f"{'─' * 30}",
+                f"📋 内容总结",
+                f"{'─' * 30}",
+                f"",
+                summary,
+            ]
+            if comments_text:
+                output_parts.extend([
+                    f"",
+                    f"{'─' * 30}",
+                    f"💬 热门评论",
+                    f"{'─' * 30}",
+                    f"",
+                    comments_text,
+                ])
+            output_parts.extend([
+                f"",
+                f"{'─' * 30}",
+                f"📊 字幕：{subtitle_length} 字  |  总结：{len(summary)} 字"
+            ])
+            return ('text', "\n".join(output_parts))
 
     async def get_video_info(self, video_id: str) -> Optional[Dict[str, Any]]:
-        """获取视频基本信息"""
+        """获取视频基本信息，优先使用内存缓存
+
+        缓存超过 view_refresh_interval 秒时先返回缓存，同时在后台刷新播放量等统计信息。
+        """
+        cached = self._view_cache.get(video_id)
+        if cached is not None:
+            age = self._view_cache.age(video_id) or 0
+            if age > self.view_refresh_interval and video_id not in self._view_refreshing:
+                self._view_refreshing.add(video_id)
+                task = asyncio.ensure_future(self._refresh_video_info(video_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return dict(cached)
+
+        video_info = await self._fetch_video_info(video_id)
+        if video_info:
+            self._cache_video_info(video_info)
+        return video_info
+
+    def _cache_video_info(self, video_info: Dict[str, Any]) -> None:
+        """按BV号和av号同时缓存视频信息"""
+        for key in (video_info.get('bvid'), f"av{video_info.get('aid')}"):
+            if key:
+                self._view_cache.set(key, dict(video_info), self.view_cache_ttl)
+
+    async def _refresh_video_info(self, video_id: str) -> None:
+        """后台刷新视频信息缓存"""
+        try:
+            video_info = await self._fetch_video_info(video_id)
+            if video_info:
+                self._cache_video_info(video_info)
+        finally:
+            self._view_refreshing.discard(video_id)
+
+    async def _fetch_video_info(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """请求view接口获取视频基本信息"""
         # 根据视频ID类型构建URL
         if video_id.startswith('av'):
             # AV号
@@ -940,10 +1587,12 @@ class BilibiliSummaryPlugin(Star):
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self.http_client.session() as session:
+                await self.rate_limiter.acquire('view')
                 async with session.get(url, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
+                        self.rate_limiter.report('view', response.status, data.get('code'))
                         code = data.get('code')
                         if code == 0:
                             video_data = data.get('data', {})
@@ -961,7 +1610,16 @@ class BilibiliSummaryPlugin(Star):
                                 
                                 result = {
                                     'aid': video_data.get('aid'),
-                                    'cid': pages[0].get('cid'),  # 取第一个分P
+                                    'bvid': video_data.get('bvid'),
+                                    'cid': pages[0].get('cid'),  # 默认取第一个分P
+                                    'pages': [
+                                        {
+                                            'cid': p.get('cid'),
+                                            'part': p.get('part', ''),
+                                            'duration': p.get('duration', 0)
+                                        }
+                                        for p in pages
+                                    ],
                                     'title': video_data.get('title'),
                                     'desc': video_data.get('desc'),
                                     'pic': pic_url,
@@ -976,9 +1634,9 @@ class BilibiliSummaryPlugin(Star):
                             message = data.get('message', '未知错误')
                             logger.warning(f"Bilibili API返回错误: code={code}, message={message}")
                     else:
+                        self.rate_limiter.report('view', response.status)
                         logger.warning(f"HTTP请求失败: status={response.status}")
 
-            await asyncio.sleep(self.request_interval)
             return None
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
@@ -1014,11 +1672,13 @@ class BilibiliSummaryPlugin(Star):
             headers['Cookie'] = self.bilibili_cookie_str
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self.http_client.session() as session:
+                await self.rate_limiter.acquire('player')
                 async with session.get(url, headers=headers) as response:
                     logger.info(f"字幕API响应状态: {response.status}")
                     if response.status == 200:
                         data = await response.json()
+                        self.rate_limiter.report('player', response.status, data.get('code'))
                         code = data.get('code')
                         if code == 0:
                             subtitle_data = data.get('data', {}).get('subtitle', {})
@@ -1062,9 +1722,9 @@ class BilibiliSummaryPlugin(Star):
                             message = data.get('message', '未知错误')
                             logger.warning(f"获取字幕API返回错误: code={code}, message={message}")
                     else:
+                        self.rate_limiter.report('player', response.status)
                         logger.warning(f"获取字幕HTTP请求失败: status={response.status}")
 
-            await asyncio.sleep(self.request_interval)
             return None
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
@@ -1092,7 +1752,7 @@ class BilibiliSummaryPlugin(Star):
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self.http_client.session() as session:
                 async with session.get(subtitle_url, headers=headers) as response:
                     if response.status == 200:
                         subtitle_data = await response.json()
@@ -1113,21 +1773,13 @@ class BilibiliSummaryPlugin(Star):
                             logger.warning("字幕内容为空")
                             return None
 
+                        # 返回完整字幕，长度限制在生成总结时处理
                         full_text = ' '.join(subtitle_texts)
-                        original_length = len(full_text)
-
-                        # 限制长度
-                        if original_length > self.max_subtitle_length:
-                            full_text = full_text[:self.max_subtitle_length] + "..."
-                            logger.info(f"字幕文本过长({original_length}字符)，已截断到{self.max_subtitle_length}字符")
-                        else:
-                            logger.info(f"成功获取字幕文本({original_length}字符)")
-
+                        logger.info(f"成功获取字幕文本({len(full_text)}字符)")
                         return full_text
                     else:
                         logger.warning(f"下载字幕HTTP请求失败: status={response.status}")
 
-            await asyncio.sleep(self.request_interval)
             return None
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
@@ -1141,6 +1793,30 @@ class BilibiliSummaryPlugin(Star):
 
     async def get_video_download_url(self, aid: int, cid: int) -> Optional[str]:
         """获取视频下载地址（带wbi签名）"""
+        source = await self.get_audio_source(aid, cid)
+        return source['url'] if source else None
+
+    async def get_audio_source(self, aid: int, cid: int, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """获取用于提取音频的下载地址，返回 {'url', 'bandwidth', 'dash'}，失败返回None
+
+        dash 为 True 时 url 指向单独的 DASH 音频流，bandwidth 为其码率（bit/s）。
+        地址在其 deadline 前缓存复用，refresh 为 True 时忽略缓存重新请求（如地址已失效）。
+        """
+        key = (aid, cid)
+        if not refresh:
+            cached = self._playurl_cache.get(key)
+            if cached is not None:
+                logger.info("使用缓存的视频下载地址")
+                return dict(cached)
+        source = await self._fetch_audio_source(aid, cid)
+        if source:
+            self._playurl_cache.set(key, dict(source), url_deadline_ttl(source['url']))
+        else:
+            self._playurl_cache.invalidate(key)
+        return source
+
+    async def _fetch_audio_source(self, aid: int, cid: int) -> Optional[Dict[str, Any]]:
+        """请求playurl接口获取下载地址"""
         # 构建请求参数并添加wbi签名
         params = {
             'avid': aid,
@@ -1164,38 +1840,47 @@ class BilibiliSummaryPlugin(Star):
             headers['Cookie'] = self.bilibili_cookie_str
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self.http_client.session() as session:
+                await self.rate_limiter.acquire('playurl')
                 async with session.get(url, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
+                        self.rate_limiter.report('playurl', response.status, data.get('code'))
                         if data.get('code') == 0:
                             data_obj = data.get('data', {})
                             durl = data_obj.get('durl', [])
                             dash = data_obj.get('dash', {})
                             
                             video_url = None
+                            bandwidth = 0
+                            is_dash_audio = False
                             if durl and len(durl) > 0:
                                 video_url = durl[0].get('url')
                             elif dash:
-                                # 如果是dash格式，获取音频流或视频流
-                                audio = dash.get('audio', [])
+                                # 如果是dash格式，优先选择码率最低的音轨，并在主备CDN中选最快的地址
+                                audio = select_dash_audio(dash)
                                 video = dash.get('video', [])
                                 if audio:
-                                    video_url = audio[0].get('baseUrl')
+                                    logger.info(f"选用DASH音轨 {audio.get('id')}（{audio.get('bandwidth', 0) // 1000}kbps）")
+                                    urls = track_urls(audio)
+                                    cdn_headers = {'User-Agent': headers['User-Agent'], 'Referer': headers['Referer']}
+                                    video_url = await race_mirrors(session, urls, cdn_headers) or urls[0]
+                                    bandwidth = audio.get('bandwidth') or 0
+                                    is_dash_audio = True
                                 elif video:
                                     video_url = video[0].get('baseUrl')
                             
                             if video_url:
                                 logger.info(f"成功获取视频下载地址")
-                                return video_url
+                                return {'url': video_url, 'bandwidth': bandwidth, 'dash': is_dash_audio}
                             else:
                                 logger.warning("视频下载地址列表为空")
                         else:
                             logger.warning(f"获取视频地址失败: {data.get('message')}")
                     else:
+                        self.rate_limiter.report('playurl', response.status)
                         logger.warning(f"HTTP请求失败: {response.status}")
-            
-            await asyncio.sleep(self.request_interval)
+
             return None
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
@@ -1227,7 +1912,8 @@ class BilibiliSummaryPlugin(Star):
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self.http_client.session() as session:
+                await self.rate_limiter.acquire('reply')
                 async with session.get(
                     'https://api.bilibili.com/x/v2/reply',
                     headers=headers,
@@ -1235,6 +1921,7 @@ class BilibiliSummaryPlugin(Star):
                 ) as response:
                     if response.status == 200:
                         data = await response.json()
+                        self.rate_limiter.report('reply', response.status, data.get('code'))
                         if data.get('code') == 0:
                             replies = data.get('data', {}).get('replies', [])
                             if not replies:
@@ -1254,9 +1941,9 @@ class BilibiliSummaryPlugin(Star):
                         else:
                             logger.warning(f"获取评论API返回错误: {data.get('message')}")
                     else:
+                        self.rate_limiter.report('reply', response.status)
                         logger.warning(f"获取评论HTTP请求失败: {response.status}")
 
-            await asyncio.sleep(self.request_interval)
             return None
         except aiohttp.ClientError as e:
             logger.error(f"获取评论网络请求失败: {type(e).__name__}: {str(e)}")
@@ -1266,12 +1953,60 @@ class BilibiliSummaryPlugin(Star):
             return None
 
     async def generate_summary(self, title: str, desc: str, subtitle_text: str, comments: str = "") -> Optional[str]:
-        """使用LLM生成视频总结"""
+        """使用LLM生成视频总结
+
+        字幕超过 max_subtitle_length 时，启用分段总结则先分段提炼要点再汇总，否则截断字幕。
+        """
+        subtitle_label = "视频字幕"
+        original_length = len(subtitle_text)
+        if original_length > self.max_subtitle_length:
+            if self.enable_chunked_summary:
+                chunk_notes = await self._summarize_subtitle_chunks(title, subtitle_text)
+                if not chunk_notes:
+                    return None
+                subtitle_label = "视频字幕分段要点"
+                subtitle_text = chunk_notes
+            else:
+                subtitle_text = subtitle_text[:self.max_subtitle_length] + "..."
+                logger.info(f"字幕文本过长({original_length}字符)，已截断到{self.max_subtitle_length}字符")
+
+        # 按模型上下文长度在字幕、评论、简介之间分配token预算
+        max_output_tokens = 4096
+        reserved_tokens = estimate_tokens(self.summary_prompt) + estimate_tokens(title) + 64
+        total_tokens = prompt_budget_for_model(
+            self.openai_model, max_output_tokens, reserved_tokens, self.prompt_token_budget
+        )
+        if total_tokens is None and self.openai_model not in self._unknown_context_models:
+            self._unknown_context_models.add(self.openai_model)
+            logger.warning(
+                f"未知模型 {self.openai_model} 的上下文长度，不按token预算截断提示词（仅保留字符数上限），"
+                f"如需限制请配置 prompt_token_budget"
+            )
+        budget = PromptBudget(total_tokens)
+        budget.add('subtitle', subtitle_text, priority=0, share=0.75)
+        budget.add('comments', comments, priority=1, share=0.15)
+        budget.add('desc', desc.strip() if desc else '', priority=2, share=0.10)
+        sections = budget.allocate()
+
+        subtitle_text = sections['subtitle']['text']
+        desc = sections['desc']['text']
+        comments = sections['comments']['text']
+        if comments and sections['comments']['allocated'] < sections['comments']['tokens']:
+            # 只保留完整的评论行
+            comments = comments.rsplit('\n', 1)[0] if '\n' in comments else comments
+        logger.info(
+            f"提示词token预算: 总计{budget.total_tokens if total_tokens is not None else '不限'}，预留{reserved_tokens}，"
+            + "，".join(
+                f"{name} {info['allocated']}/{info['tokens']}"
+                for name, info in sections.items()
+            )
+        )
+
         # 构建提示词
         content = f"视频标题：{title}\n\n"
-        if desc and desc.strip():
+        if desc:
             content += f"视频简介：{desc}\n\n"
-        content += f"视频字幕：\n{subtitle_text}"
+        content += f"{subtitle_label}：\n{subtitle_text}"
         if comments:
             content += f"\n\n热门评论：\n{comments}"
 
@@ -1280,6 +2015,35 @@ class BilibiliSummaryPlugin(Star):
             {"role": "user", "content": content}
         ]
 
+        return await self._chat_completion(messages, max_tokens=max_output_tokens)
+
+    async def _summarize_subtitle_chunks(self, title: str, subtitle_text: str) -> Optional[str]:
+        """将长字幕切分为重叠片段，并发提炼每段要点，返回按顺序拼接的分段要点"""
+        chunks = split_text_chunks(subtitle_text, self.summary_chunk_size, self.summary_chunk_overlap)
+        total = len(chunks)
+        logger.info(f"字幕共{len(subtitle_text)}字符，分为{total}段进行分段总结")
+        semaphore = asyncio.Semaphore(max(1, self.summary_chunk_parallelism))
+
+        async def summarize(index: int, chunk: str) -> Optional[str]:
+            messages = [
+                {"role": "system", "content": "你是视频内容分析助手。请提炼给定字幕片段中的主要内容、关键信息和要点，"
+                                              "按时间顺序分点列出，不要遗漏重要细节，也不要添加片段以外的内容。请用中文回答。"},
+                {"role": "user", "content": f"视频标题：{title}\n\n以下是视频字幕的第{index + 1}/{total}段：\n{chunk}"}
+            ]
+            async with semaphore:
+                return await self._chat_completion(messages, max_tokens=1024)
+
+        start = time.monotonic()
+        results = await asyncio.gather(*(summarize(i, chunk) for i, chunk in enumerate(chunks)))
+        notes = [f"【第{i + 1}段】\n{r}" for i, r in enumerate(results) if r]
+        logger.info(f"分段总结完成: 成功{len(notes)}/{total}段，耗时{time.monotonic() - start:.2f}s")
+        if not notes:
+            logger.error("所有字幕分段总结均失败")
+            return None
+        return '\n\n'.join(notes)
+
+    async def _chat_completion(self, messages: List[Dict[str, str]], max_tokens: int = 4096) -> Optional[str]:
+        """调用LLM接口并返回回复文本，根据配置选择流式或非流式请求"""
         headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.openai_api_key}'
@@ -1289,30 +2053,18 @@ class BilibiliSummaryPlugin(Star):
             "model": self.openai_model,
             "messages": messages,
             "temperature": 0.7,
-            "max_tokens": 4096  # 增加到4096，确保总结不被截断
+            "max_tokens": max_tokens  # 默认4096，确保总结不被截断
         }
 
+        start = time.monotonic()
+        content = None
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.openai_api_url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        choices = data.get('choices', [])
-                        if choices:
-                            content = choices[0].get('message', {}).get('content', '').strip()
-                            if content:
-                                logger.info(f"成功生成总结({len(content)}字符)")
-                                return content
-                            else:
-                                logger.warning("LLM返回空内容")
-                                return None
-                        else:
-                            logger.warning("LLM响应中没有choices")
-                            return None
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"LLM API请求失败: {response.status} - {error_text}")
-                        return None
+            async with self.scheduler.resource('llm'):
+                if self.enable_llm_stream:
+                    content = await self._chat_completion_stream(headers, payload)
+                else:
+                    content = await self._chat_completion_once(headers, payload)
+            return content
         except aiohttp.ClientError as e:
             logger.error(f"网络请求失败: {type(e).__name__}: {str(e)}")
             return None
@@ -1324,7 +2076,118 @@ class BilibiliSummaryPlugin(Star):
         except Exception as e:
             logger.error(f"调用LLM API时发生未预期错误: {type(e).__name__}: {str(e)}")
             return None
+        finally:
+            self.llm_metrics.record(self.openai_model, time.monotonic() - start, content is not None)
+
+    async def _chat_completion_once(self, headers: Dict[str, str], payload: Dict[str, Any]) -> Optional[str]:
+        """非流式请求，等待完整回复"""
+        async with self.http_client.session() as session:
+            async with session.post(self.openai_api_url, headers=headers, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    choices = data.get('choices', [])
+                    if choices:
+                        content = choices[0].get('message', {}).get('content', '').strip()
+                        if content:
+                            logger.info(f"成功生成总结({len(content)}字符)")
+                            return content
+                        else:
+                            logger.warning("LLM返回空内容")
+                            return None
+                    else:
+                        logger.warning("LLM响应中没有choices")
+                        return None
+                else:
+                    error_text = await response.text()
+                    logger.error(f"LLM API请求失败: {response.status} - {error_text}")
+                    return None
+
+    async def _chat_completion_stream(self, headers: Dict[str, str], payload: Dict[str, Any]) -> Optional[str]:
+        """流式请求（SSE），逐块拼接回复
+
+        两个数据块间隔超过 llm_stream_idle_timeout 视为停滞并放弃；
+        输出超过 llm_max_output_chars 时中止接收，保留已生成的内容并在末尾注明已截断。
+        """
+        payload = dict(payload, stream=True)
+        start = time.monotonic()
+        first_token_at = None
+        parts = []
+        output_chars = 0
+        chunk_count = 0
+        completion_tokens = None
+        truncated = False
+
+        async with self.http_client.session() as session:
+            async with session.post(self.openai_api_url, headers=headers, json=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"LLM API请求失败: {response.status} - {error_text}")
+                    return None
+
+                try:
+                    # 提前 break 时由 aclosing 关闭事件生成器
+                    async with aclosing(iter_sse_events(response, self.llm_stream_idle_timeout)) as events:
+                        async for event in events:
+                            usage = event.get('usage')
+                            if usage and usage.get('completion_tokens'):
+                                completion_tokens = usage['completion_tokens']
+                            for choice in event.get('choices') or []:
+                                delta = (choice.get('delta') or {}).get('content')
+                                if not delta:
+                                    continue
+                                if first_token_at is None:
+                                    first_token_at = time.monotonic()
+                                parts.append(delta)
+                                output_chars += len(delta)
+                                chunk_count += 1
+                            if output_chars > self.llm_max_output_chars:
+                                logger.warning(f"LLM输出超过{self.llm_max_output_chars}字符，中止接收，总结将标注为不完整")
+                                truncated = True
+                                response.close()
+                                break
+                except StreamStalled as e:
+                    logger.error(f"LLM流式响应停滞: {str(e)}，已收到{output_chars}字符")
+                    response.close()
+                    return None
+
+        content = ''.join(parts).strip()
+        if not content:
+            logger.warning("LLM返回空内容")
+            return None
+
+        if truncated:
+            content += f"\n\n（输出超过{self.llm_max_output_chars}字符上限，后续内容已截断）"
+
+        end = time.monotonic()
+        ttft = first_token_at - start
+        # 接口未返回usage时，以数据块数量近似输出token数
+        tokens = completion_tokens or chunk_count
+        generate_time = end - first_token_at
+        self.llm_metrics.record_stream(self.openai_model, ttft, tokens, generate_time)
+        speed = f"{tokens / generate_time:.1f}" if generate_time > 0 else "--"
+        logger.info(
+            f"成功生成总结({len(content)}字符)，首字延迟 {ttft:.2f}s，"
+            f"生成 {tokens} tokens 用时 {generate_time:.2f}s（{speed} tokens/s）"
+        )
+        return content
+
+    async def initialize(self) -> None:
+        """插件激活时调用，启用本地卡片渲染时预热字体和版式"""
+        renderer = self._get_card_renderer()
+        if renderer:
+            try:
+                elapsed = await asyncio.get_running_loop().run_in_executor(None, renderer.warm_up)
+                logger.info(f"本地卡片渲染器预热完成，耗时 {elapsed:.2f}s，字体: {renderer.font_path}")
+            except Exception as e:
+                logger.warning(f"本地卡片渲染器预热失败: {type(e).__name__}: {str(e)}")
 
     async def terminate(self) -> None:
         """插件卸载时调用"""
+        for task in list(self._background_tasks):
+            task.cancel()
+        await self.http_client.close()
+        if self._summary_cache is not None:
+            self._summary_cache.close()
+        if self._transcript_cache is not None:
+            self._transcript_cache.close()
         logger.info("Bilibili Summary插件: 已卸载")
@@ -0,0 +1,154 @@
+"""
+总结文本渲染模块
+将 LLM 输出的 Markdown 子集转换为只带短类名的 HTML，样式统一定义在 templates/video_summary.html 中；
+逐行分类的结果同时供 card_renderer 的 Pillow 渲染使用
+"""
+import html
+import re
+from typing import List, Tuple
+
+# 缩进超过此层级的列表按最深一层显示
+MAX_LIST_DEPTH = 3
+# 多少个空格算一层缩进（制表符按4个空格计）
+INDENT_WIDTH = 2
+
+_HEADING_PATTERN = re.compile(r'(#{1,4})\s+(.+)')
+_NUMBERED_PATTERN = re.compile(r'(\d+)[.、)]\s*(.+)')
+_BULLET_PATTERN = re.compile(r'(?:[-–—•]|\*(?=\s))\s*(.+)')
+_QUOTE_PATTERN = re.compile(r'>\s?(.*)')
+_FENCE_PATTERN = re.compile(r'(```|~~~)')
+_CODE_SPAN_PATTERN = re.compile(r'`([^`]+)`')
+_BOLD_PATTERN = re.compile(r'\*\*([^*]+)\*\*')
+
+
+def render_inline(text: str) -> str:
+    """转义文本并处理行内代码和 **加粗**，代码片段内不再识别加粗"""
+    if '`' not in text:
+        return _BOLD_PATTERN.sub(r'<b>\1</b>', html.escape(text)) if '**' in text else html.escape(text)
+    parts = _CODE_SPAN_PATTERN.split(text)
+    for index, part in enumerate(parts):
+        if index % 2:
+            parts[index] = f'<code>{html.escape(part)}</code>'
+        else:
+            parts[index] = _BOLD_PATTERN.sub(r'<b>\1</b>', html.escape(part))
+    return ''.join(parts)
+
+
+def split_inline(text: str) -> List[Tuple[str, str]]:
+    """按行内格式拆分为 (文本, 样式) 片段，样式为 ''、'b'（加粗）或 'code'，规则与 render_inline 一致"""
+    runs: List[Tuple[str, str]] = []
+    for index, part in enumerate(_CODE_SPAN_PATTERN.split(text)):
+        if index % 2:
+            runs.append((part, 'code'))
+            continue
+        for bold_index, piece in enumerate(_BOLD_PATTERN.split(part)):
+            if piece:
+                runs.append((piece, 'b' if bold_index % 2 else ''))
+    return runs
+
+
+def _list_level(raw_line: str) -> int:
+    indent = len(raw_line) - len(raw_line.lstrip(' \t'))
+    spaces = indent + raw_line[:indent].count('\t') * 3
+    return min(spaces // INDENT_WIDTH, MAX_LIST_DEPTH)
+
+
+# 总结中的一行（代码块为整块）：(类型, 文本, 标题级别或列表嵌套层级, 序号)，
+# 类型为 gap / heading / ol / ul / quote / label / para / code，HTML 和 Pillow 两种渲染方式共用同一份分类结果
+SummaryBlock = Tuple[str, str, int, str]
+
+
+def parse_summary_blocks(summary: str) -> List[SummaryBlock]:
+    """逐行分类总结文本
+
+    支持的格式：
+    - Markdown标题（# ## ### ####）
+    - 数字序号（1. 1、 1)）和横杠、圆点、* 开头的列表项，按缩进嵌套
+    - 引用（> 开头）和代码块（``` 或 ~~~ 包围）
+    - 冒号结尾的小标题行
+    行内的 **加粗** 和 `代码` 保留在 text 中，由 render_inline / split_inline 处理。
+    """
+    blocks: List[SummaryBlock] = []
+    code_lines: List[str] = []
+    in_code = False
+
+    for raw_line in summary.split('\n'):
+        line = raw_line.strip()
+
+        if _FENCE_PATTERN.match(line):
+            if in_code:
+                blocks.append(('code', '\n'.join(code_lines), 0, ''))
+                code_lines = []
+            in_code = not in_code
+            continue
+        if in_code:
+            code_lines.append(raw_line.rstrip())
+            continue
+
+        if not line:
+            blocks.append(('gap', '', 0, ''))
+            continue
+
+        match = _HEADING_PATTERN.match(line)
+        if match:
+            blocks.append(('heading', match.group(2), len(match.group(1)), ''))
+            continue
+
+        match = _NUMBERED_PATTERN.match(line)
+        if match:
+            blocks.append(('ol', match.group(2), _list_level(raw_line), match.group(1)))
+            continue
+
+        match = _BULLET_PATTERN.match(line)
+        if match:
+            blocks.append(('ul', match.group(1), _list_level(raw_line), ''))
+            continue
+
+        match = _QUOTE_PATTERN.match(line)
+        if match:
+            blocks.append(('quote', match.group(1), 0, ''))
+        elif line.endswith('：') or line.endswith(':'):
+            blocks.append(('label', line, 0, ''))
+        else:
+            blocks.append(('para', line, 0, ''))
+
+    # 未闭合的代码块按代码输出
+    if code_lines:
+        blocks.append(('code', '\n'.join(code_lines), 0, ''))
+    return blocks
+
+
+def render_summary_html(summary: str) -> str:
+    """将总结文本转换为HTML，支持的格式见 parse_summary_blocks"""
+    output: List[str] = []
+    for kind, text, level, number in parse_summary_blocks(summary):
+        if kind == 'gap':
+            output.append('<div class="gap"></div>')
+        elif kind == 'heading':
+            output.append(f'<div class="h{level}">{render_inline(text)}</div>')
+        elif kind == 'ol':
+            nested = f' l{level}' if level else ''
+            output.append(
+                f'<div class="ol{nested}"><span class="n">{number}</span>'
+                f'<span>{render_inline(text)}</span></div>'
+            )
+        elif kind == 'ul':
+            nested = f' l{level}' if level else ''
+            output.append(f'<div class="ul{nested}"><span>{render_inline(text)}</span></div>')
+        elif kind == 'quote':
+            output.append(f'<div class="q">{render_inline(text)}</div>')
+        elif kind == 'label':
+            output.append(f'<div class="lbl">{render_inline(text)}</div>')
+        elif kind == 'code':
+            output.append(f'<pre class="code">{html.escape(text)}</pre>')
+        else:
+            output.append(f'<div class="p">{render_inline(text)}</div>')
+    return ''.join(output)
+
+
+def render_comments_html(comments: str) -> str:
+    """将评论文本转换为HTML，每条评论独立展示"""
+    return ''.join(
+        f'<div class="cmt">{html.escape(line.strip())}</div>'
+        for line in comments.split('\n') if line.strip()
+    )
@@ -0,0 +1,145 @@
+"""
+提示词预算模块
+在本地估算 token 数，并按优先级在字幕、简介和评论之间分配模型的上下文预算
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# 与 BPE 分词器预切分规则相近的切分方式：CJK 字符、字母串、数字串、其他符号
+_TOKEN_PATTERN = re.compile(
+    r'[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]'
+    r'|[A-Za-z]+'
+    r'|\d{1,3}'
+    r'|[^\sA-Za-z\d぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]'
+)
+
+# 常见模型的上下文长度，按前缀匹配（越具体的前缀越靠前）
+MODEL_CONTEXT_TOKENS: List[Tuple[str, int]] = [
+    ('gpt-4o', 128000),
+    ('gpt-4.1', 1000000),
+    ('gpt-4-turbo', 128000),
+    ('gpt-4-32k', 32768),
+    ('gpt-4', 8192),
+    ('gpt-3.5-turbo', 16385),
+    ('o1', 128000),
+    ('o3', 200000),
+    ('o4', 200000),
+    ('deepseek', 65536),
+    ('qwen', 32768),
+    ('glm-4', 128000),
+    ('moonshot-v1-8k', 8192),
+    ('moonshot-v1-32k', 32768),
+    ('moonshot-v1-128k', 128000),
+    ('claude', 200000),
+    ('gemini', 1000000),
+]
+
+
+def _token_cost(piece: str) -> int:
+    """单个切分片段的估算 token 数：字母串约每4个字符一个 token，其余每段一个"""
+    if piece.isascii() and piece.isalpha():
+        return (len(piece) + 3) // 4
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的 token 数（不依赖网络或分词器文件）"""
+    if not text:
+        return 0
+    return sum(_token_cost(m.group()) for m in _TOKEN_PATTERN.finditer(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """按估算 token 数截断文本，返回不超过 max_tokens 的前缀"""
+    if max_tokens <= 0:
+        return ''
+    used = 0
+    for m in _TOKEN_PATTERN.finditer(text):
+        used += _token_cost(m.group())
+        if used > max_tokens:
+            return text[:m.start()].rstrip()
+    return text
+
+
+def context_tokens_for_model(model: str) -> Optional[int]:
+    """根据模型名查找上下文长度，未知模型返回None"""
+    name = (model or '').lower()
+    for prefix, tokens in MODEL_CONTEXT_TOKENS:
+        if name.startswith(prefix):
+            return tokens
+    return None
+
+
+class PromptBudget:
+    """按优先级在多个提示词片段之间分配 token 预算
+
+    每个片段先按 share 比例拿到保底额度（不超过自身所需），
+    剩余额度再按优先级（数字越小越优先）补给仍然不够的片段。
+    total_tokens 为None时不限制，所有片段原样保留。
+    """
+
+    def __init__(self, total_tokens: Optional[int]):
+        self.total_tokens = None if total_tokens is None else max(0, total_tokens)
+        self._sections: List[Dict] = []
+
+    def add(self, name: str, text: str, priority: int, share: float) -> None:
+        """添加一个片段"""
+        self._sections.append({
+            'name': name,
+            'text': text or '',
+            'priority': priority,
+            'share': share,
+            'tokens': estimate_tokens(text or ''),
+        })
+
+    def allocate(self) -> Dict[str, Dict]:
+        """返回 {片段名: {'text': 截断后的文本, 'tokens': 原始token数, 'allocated': 分配的token数}}"""
+        if self.total_tokens is None:
+            return {
+                section['name']: {'text': section['text'], 'tokens': section['tokens'], 'allocated': section['tokens']}
+                for section in self._sections
+            }
+        remaining = self.total_tokens
+        allocation: Dict[str, int] = {}
+        for section in self._sections:
+            quota = min(section['tokens'], int(self.total_tokens * section['share']))
+            allocation[section['name']] = quota
+            remaining -= quota
+
+        for section in sorted(self._sections, key=lambda s: s['priority']):
+            if remaining <= 0:
+                break
+            missing = section['tokens'] - allocation[section['name']]
+            if missing > 0:
+                extra = min(missing, remaining)
+                allocation[section['name']] += extra
+                remaining -= extra
+
+        result = {}
+        for section in self._sections:
+            allocated = allocation[section['name']]
+            text = section['text']
+            if allocated < section['tokens']:
+                text = truncate_to_tokens(text, allocated)
+            result[section['name']] = {
+                'text': text,
+                'tokens': section['tokens'],
+                'allocated': allocated,
+            }
+        return result
+
+
+def prompt_budget_for_model(model: str, max_output_tokens: int, reserved_tokens: int,
+                            override: Optional[int] = None) -> Optional[int]:
+    """计算可用于字幕、简介和评论的输入 token 预算
+
+    未配置 override 且模型不在已知列表中时返回None，表示不按 token 预算截断，只保留字符数上限。
+    """
+    if override and override > 0:
+        return override
+    # 预留约5%的余量，抵消估算误差和消息格式开销
+    context = context_tokens_for_model(model)
+    if context is None:
+        return None
+    return max(0, int(context * 0.95) - max_output_tokens - reserved_tokens)
@@ -0,0 +1,100 @@
+"""
+限流模块
+按 B站接口族进行令牌桶限流，并根据风控响应自适应调整速率
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+from astrbot.api import logger
+
+
+# B站风控相关的业务错误码
+RISK_CONTROL_CODES = (-412, -352)
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.throttled = 0
+        self.wait_time = 0.0
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class AdaptiveRateLimiter:
+    """按接口族（view、wbi/v2、playurl、reply 等）独立计数的自适应令牌桶
+
+    每个接口族以 base_rate（次/秒）补充令牌，允许 burst 次突发请求。
+    遇到 HTTP 412 或风控错误码（-412/-352）时速率减半并清空令牌，
+    之后每次成功请求按 base_rate 的 recover_ratio 逐步恢复到基准速率。
+    """
+
+    def __init__(self, base_rate: float, burst: int = 3, min_rate: float = 0.05,
+                 recover_ratio: float = 0.1):
+        self.base_rate = base_rate
+        self.burst = max(1, burst)
+        self.min_rate = min(min_rate, base_rate)
+        self.recover_ratio = recover_ratio
+        self._buckets: Dict[str, _TokenBucket] = {}
+
+    def _bucket(self, family: str) -> _TokenBucket:
+        bucket = self._buckets.get(family)
+        if bucket is None:
+            bucket = _TokenBucket(self.base_rate, self.burst)
+            self._buckets[family] = bucket
+        return bucket
+
+    async def acquire(self, family: str) -> None:
+        """获取一个令牌，令牌不足时等待"""
+        if self.base_rate <= 0:
+            return
+        bucket = self._bucket(family)
+        async with bucket.lock:
+            waited = 0.0
+            while True:
+                bucket.refill()
+                if bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    break
+                delay = (1 - bucket.tokens) / bucket.rate
+                waited += delay
+                await asyncio.sleep(delay)
+            if waited > 0:
+                bucket.throttled += 1
+                bucket.wait_time += waited
+
+    def report(self, family: str, status: int, code: Optional[int] = None) -> None:
+        """根据响应结果调整接口族的速率"""
+        if self.base_rate <= 0:
+            return
+        bucket = self._bucket(family)
+        bucket.refill()
+        if status == 412 or code in RISK_CONTROL_CODES:
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            bucket.tokens = 0.0
+            logger.warning(
+                f"接口 {family} 触发风控(status={status}, code={code})，"
+                f"速率降至 {bucket.rate:.3f} 次/秒"
+            )
+        elif status == 200 and bucket.rate < self.base_rate:
+            bucket.rate = min(self.base_rate, bucket.rate + self.base_rate * self.recover_ratio)
+            if bucket.rate >= self.base_rate:
+                logger.info(f"接口 {family} 速率已恢复到 {self.base_rate:.3f} 次/秒")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """返回各接口族的当前速率和限流统计"""
+        return {
+            family: {
+                'rate': bucket.rate,
+                'throttled': bucket.throttled,
+                'wait_time': bucket.wait_time,
+            }
+            for family, bucket in self._buckets.items()
+        }
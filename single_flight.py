@@ -0,0 +1,46 @@
+"""
+请求合并模块
+同一时刻对同一视频的多次总结请求只执行一次处理流程
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from astrbot.api import logger
+
+
+class SingleFlight:
+    """进程内的 single-flight 注册表
+
+    以视频ID为键记录正在执行的处理任务。相同键的后续请求不再启动新流程，
+    而是等待同一个任务并拿到相同的结果。任务独立于发起者运行，
+    某个等待者被取消不会影响其他等待者。
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    @property
+    def inflight(self) -> int:
+        """当前正在执行的任务数"""
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 func 并返回结果；若相同 key 的任务正在执行，则等待该任务的结果"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"合并重复请求: {key}（累计已避免 {self.coalesced} 次重复处理）")
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已取消时，避免出现未读取异常的警告
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"合并任务异常结束: {key}: {type(task.exception()).__name__}")
@@ -0,0 +1,117 @@
+"""
+SQLite 磁盘缓存基类
+总结缓存和字幕/转写缓存共用的连接管理、线程池执行、按视频清除和 LRU 淘汰逻辑
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class SQLiteCache:
+    """基于单个 SQLite 连接的磁盘缓存
+
+    子类通过 TABLE 和 SCHEMA 定义表结构，表中需包含 aid、bvid、size 和 last_access 列。
+    条目数或总大小超出上限时按最近访问时间（LRU）淘汰，上限小于等于0表示不限制。
+    所有数据库操作在同一把锁内执行，并经线程池调用，避免阻塞事件循环。
+    """
+
+    TABLE = ''
+    # 首次连接时依次执行的建表和建索引语句
+    SCHEMA: Tuple[str, ...] = ()
+
+    def __init__(self, db_path: str, max_entries: int = 0, max_size_bytes: int = 0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    @staticmethod
+    def _video_clause(video_id: str) -> tuple:
+        """根据BV号或AV号构造查询条件"""
+        if video_id.lower().startswith('av'):
+            return 'aid = ?', int(video_id[2:])
+        return 'bvid = ?', video_id
+
+    def _evict_locked(self, conn: sqlite3.Connection) -> int:
+        """按LRU淘汰超出数量或大小上限的条目，调用方需持有锁并负责提交"""
+        count, total_size = conn.execute(
+            f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.TABLE}'
+        ).fetchone()
+        if (self.max_entries <= 0 or count <= self.max_entries) and \
+                (self.max_size_bytes <= 0 or total_size <= self.max_size_bytes):
+            return 0
+
+        rows = conn.execute(f'SELECT rowid, size FROM {self.TABLE} ORDER BY last_access ASC').fetchall()
+        to_delete = []
+        for rowid, size in rows:
+            over_count = self.max_entries > 0 and count > self.max_entries
+            over_size = self.max_size_bytes > 0 and total_size > self.max_size_bytes
+            if not over_count and not over_size:
+                break
+            to_delete.append((rowid,))
+            count -= 1
+            total_size -= size
+        conn.executemany(f'DELETE FROM {self.TABLE} WHERE rowid = ?', to_delete)
+        return len(to_delete)
+
+    def _stats_sync(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def stats(self) -> Dict[str, Any]:
+        """返回缓存条目数、大小和命中统计"""
+        info = await self._run(self._stats_sync)
+        info.update({'hits': self.hits, 'misses': self.misses})
+        return info
+
+    def _purge_sync(self, video_id: Optional[str]) -> int:
+        with self._lock:
+            conn = self._connect()
+            if video_id:
+                clause, value = self._video_clause(video_id)
+                cursor = conn.execute(f'DELETE FROM {self.TABLE} WHERE {clause}', (value,))
+            else:
+                cursor = conn.execute(f'DELETE FROM {self.TABLE}')
+            conn.commit()
+            return cursor.rowcount
+
+    async def purge(self, video_id: Optional[str] = None) -> int:
+        """清除指定视频的缓存，不指定视频时清空全部，返回删除条数"""
+        return await self._run(self._purge_sync, video_id)
+
+    def _cleanup_sync(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            removed = self._evict_locked(conn)
+            conn.commit()
+            return removed
+
+    async def cleanup(self) -> int:
+        """清理过期和超出上限的条目，返回删除条数"""
+        return await self._run(self._cleanup_sync)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,101 @@
+"""
+阶段执行模块
+将处理流程拆分为带依赖关系的阶段，依赖就绪后并发执行
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from astrbot.api import logger
+
+
+class StageError(Exception):
+    """阶段失败，异常消息即返回给用户的提示"""
+
+
+class _Stage:
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 deps: Sequence[str], required: bool):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.required = required
+        self.elapsed: Optional[float] = None
+
+
+class StageGraph:
+    """由阶段组成的有向无环图
+
+    每个阶段在其依赖全部完成后立即开始，互不依赖的阶段并发执行。
+    阶段函数接收依赖阶段结果组成的字典。必需阶段失败时取消其余阶段并抛出原异常；
+    可选阶段失败时结果记为None，不影响后续阶段。执行结束后记录每个阶段的耗时。
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: Dict[str, _Stage] = {}
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Awaitable[Any]],
+            deps: Sequence[str] = (), required: bool = True) -> None:
+        """添加阶段，依赖的阶段必须已经添加"""
+        if name in self._stages:
+            raise ValueError(f"重复的阶段名: {name}")
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"阶段 {name} 依赖未定义的阶段: {dep}")
+        self._stages[name] = _Stage(name, func, deps, required)
+
+    async def _run_stage(self, stage: _Stage, tasks: Dict[str, asyncio.Task]) -> Any:
+        inputs = {}
+        for dep in stage.deps:
+            inputs[dep] = await tasks[dep]
+
+        start = time.monotonic()
+        try:
+            return await stage.func(inputs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if stage.required:
+                raise
+            logger.warning(f"可选阶段 {stage.name} 失败，已忽略: {type(e).__name__}: {str(e)}")
+            return None
+        finally:
+            stage.elapsed = time.monotonic() - start
+
+    async def run(self) -> Dict[str, Any]:
+        """执行所有阶段，返回 {阶段名: 结果}"""
+        start = time.monotonic()
+        tasks: Dict[str, asyncio.Task] = {}
+        for stage in self._stages.values():
+            tasks[stage.name] = asyncio.ensure_future(self._run_stage(stage, tasks))
+
+        try:
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            self._log_timings(time.monotonic() - start)
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    def _log_timings(self, wall_time: float) -> None:
+        parts: List[str] = []
+        serial_time = 0.0
+        for stage in self._stages.values():
+            if stage.elapsed is None:
+                parts.append(f"{stage.name}=未执行")
+                continue
+            serial_time += stage.elapsed
+            parts.append(f"{stage.name}={stage.elapsed:.2f}s")
+        saved = max(serial_time - wall_time, 0.0)
+        logger.info(
+            f"{self.name} 阶段耗时: {', '.join(parts)} | 总耗时 {wall_time:.2f}s，"
+            f"串行合计 {serial_time:.2f}s，并发节省 {saved:.2f}s"
+        )
@@ -0,0 +1,126 @@
+"""
+总结缓存模块
+基于 SQLite 持久化保存视频总结结果，避免同一视频被重复总结
+"""
+import json
+import sqlite3
+import time
+from typing import Optional, Dict, Any
+from astrbot.api import logger
+
+from .sqlite_cache import SQLiteCache
+
+
+class SummaryCache(SQLiteCache):
+    """视频总结的磁盘缓存
+
+    以 (aid, cid, 提示词哈希, 模型) 为主键保存总结、视频信息和热门评论。
+    条目超过 TTL 即视为失效；条目数或总大小超出上限时按最近访问时间（LRU）淘汰。
+    SQLite 操作在线程池中执行，避免阻塞事件循环。
+    """
+
+    TABLE = 'summary_cache'
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS summary_cache (
+            aid INTEGER NOT NULL,
+            cid INTEGER NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            model TEXT NOT NULL,
+            bvid TEXT,
+            page INTEGER NOT NULL DEFAULT 1,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (aid, cid, prompt_hash, model)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_summary_cache_bvid ON summary_cache (bvid, page)',
+        'CREATE INDEX IF NOT EXISTS idx_summary_cache_access ON summary_cache (last_access)',
+    )
+
+    def __init__(self, db_path: str, ttl: int = 604800, max_entries: int = 1000,
+                 max_size_bytes: int = 64 * 1024 * 1024):
+        super().__init__(db_path, max_entries, max_size_bytes)
+        self.ttl = ttl
+
+    def _get_sync(self, video_id: str, page: int, prompt_hash: str, model: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            clause, value = self._video_clause(video_id)
+            row = conn.execute(
+                f'SELECT aid, cid, payload, created_at FROM summary_cache '
+                f'WHERE {clause} AND page = ? AND prompt_hash = ? AND model = ?',
+                (value, page, prompt_hash, model)
+            ).fetchone()
+            if not row:
+                return None
+            aid, cid, payload, created_at = row
+            now = time.time()
+            if self.ttl > 0 and now - created_at > self.ttl:
+                conn.execute(
+                    'DELETE FROM summary_cache WHERE aid = ? AND cid = ? AND prompt_hash = ? AND model = ?',
+                    (aid, cid, prompt_hash, model)
+                )
+                conn.commit()
+                return None
+            conn.execute(
+                'UPDATE summary_cache SET last_access = ? '
+                'WHERE aid = ? AND cid = ? AND prompt_hash = ? AND model = ?',
+                (now, aid, cid, prompt_hash, model)
+            )
+            conn.commit()
+            return json.loads(payload)
+
+    async def get(self, video_id: str, page: int, prompt_hash: str, model: str) -> Optional[Dict[str, Any]]:
+        """按视频ID（BV号或av号）和分P查询缓存，未命中或已过期返回None"""
+        try:
+            entry = await self._run(self._get_sync, video_id, page, prompt_hash, model)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"读取总结缓存失败: {type(e).__name__}: {str(e)}")
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def _set_sync(self, aid: int, cid: int, bvid: str, page: int,
+                  prompt_hash: str, model: str, payload: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                'INSERT OR REPLACE INTO summary_cache '
+                '(aid, cid, prompt_hash, model, bvid, page, payload, size, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (aid, cid, prompt_hash, model, bvid, page, payload, len(payload.encode('utf-8')), now, now)
+            )
+            self._evict_locked(conn)
+            conn.commit()
+
+    def _evict_locked(self, conn: sqlite3.Connection) -> int:
+        """删除过期条目，并按LRU淘汰超出数量或大小上限的条目"""
+        removed = 0
+        if self.ttl > 0:
+            cursor = conn.execute('DELETE FROM summary_cache WHERE created_at < ?', (time.time() - self.ttl,))
+            removed += cursor.rowcount
+        return removed + super()._evict_locked(conn)
+
+    async def set(self, aid: int, cid: int, bvid: str, page: int,
+                  prompt_hash: str, model: str, entry: Dict[str, Any]) -> None:
+        """写入一条总结缓存"""
+        try:
+            payload = json.dumps(entry, ensure_ascii=False)
+            await self._run(self._set_sync, aid, cid, bvid, page, prompt_hash, model, payload)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"写入总结缓存失败: {type(e).__name__}: {str(e)}")
+
+    def _stats_sync(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            count, total_size, oldest = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(created_at) FROM summary_cache'
+            ).fetchone()
+            return {'entries': count, 'size_bytes': total_size, 'oldest': oldest}
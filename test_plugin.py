@@ -2,9 +2,28 @@
 插件测试脚本
 用于验证插件的基本功能
 """
+import asyncio
+import json
+import os
 import re
+import tempfile
 from unittest.mock import MagicMock
-from main import BilibiliSummaryPlugin
+from main import (BilibiliSummaryPlugin, AudioBufferOverflow, PillowCardRenderer,
+                  SummaryCache, TranscriptCache, SUBTITLE_SOURCE)
+from single_flight import SingleFlight
+from stage_executor import StageGraph, StageError
+from rate_limiter import AdaptiveRateLimiter
+from job_scheduler import JobScheduler, SchedulerBusy
+from text_chunker import split_text_chunks
+from llm_stream import LLMMetrics, StreamStalled, iter_sse_events
+from prompt_budget import PromptBudget, estimate_tokens, truncate_to_tokens, prompt_budget_for_model
+from dash_audio import select_dash_audio, track_urls
+from dash_downloader import RangedDownloader, estimate_audio_bytes
+from http_client import HttpClientManager
+from ttl_cache import TTLCache, url_deadline_ttl
+from markdown_html import render_summary_html, render_comments_html, parse_summary_blocks, split_inline
+from link_scanner import scan_links, dedupe_links, av_to_bv, has_link_hint, extract_links_from_json, iter_json_strings
+from audio_service import AudioService, ENCODING_PROFILES, stitch_transcripts, parse_silences, speech_regions, map_trimmed_time
 
 
 class MockConfig:
@@ -48,6 +67,219 @@ def test_url_parsing():
     print("  URL解析测试全部通过\n")
 
 
+def test_page_selection():
+    """测试分P参数解析和分P信息选择"""
+    print("=== 测试分P选择 ===")
+
+    plugin = _make_plugin()
+    assert plugin.parse_page_number("https://www.bilibili.com/video/BV1jv7YzJED2?p=3") == 3
+    assert plugin.parse_page_number("https://www.bilibili.com/video/BV1jv7YzJED2?spm_id_from=x&p=2") == 2
+    assert plugin.parse_page_number("https://www.bilibili.com/video/BV1jv7YzJED2") is None
+    assert plugin.parse_page_number("BV1jv7YzJED2") is None
+    assert plugin.parse_page_number("https://www.bilibili.com/video/BV1jv7YzJED2?p=0") is None
+
+    info = {
+        'aid': 1, 'cid': 11, 'title': '合集', 'duration': 300,
+        'pages': [{'cid': 11, 'part': '上', 'duration': 100}, {'cid': 12, 'part': '下', 'duration': 200}],
+    }
+    part = plugin._select_page(info, 2)
+    assert part['cid'] == 12 and part['duration'] == 200 and part['page'] == 2
+    assert part['title'] == '合集（P2 下）', part['title']
+    assert info['cid'] == 11
+
+    single = {'aid': 1, 'cid': 11, 'title': '单P', 'pages': [{'cid': 11, 'part': '单P', 'duration': 60}]}
+    assert plugin._select_page(single, 1)['title'] == '单P'
+    try:
+        plugin._select_page(info, 3)
+        assert False, "不存在的分P应抛出StageError"
+    except Exception as e:
+        assert type(e).__name__ == 'StageError' and 'P3' in str(e), e
+    print("  分P选择测试全部通过\n")
+
+
+def test_multi_link_targets():
+    """测试多链接的视频ID归一化和去重"""
+    print("=== 测试多链接去重 ===")
+
+    plugin = _make_plugin()
+    assert plugin.normalize_video_id("av170001") == "BV17x411w7KC"
+    assert plugin.normalize_video_id("AV170001") == "BV17x411w7KC"
+    assert plugin.normalize_video_id("BV17x411w7KC") == "BV17x411w7KC"
+
+    async def run():
+        plugin.multi_link_mode = 'separate'
+        plugin.max_links_per_message = 2
+        seen = []
+
+        async def fake_summarize(group, target, render=True):
+            seen.append(target)
+            return ('text', target[0])
+
+        plugin._summarize_target = fake_summarize
+        event = MagicMock()
+        event.plain_result = lambda text: text
+        links = [
+            "https://www.bilibili.com/video/av170001",
+            "BV17x411w7KC",
+            "https://www.bilibili.com/video/BV17x411w7KC?p=2",
+            "BV1jv7YzJED2",
+        ]
+        return [r async for r in plugin.process_bilibili_videos(event, links)]
+
+    results = asyncio.run(run())
+    assert results == ["av170001", "BV17x411w7KC"], results
+    print("  多链接去重测试全部通过\n")
+
+
+def test_all_parts_comments():
+    """测试全部分P模式下评论只获取一次，并用于每个分P的总结"""
+    print("=== 测试全部分P总结 ===")
+
+    plugin = _make_plugin()
+    info = {
+        'aid': 1, 'cid': 11, 'title': '合集', 'duration': 300,
+        'pages': [{'cid': 11, 'part': '上', 'duration': 100}, {'cid': 12, 'part': '下', 'duration': 200}],
+    }
+    comment_calls = []
+    summarized = []
+
+    async def fake_video_info(video_id, page=1):
+        return info
+
+    async def fake_comments(aid):
+        comment_calls.append(aid)
+        return "热评"
+
+    async def fake_cached(video_id, page=1):
+        return None
+
+    async def fake_transcript(video_info):
+        return f"字幕{video_info['page']}"
+
+    async def fake_stage_summary(video_info, transcript, comments_text, page=1):
+        summarized.append((page, comments_text))
+        return f"总结{page}"
+
+    async def fake_output(video_info, summary, subtitle_length, comments_text, render=True):
+        return ('text', (video_info['title'], summary, comments_text))
+
+    plugin._stage_video_info = fake_video_info
+    plugin.get_comments = fake_comments
+    plugin._get_cached_summary = fake_cached
+    plugin._stage_transcript = fake_transcript
+    plugin._stage_summary = fake_stage_summary
+    plugin._summary_output = fake_output
+
+    kind, (title, summary, comments) = asyncio.run(plugin._summarize_all_parts('BV17x411w7KC'))
+    assert comment_calls == [1], comment_calls
+    assert sorted(summarized) == [(1, "热评"), (2, "热评")], summarized
+    assert title == '合集（共2P）' and comments == "热评"
+    assert summary == "## P1 上\n总结1\n\n## P2 下\n总结2", summary
+    print("  全部分P总结测试全部通过\n")
+
+
+def test_summary_html():
+    """测试总结Markdown子集转换为短类名HTML"""
+    print("=== 测试总结HTML渲染 ===")
+
+    summary = (
+        "## 概述\n"
+        "1. **重点** 用 `a<b>` 说明\n"
+        "  - 子项\n"
+        "> 引用内容\n"
+        "```\n"
+        "x = 1 < 2 **不加粗**\n"
+        "```\n"
+        "\n"
+        "要点：\n"
+        "普通 <script>"
+    )
+    result = render_summary_html(summary)
+    assert result == (
+        '<div class="h2">概述</div>'
+        '<div class="ol"><span class="n">1</span><span><b>重点</b> 用 <code>a&lt;b&gt;</code> 说明</span></div>'
+        '<div class="ul l1"><span>子项</span></div>'
+        '<div class="q">引用内容</div>'
+        '<pre class="code">x = 1 &lt; 2 **不加粗**</pre>'
+        '<div class="gap"></div>'
+        '<div class="lbl">要点：</div>'
+        '<div class="p">普通 &lt;script&gt;</div>'
+    ), result
+    assert 'style=' not in result
+    assert parse_summary_blocks("1) 甲\n    • 乙\n~~~\na") == [
+        ('ol', '甲', 0, '1'), ('ul', '乙', 2, ''), ('code', 'a', 0, ''),
+    ]
+    assert split_inline("**粗** `**码**` 文") == [('粗', 'b'), (' ', ''), ('**码**', 'code'), (' 文', '')]
+    assert render_comments_html("好评\n\n<b>") == '<div class="cmt">好评</div><div class="cmt">&lt;b&gt;</div>'
+    print("  总结HTML渲染测试全部通过\n")
+
+
+def test_flight_key_normalization():
+    """测试同一视频的av号和BV号请求共享同一次处理流程，并可分别渲染"""
+    print("=== 测试请求合并键 ===")
+
+    plugin = _make_plugin()
+    calls = []
+
+    async def fake_pipeline(video_id, page=1, all_parts=False, render=True):
+        calls.append((video_id, render))
+        await asyncio.sleep(0.05)
+        return ('summary', {'video_info': {'title': 't'}, 'summary': 's', 'subtitle_length': 1, 'comments': ''})
+
+    async def fake_build(video_info, summary, subtitle_length, comments_text):
+        return ('text', f"card:{summary}")
+
+    plugin._run_video_pipeline = fake_pipeline
+    plugin._build_summary_output = fake_build
+
+    async def run():
+        return await asyncio.gather(
+            plugin._summarize_target('g1', ('av170001', 1, False), render=False),
+            plugin._summarize_target('g2', ('BV17x411w7KC', 1, False)),
+        )
+
+    raw, card = asyncio.run(run())
+    assert len(calls) == 1 and calls[0][1] is False, calls
+    assert raw[0] == 'summary' and card == ('text', 'card:s'), (raw, card)
+    assert plugin._single_flight.coalesced == 1
+    print("  请求合并键测试全部通过\n")
+
+
+def test_card_renderer():
+    """测试本地卡片渲染器的折行和不可用时的回退"""
+    print("=== 测试本地卡片渲染 ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        renderer = PillowCardRenderer(tmp)
+        # 用固定字宽代替真实字体测试折行：每个字符宽度等于字号
+        renderer._text_width = lambda text, size: len(text) * size
+        lines = renderer._wrap([("一二三四五", ''), ("六七", 'b')], 10, 30)
+        assert lines == [[("一二三", '')], [("四五", ''), ("六", 'b')], [("七", 'b')]], lines
+        lines = renderer._wrap([("ab cdef gh", '')], 1, 5)
+        assert lines == [[("ab ", '')], [("cdef ", '')], [("gh", '')]], lines
+
+        # 与HTML渲染共用同一份分类：代码块、引用、* 列表、1、序号、嵌套和行内代码都不会按原文输出
+        ops = []
+        renderer._layout_summary(ops, "1、第一\n  * 子项 `x<1`\n> 引用\n```\ncode **x**\n```", 0, 0, 1000)
+        texts = [op[2] for op in ops if op[0] == 'text']
+        assert texts == ['1', '第一', '子项 ', 'x<1', '引用', 'code **x**'], texts
+        kinds = [op[0] for op in ops]
+        assert kinds.count('ellipse') == 1 and kinds.count('polygon') == 1 and kinds[0] == 'overlay', kinds
+        bullet = next(op for op in ops if op[0] == 'polygon')
+        assert bullet[1][0][0] == 14 + 40, bullet
+        code = [op for op in ops if op[0] == 'text' and op[2] in ('x<1', 'code **x**')]
+        assert all(op[4] == (255, 209, 128) and not op[5] for op in code), code
+
+    plugin = _make_plugin()
+    assert plugin._get_card_renderer() is None
+    plugin.card_renderer = 'pillow'
+    plugin.card_font_path = '/nonexistent/font.ttc'
+    plugin._data_dir = tempfile.gettempdir()
+    renderer = plugin._get_card_renderer()
+    assert renderer is None or renderer.available
+    print("  本地卡片渲染测试全部通过\n")
+
+
 def test_link_extraction():
     """测试链接提取功能"""
     print("=== 测试链接提取功能 ===")
@@ -80,6 +312,95 @@ def test_link_extraction():
     print("  链接提取测试全部通过\n")
 
 
+def test_link_scanner():
+    """测试单次扫描的链接规范化和去重"""
+    print("=== 测试链接扫描 ===")
+
+    text = (
+        "https://www.bilibili.com/video/BV1jv7YzJED2?spm_id_from=x&p=2 "
+        "又发了一遍 https://m.bilibili.com/video/BV1jv7YzJED2/ 和 bv1jv7YzJED2，"
+        "老视频 av170001 https://www.bilibili.com/video/AV170001 "
+        "短链 https://b23.tv/abc123看看 java123 xBV1jv7YzJED2"
+    )
+    links = scan_links(text)
+    print(f"  {links}")
+    assert links == [
+        "https://www.bilibili.com/video/BV1jv7YzJED2?p=2",
+        "BV1jv7YzJED2",
+        "av170001",
+        "https://b23.tv/abc123",
+    ], links
+
+    # 跨文本去重：av号与对应的BV号视为同一视频
+    assert dedupe_links(["av170001", "BV17x411w7KC", "https://b23.tv/abc", "https://b23.tv/abc"]) == [
+        "av170001", "https://b23.tv/abc"
+    ]
+    assert av_to_bv(170001) == "BV17x411w7KC"
+    print("  链接扫描测试全部通过\n")
+
+
+def test_message_prefilter():
+    """测试消息预筛：不含链接关键字的消息不进入完整解析"""
+    print("=== 测试消息预筛 ===")
+
+    import astrbot.api.message_components as Comp
+
+    plugin = _make_plugin()
+    plugin.openai_api_key = "sk-test"
+
+    def make_event(*components):
+        event = MagicMock()
+        event.message_str = "".join(getattr(c, 'text', '') for c in components)
+        event.message_obj.message = list(components)
+        return event
+
+    async def run(event):
+        return [r async for r in plugin.video_summary(event)]
+
+    assert not has_link_hint("今天 java 课好难，have fun")
+    assert has_link_hint("https://b23.tv/abc") and has_link_hint("看看 BV1jv7YzJED2")
+
+    asyncio.run(run(make_event(Comp.Plain(text="今天晚上吃什么"), Comp.Image.fromURL("https://x/y.png"))))
+    asyncio.run(run(make_event(Comp.Json(data={'meta': {'detail_1': {'desc': 'java'}}}))))
+    assert plugin._messages_seen == 2 and plugin._messages_parsed == 0
+
+    event = make_event(Comp.Plain(text="无关"), Comp.Json(data={'meta': {'url': 'https://b23.tv/abc123'}}))
+    components = plugin._candidate_components(event)
+    assert len(components) == 1 and components[0].type == 'Json'
+    assert plugin.extract_video_links_from_message(event, components) == ["https://b23.tv/abc123"]
+    print("  消息预筛测试全部通过\n")
+
+
+def test_json_card_walker():
+    """测试卡片JSON的迭代遍历：优先字段、深度和节点数上限"""
+    print("=== 测试卡片JSON遍历 ===")
+
+    card = {
+        'app': 'com.tencent.miniapp_01',
+        'meta': {
+            'detail_1': {'title': '哔哩哔哩', 'desc': 'av170001',
+                         'qqdocurl': 'https://b23.tv/abc123?share_medium=android'},
+        },
+    }
+    assert extract_links_from_json(card) == ['https://b23.tv/abc123']
+    news = {'meta': {'news': {'jumpUrl': 'https://www.bilibili.com/video/BV1jv7YzJED2?p=2'}}}
+    assert extract_links_from_json(news) == ['https://www.bilibili.com/video/BV1jv7YzJED2?p=2']
+    assert list(iter_json_strings({'a': ['x', {'b': 'y'}], 'c': 'z', 'd': 1})) == ['x', 'y', 'z']
+
+    # 超深嵌套不会触发递归上限，超过深度上限的内容被忽略
+    deep = 'BV1jv7YzJED2'
+    for _ in range(5000):
+        deep = [deep]
+    assert extract_links_from_json(deep) == []
+    assert extract_links_from_json(deep, max_depth=10000, max_nodes=10000) == ['BV1jv7YzJED2']
+
+    # 节点数上限
+    wide = {'items': ['无关内容'] * 100 + ['BV1jv7YzJED2']}
+    assert extract_links_from_json(wide, max_nodes=50) == []
+    assert extract_links_from_json(wide) == ['BV1jv7YzJED2']
+    print("  卡片JSON遍历测试全部通过\n")
+
+
 def test_regex_patterns():
     """测试正则表达式模式"""
     print("=== 测试正则表达式模式 ===")
@@ -107,12 +428,726 @@ def test_regex_patterns():
     print("  正则模式测试全部通过\n")
 
 
+def test_summary_cache():
+    """测试总结缓存的命中、淘汰和清理"""
+    print("=== 测试总结缓存 ===")
+
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SummaryCache(os.path.join(tmp, 'cache.db'), ttl=3600, max_entries=2)
+            entry = {'video_info': {'title': 't'}, 'summary': 's', 'subtitle_length': 1, 'comments': ''}
+
+            await cache.set(1, 11, 'BV1aaaaaaaaa', 1, 'h', 'm', entry)
+            assert await cache.get('BV1aaaaaaaaa', 1, 'h', 'm') == entry
+            assert await cache.get('av1', 1, 'h', 'm') == entry
+            assert await cache.get('BV1aaaaaaaaa', 1, 'other', 'm') is None
+            assert await cache.get('BV1aaaaaaaaa', 2, 'h', 'm') is None
+
+            # 超出条目上限时淘汰最久未访问的条目
+            await cache.set(2, 22, 'BV1bbbbbbbbb', 1, 'h', 'm', entry)
+            await cache.get('BV1aaaaaaaaa', 1, 'h', 'm')
+            await cache.set(3, 33, 'BV1ccccccccc', 1, 'h', 'm', entry)
+            assert await cache.get('BV1bbbbbbbbb', 1, 'h', 'm') is None
+            assert await cache.get('BV1aaaaaaaaa', 1, 'h', 'm') == entry
+
+            assert await cache.purge('av3') == 1
+            stats = await cache.stats()
+            assert stats['entries'] == 1, stats
+            cache.close()
+
+    asyncio.run(run())
+    print("  总结缓存测试全部通过\n")
+
+
+def test_transcript_cache():
+    """测试字幕/转写缓存的压缩存储和按大小淘汰"""
+    print("=== 测试字幕/转写缓存 ===")
+
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = TranscriptCache(os.path.join(tmp, 'transcripts.db'), max_size_bytes=1400)
+            text = '这是一段重复的字幕内容。' * 200
+
+            await cache.set(11, SUBTITLE_SOURCE, 1, 'BV1aaaaaaaaa', text)
+            assert await cache.get(11, SUBTITLE_SOURCE) == text
+            assert await cache.get(11, 'audio:d=300') is None
+            stats = await cache.stats()
+            assert stats['size_bytes'] < stats['raw_bytes'], stats
+
+            # 超出大小上限时淘汰最久未访问的条目
+            noise = ''.join(chr(0x4e00 + (i * 7919) % 20000) for i in range(600))
+            await cache.set(22, 'audio:d=300', 2, 'BV1bbbbbbbbb', noise)
+            assert await cache.get(11, SUBTITLE_SOURCE) is None
+            assert await cache.get(22, 'audio:d=300') == noise
+
+            assert await cache.purge('BV1bbbbbbbbb') == 1
+            cache.close()
+
+    asyncio.run(run())
+    print("  字幕/转写缓存测试全部通过\n")
+
+
+def test_single_flight():
+    """测试并发请求合并"""
+    print("=== 测试并发请求合并 ===")
+
+    async def run():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        results = await asyncio.gather(*(flight.do('BV1aaaaaaaaa', work) for _ in range(3)))
+        assert results == ['result'] * 3, results
+        assert len(calls) == 1, calls
+        assert flight.coalesced == 2 and flight.inflight == 0
+
+        # 任务结束后相同key会重新执行
+        await flight.do('BV1aaaaaaaaa', work)
+        assert len(calls) == 2
+
+    asyncio.run(run())
+    print("  并发请求合并测试全部通过\n")
+
+
+def test_stage_graph():
+    """测试阶段依赖、并发执行和失败取消"""
+    print("=== 测试阶段执行器 ===")
+
+    async def run():
+        async def slow(value):
+            await asyncio.sleep(0.05)
+            return value
+
+        graph = StageGraph()
+        graph.add('info', lambda _: slow(1))
+        graph.add('a', lambda r: slow(r['info'] + 1), deps=['info'])
+        graph.add('b', lambda r: slow(r['info'] + 2), deps=['info'])
+        graph.add('sum', lambda r: slow(r['a'] + r['b']), deps=['a', 'b'])
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await graph.run()
+        assert results['sum'] == 5, results
+        # a 和 b 并发执行，总耗时约为三个阶段而不是四个
+        assert loop.time() - start < 0.19
+
+        async def fail(_):
+            raise StageError("失败")
+
+        cancelled = []
+
+        async def hang(_):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        graph = StageGraph()
+        graph.add('info', lambda _: slow(1))
+        graph.add('required', fail, deps=['info'])
+        graph.add('other', hang, deps=['info'])
+        try:
+            await graph.run()
+            assert False, "必需阶段失败时应抛出异常"
+        except StageError as e:
+            assert str(e) == "失败"
+        assert cancelled == [True]
+
+        graph = StageGraph()
+        graph.add('optional', fail, required=False)
+        graph.add('after', lambda r: slow(r['optional']), deps=['optional'])
+        assert (await graph.run())['after'] is None
+
+    asyncio.run(run())
+    print("  阶段执行器测试全部通过\n")
+
+
+def test_rate_limiter():
+    """测试令牌桶限流和风控降速"""
+    print("=== 测试自适应限流 ===")
+
+    async def run():
+        limiter = AdaptiveRateLimiter(base_rate=20, burst=2)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(4):
+            await limiter.acquire('view')
+        # 突发2次后，剩余2次各等待约 1/20 秒
+        assert 0.08 <= loop.time() - start < 0.3
+
+        limiter.report('view', 200, -412)
+        assert limiter.snapshot()['view']['rate'] == 10
+        limiter.report('view', 412)
+        assert limiter.snapshot()['view']['rate'] == 5
+        for _ in range(20):
+            limiter.report('view', 200, 0)
+        assert limiter.snapshot()['view']['rate'] == 20
+        # 其他接口族不受影响
+        await limiter.acquire('reply')
+        assert limiter.snapshot()['reply']['rate'] == 20
+
+    asyncio.run(run())
+    print("  自适应限流测试全部通过\n")
+
+
+def test_job_scheduler():
+    """测试任务调度的并发上限、按群轮转和队列上限"""
+    print("=== 测试任务调度 ===")
+
+    async def run():
+        scheduler = JobScheduler(max_concurrent_jobs=1, max_queue_depth=4)
+        order = []
+        gate = asyncio.Event()
+
+        async def job(name):
+            order.append(name)
+            await gate.wait()
+
+        # 第一个任务占用唯一名额，群A再排两个，群B排一个
+        tasks = [asyncio.ensure_future(scheduler.run('A', lambda: job('A0')))]
+        await asyncio.sleep(0)
+        for group, name in (('A', 'A1'), ('A', 'A2'), ('B', 'B1'), ('C', 'C1')):
+            tasks.append(asyncio.ensure_future(scheduler.run(group, lambda n=name: job(n))))
+        await asyncio.sleep(0)
+        assert scheduler.snapshot()['queued'] == 4
+
+        try:
+            await scheduler.run('D', lambda: job('D1'))
+            assert False, "队列已满时应拒绝任务"
+        except SchedulerBusy:
+            pass
+
+        gate.set()
+        await asyncio.gather(*tasks)
+        # 各群轮流执行，而不是先执行完群A的全部任务
+        assert order == ['A0', 'A1', 'B1', 'C1', 'A2'], order
+        stats = scheduler.snapshot()
+        assert stats['running'] == 0 and stats['queued'] == 0 and stats['rejected'] == 1
+
+    asyncio.run(run())
+    print("  任务调度测试全部通过\n")
+
+
+def test_split_text_chunks():
+    """测试长字幕分段"""
+    print("=== 测试字幕分段 ===")
+
+    assert split_text_chunks("短字幕", 100) == ["短字幕"]
+    assert split_text_chunks("", 100) == []
+
+    text = "。".join(f"第{i}句话" for i in range(100)) + "。"
+    chunks = split_text_chunks(text, 80, overlap=20)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 80
+        assert chunk.endswith("。"), chunk
+    # 相邻片段有重叠，且覆盖全文
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert cur.split("。")[0] in prev, (prev, cur)
+    assert chunks[0].startswith("第0句话") and chunks[-1].endswith("第99句话。")
+
+    print("  字幕分段测试全部通过\n")
+
+
+def test_prompt_budget():
+    """测试token估算和预算分配"""
+    print("=== 测试提示词预算 ===")
+
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("视频总结") == 4
+    assert estimate_tokens("summary") == 2
+    assert estimate_tokens("视频 summary 123456") == 6
+    assert truncate_to_tokens("一二三四五", 3) == "一二三"
+    assert truncate_to_tokens("一二三", 10) == "一二三"
+
+    budget = PromptBudget(100)
+    budget.add('subtitle', "字" * 500, priority=0, share=0.75)
+    budget.add('comments', "评" * 50, priority=1, share=0.15)
+    budget.add('desc', "简介", priority=2, share=0.10)
+    sections = budget.allocate()
+    # 简介和评论只占用保底额度内所需的部分，剩余额度优先补给字幕
+    assert sections['desc']['allocated'] == 2
+    assert sections['comments']['allocated'] == 15
+    assert sections['subtitle']['allocated'] == 83
+    assert sum(estimate_tokens(info['text']) for info in sections.values()) <= 100
+
+    # 未知模型不按token预算截断，只受字符数上限约束
+    assert prompt_budget_for_model('gpt-4o', 4096, 100) > 100000
+    for model in ('gpt-5', 'mistral-large', 'llama-3.1-70b', 'doubao-pro-32k'):
+        assert prompt_budget_for_model(model, 4096, 100) is None, model
+    assert prompt_budget_for_model('gpt-5', 4096, 100, override=5000) == 5000
+    unlimited = PromptBudget(prompt_budget_for_model('gpt-5', 4096, 100))
+    unlimited.add('subtitle', "字" * 8000, priority=0, share=0.75)
+    sections = unlimited.allocate()
+    assert sections['subtitle']['text'] == "字" * 8000 and sections['subtitle']['allocated'] == 8000
+
+    print("  提示词预算测试全部通过\n")
+
+
+class _FakeStreamContent:
+    """按顺序返回预设的 SSE 行，None 表示停滞（一直不返回数据）"""
+
+    def __init__(self, lines):
+        self._lines = list(lines)
+
+    async def readline(self):
+        if not self._lines:
+            return b''
+        line = self._lines.pop(0)
+        if line is None:
+            await asyncio.sleep(3600)
+        return line
+
+
+class _FakeStreamResponse:
+    def __init__(self, lines):
+        self.status = 200
+        self.content = _FakeStreamContent(lines)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _sse_line(content=None, usage=None) -> bytes:
+    event = {'choices': [{'delta': {'content': content}}] if content is not None else []}
+    if usage:
+        event['usage'] = usage
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n".encode('utf-8')
+
+
+def test_llm_stream():
+    """测试SSE解析、停滞超时、超长中止和流式统计"""
+    print("=== 测试LLM流式响应 ===")
+
+    async def collect(lines, idle_timeout=1.0):
+        return [event async for event in iter_sse_events(_FakeStreamResponse(lines), idle_timeout)]
+
+    # 普通增量、注释行、非法JSON被跳过，[DONE] 之后的内容不再读取
+    events = asyncio.run(collect([
+        b": keep-alive\n", _sse_line("你好"), b"data: {broken\n", b"\n", _sse_line("世界"),
+        b"data: [DONE]\n", _sse_line("不应读取"),
+    ]))
+    assert [e['choices'][0]['delta']['content'] for e in events] == ["你好", "世界"], events
+
+    try:
+        asyncio.run(collect([_sse_line("a"), None], idle_timeout=0.05))
+        assert False, "停滞时应抛出StreamStalled"
+    except StreamStalled:
+        pass
+
+    plugin = _make_plugin()
+    plugin.openai_model = 'test-model'
+    plugin.llm_stream_idle_timeout = 0.05
+    plugin.llm_max_output_chars = 5
+    responses = []
+
+    class FakeSession:
+        def post(self, url, headers=None, json=None):
+            responses.append(response)
+            return response
+
+    class FakeSessionContext:
+        async def __aenter__(self):
+            return FakeSession()
+
+        async def __aexit__(self, *exc):
+            return False
+
+    plugin.http_client = MagicMock()
+    plugin.http_client.session = lambda: FakeSessionContext()
+
+    # 超过输出上限时中止接收，保留已收到的内容并注明已截断，按usage统计token数
+    response = _FakeStreamResponse([
+        _sse_line("一二三"), _sse_line("四五六"), _sse_line("七八九", usage={'completion_tokens': 9}),
+        _sse_line("十"), b"data: [DONE]\n",
+    ])
+    content = asyncio.run(plugin._chat_completion_stream({}, {}))
+    assert content == "一二三四五六\n\n（输出超过5字符上限，后续内容已截断）", content
+    assert response.closed
+
+    # 停滞时放弃本次结果
+    response = _FakeStreamResponse([_sse_line("部分"), None])
+    assert asyncio.run(plugin._chat_completion_stream({}, {})) is None
+    assert response.closed
+
+    # 正常结束，使用接口返回的 completion_tokens
+    plugin.llm_max_output_chars = 1000
+    response = _FakeStreamResponse([
+        _sse_line("完整"), _sse_line("回复", usage={'completion_tokens': 4}), b"data: [DONE]\n",
+    ])
+    assert asyncio.run(plugin._chat_completion_stream({}, {})) == "完整回复"
+
+    info = plugin.llm_metrics.snapshot()['test-model']
+    assert info['avg_ttft'] is not None and info['avg_ttft'] >= 0
+    assert info['tokens_per_sec'] is not None and info['tokens_per_sec'] > 0
+
+    metrics = LLMMetrics()
+    metrics.record('m', 2.0, True)
+    metrics.record('m', 4.0, False)
+    metrics.record_stream('m', 0.5, 100, 2.0)
+    metrics.record_stream('m', 1.5, 300, 2.0)
+    assert metrics.snapshot()['m'] == {
+        'requests': 2, 'failures': 1, 'avg_time': 3.0, 'avg_ttft': 1.0, 'tokens_per_sec': 100.0,
+    }
+    print("  LLM流式响应测试全部通过\n")
+
+
+def test_stitch_transcripts():
+    """测试分段识别结果的重叠去重拼接"""
+    print("=== 测试分段识别拼接 ===")
+
+    parts = [
+        "今天我们来聊一聊人工智能的发展历史和未来趋势",
+        "发展历史和未来趋势，首先是图灵测试",
+        "图灵测试的提出改变了一切",
+    ]
+    assert stitch_transcripts(parts) == "今天我们来聊一聊人工智能的发展历史和未来趋势，首先是图灵测试的提出改变了一切"
+    # 没有重叠内容时直接拼接，英文片段之间补空格
+    assert stitch_transcripts(["hello world this is", "a different sentence"]) == \
+        "hello world this is a different sentence"
+    assert stitch_transcripts(["", "唯一一段", " "]) == "唯一一段"
+
+    print("  分段识别拼接测试全部通过\n")
+
+
+def test_segment_failures():
+    """测试分段识别中个别片段失败时标注缺失，失败过多时放弃转写"""
+    print("=== 测试分段识别失败 ===")
+
+    service = AudioService(None, '', '', 'whisper-1', 'zh', segment_overlap=2)
+
+    async def cut(audio_path, segment_path, start, length):
+        return True
+
+    def transcribe_with(failing):
+        async def transcribe(segment_path, api_key):
+            index = int(segment_path[-7:-4])
+            if index in failing:
+                raise RuntimeError("识别失败")
+            return ["开场介绍", "背景说明", "核心观点", "案例分析", "结尾总结"][index]
+        return transcribe
+
+    service._cut_segment = cut
+    # 40秒音频按每段10秒、重叠2秒切为5段
+    service._transcribe_file = transcribe_with({2})
+    text = asyncio.run(service._transcribe_segmented('/tmp/a.mp3', 'key', 40, 10))
+    assert text == "开场介绍背景说明\n[第3段音频识别失败，约10秒内容缺失]\n案例分析结尾总结", text
+
+    service._transcribe_file = transcribe_with({1, 2})
+    assert asyncio.run(service._transcribe_segmented('/tmp/a.mp3', 'key', 40, 10)) is None
+    print("  分段识别失败测试全部通过\n")
+
+
+def test_silence_regions():
+    """测试静音区间解析和时间映射"""
+    print("=== 测试静音剪除区间 ===")
+
+    stderr_text = (
+        "[silencedetect @ 0x1] silence_start: 0\n"
+        "[silencedetect @ 0x1] silence_end: 2.5 | silence_duration: 2.5\n"
+        "[silencedetect @ 0x1] silence_start: 10\n"
+        "[silencedetect @ 0x1] silence_end: 14 | silence_duration: 4\n"
+        "[silencedetect @ 0x1] silence_start: 18\n"
+    )
+    silences = parse_silences(stderr_text)
+    assert silences == [(0.0, 2.5), (10.0, 14.0), (18.0, float('inf'))], silences
+
+    regions = speech_regions(silences, 20.0, padding=0.5)
+    assert regions == [(2.0, 10.5), (13.5, 18.5)], regions
+
+    # 剪除后第0秒对应原音频2秒，第8.5秒进入第二段语音
+    assert map_trimmed_time(regions, 0) == 2.0
+    assert map_trimmed_time(regions, 9.0) == 14.0
+    assert speech_regions([], 5.0) == [(0.0, 5.0)]
+    print("  静音剪除区间测试全部通过\n")
+
+
+def test_audio_overflow_fallback():
+    """测试流式提取超过内存上限时改用临时文件提取"""
+    print("=== 测试流式提取回退 ===")
+
+    plugin = _make_plugin()
+    plugin.enable_audio_transcription = True
+    plugin.audio_stream_mode = True
+    plugin.whisper_segment_seconds = 0
+    plugin.audio_native_download = False
+    calls = []
+
+    async def no_cache(cid, source):
+        return None
+
+    async def no_subtitle(aid, cid):
+        return None
+
+    async def audio_source(aid, cid, refresh=False):
+        return {'url': 'https://upos.example/a.m4s', 'dash': False}
+
+    async def to_memory(video_url, duration=0, chunks=None):
+        calls.append('memory')
+        raise AudioBufferOverflow()
+
+    async def from_video(video_url, duration=0):
+        calls.append('file')
+        return '/tmp/audio.mp3'
+
+    async def transcribe(audio_path, api_key):
+        calls.append(('transcribe', audio_path))
+        return "转写结果"
+
+    async def store(video_info, source, text):
+        calls.append(('store', source))
+
+    plugin._get_cached_transcript = no_cache
+    plugin.get_subtitle = no_subtitle
+    plugin.get_audio_source = audio_source
+    plugin._store_cached_transcript = store
+    plugin.audio_service.extract_audio_to_memory = to_memory
+    plugin.audio_service.extract_audio_from_video = from_video
+    plugin.audio_service.transcribe_audio = transcribe
+
+    text = asyncio.run(plugin._stage_transcript({'aid': 1, 'cid': 11}))
+    assert text == "转写结果"
+    assert calls[:3] == ['memory', 'file', ('transcribe', '/tmp/audio.mp3')], calls
+    assert calls[3][0] == 'store' and calls[3][1].startswith('audio:'), calls
+    print("  流式提取回退测试全部通过\n")
+
+def test_ffmpeg_profiles():
+    """测试各编码方案生成的ffmpeg参数"""
+    print("=== 测试音频编码方案 ===")
+
+    for name, profile in ENCODING_PROFILES.items():
+        service = AudioService(None, '', '', 'whisper-1', 'zh', encoding_profile=name)
+        cmd = service._build_ffmpeg_command('https://upos.example/a.m4s', 0)
+        assert cmd[:2] == ['ffmpeg', '-user_agent'] and '-referer' in cmd, cmd
+        assert cmd[-len(profile['args']):] == profile['args'], (name, cmd)
+        assert cmd[cmd.index('-i') + 1] == 'https://upos.example/a.m4s' and '-t' not in cmd
+
+        cmd = service._build_ffmpeg_command('pipe:0', 0)
+        assert cmd == ['ffmpeg', '-i', 'pipe:0', '-vn'] + profile['args'], (name, cmd)
+        assert name in service.transcript_signature(0)
+
+    service = AudioService(None, '', '', 'whisper-1', 'zh', encoding_profile='wav')
+    assert service.encoding_profile == 'mp3-64k'
+    print("  音频编码方案测试全部通过\n")
+
+def test_ffmpeg_speed():
+    """测试语音加速的 atempo 滤镜、倍率范围和 -t 时长限制"""
+    print("=== 测试语音加速 ===")
+
+    args = ENCODING_PROFILES['mp3-64k']['args']
+    for speed, atempo in ((1.0, None), (0.5, None), (1.25, 'atempo=1.25'), (2.0, 'atempo=2'), (3.0, 'atempo=2')):
+        service = AudioService(None, '', '', 'whisper-1', 'zh', speed_factor=speed)
+        cmd = service._build_ffmpeg_command('pipe:0', 300)
+        expected = ['ffmpeg', '-i', 'pipe:0', '-vn'] + (['-af', atempo] if atempo else []) + args + ['-t', '300']
+        assert cmd == expected, (speed, cmd)
+        # -t 作为输出选项，按加速后的时长计算：300秒输出覆盖 300*倍率 秒的原视频
+        assert cmd.index('-t') > cmd.index('-i')
+        assert ('speed=' in service.transcript_signature(300)) == bool(atempo)
+    print("  语音加速测试全部通过\n")
+
+
+def test_select_dash_audio():
+    """测试DASH音轨选择"""
+    print("=== 测试DASH音轨选择 ===")
+
+    dash = {
+        'audio': [
+            {'id': 30280, 'bandwidth': 319173, 'baseUrl': 'https://a/30280.m4s', 'backupUrl': ['https://b/30280.m4s']},
+            {'id': 30216, 'bandwidth': 67207, 'baseUrl': 'https://a/30216.m4s',
+             'backupUrl': ['https://b/30216.m4s', 'https://a/30216.m4s']},
+            {'id': 30232, 'bandwidth': 132000, 'base_url': 'https://a/30232.m4s'},
+        ],
+        'dolby': {'audio': [{'id': 30250, 'baseUrl': 'https://a/dolby.m4s'}]},
+    }
+    track = select_dash_audio(dash)
+    assert track['id'] == 30216, track
+    assert track_urls(track) == ['https://a/30216.m4s', 'https://b/30216.m4s']
+
+    # 没有 bandwidth 时按音轨ID对应的码率比较
+    track = select_dash_audio({'audio': [{'id': 30232, 'base_url': 'x'}, {'id': 30216, 'base_url': 'y'}]})
+    assert track['id'] == 30216, track
+    assert select_dash_audio({'audio': []}) is None
+    print("  DASH音轨选择测试全部通过\n")
+
+
+def test_http_client():
+    """测试共享HTTP连接池的延迟创建、复用和关闭后重建"""
+    print("=== 测试共享HTTP连接池 ===")
+
+    async def run():
+        client = HttpClientManager(limit=20, limit_per_host=5, total_timeout=0)
+        assert client._session is None
+
+        # 并发首次使用只创建一个 Session，之后的借用都复用它
+        first, second = await asyncio.gather(client.get_session(), client.get_session())
+        assert first is second and not first.closed
+        async with client.session() as session:
+            assert session is first
+        async with client.session() as session:
+            assert session is first and not session.closed
+        assert first.connector.limit == 20 and first.connector.limit_per_host == 5
+        assert first.timeout.total is None and first.timeout.sock_connect == 10.0
+
+        await client.close()
+        assert first.closed and client._session is None
+        await client.close()
+
+        # 关闭后再次使用会重新创建
+        async with client.session() as session:
+            assert session is not first and not session.closed
+        await client.close()
+
+    asyncio.run(run())
+    print("  共享HTTP连接池测试全部通过\n")
+
+
+def test_ranged_downloader():
+    """测试分块下载的字节上限和地址过期后的断点续传"""
+    print("=== 测试音频分块下载 ===")
+    from aiohttp import web
+
+    payload = bytes(range(256)) * 4096
+    requests = []
+
+    async def handler(request):
+        if request.match_info['name'] == 'expired' and len(requests) >= 2:
+            return web.Response(status=403)
+        if request.match_info['name'] == 'norange':
+            # 模拟忽略 Range 头、总是返回完整文件的服务器
+            requests.append(('norange', 0))
+            return web.Response(status=200, body=payload)
+        start, end = (int(v) for v in request.headers['Range'][6:].split('-'))
+        end = min(end, len(payload) - 1)
+        requests.append((request.match_info['name'], start))
+        if start >= len(payload):
+            return web.Response(status=416)
+        # nototal 模拟 Content-Range 中不带文件总大小的服务器
+        size = '*' if request.match_info['name'] == 'nototal' else len(payload)
+        return web.Response(status=206, body=payload[start:end + 1],
+                            headers={'Content-Range': f'bytes {start}-{end}/{size}'})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/{name}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        client = HttpClientManager()
+
+        async def refresh_url():
+            return f"{base}/fresh"
+
+        try:
+            downloader = RangedDownloader(client, {}, refresh_url, chunk_size=64 * 1024, parallelism=2)
+            data = b''.join([chunk async for chunk in downloader.iter_bytes(f"{base}/expired", max_bytes=300000)])
+            assert data == payload[:300000]
+            assert downloader.refreshes == 1, downloader.refreshes
+            assert downloader.total_size == len(payload)
+            # 已下载的分块不会重复请求
+            starts = [start for _, start in requests]
+            assert len(starts) == len(set(starts)), requests
+
+            # 服务器返回200时只下载一次完整文件，不再发出分块请求
+            requests.clear()
+            downloader = RangedDownloader(client, {}, refresh_url, chunk_size=64 * 1024, parallelism=2)
+            data = b''.join([chunk async for chunk in downloader.iter_bytes(f"{base}/norange")])
+            assert data == payload
+            assert requests == [('norange', 0)], requests
+            assert downloader.bytes_downloaded == len(payload)
+            data = b''.join([chunk async for chunk in downloader.iter_bytes(f"{base}/norange", max_bytes=300000)])
+            assert data == payload[:300000]
+
+            # 文件总大小未知时一直请求到文件末尾，不会只下载第一个分块
+            requests.clear()
+            downloader = RangedDownloader(client, {}, refresh_url, chunk_size=64 * 1024, parallelism=2)
+            data = b''.join([chunk async for chunk in downloader.iter_bytes(f"{base}/nototal")])
+            assert data == payload and downloader.total_size == len(payload)
+            assert downloader.refreshes == 0, downloader.refreshes
+            data = b''.join([chunk async for chunk in downloader.iter_bytes(f"{base}/nototal", max_bytes=300000)])
+            assert data == payload[:300000]
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert estimate_audio_bytes(0, 300) == 0
+    assert estimate_audio_bytes(64000, 300) > 64000 * 300 // 8
+    print("  音频分块下载测试全部通过\n")
+
+
+def test_ttl_cache():
+    """测试内存缓存的过期、淘汰和deadline解析"""
+    print("=== 测试接口响应缓存 ===")
+    import time
+
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=0.01)
+    cache.set('skip', 3, ttl=0)
+    assert cache.get('a') == 1
+    assert cache.get('skip') is None
+    time.sleep(0.02)
+    assert cache.get('b') is None
+
+    cache.set('c', 3, ttl=60)
+    cache.get('a')
+    cache.set('d', 4, ttl=60)
+    assert cache.get('c') is None and cache.get('a') == 1
+
+    deadline = int(time.time()) + 3600
+    ttl = url_deadline_ttl(f"https://upos-sz.bilivideo.com/x.m4s?e=ig8&deadline={deadline}&gen=playurlv2")
+    assert 3400 < ttl <= 3540, ttl
+    assert url_deadline_ttl("https://example.com/x.m4s", default=5) == 5
+    print("  接口响应缓存测试全部通过\n")
+
+
 if __name__ == "__main__":
     print("Bilibili Summary Plugin 测试")
     print("=" * 50)
 
     test_url_parsing()
+    test_page_selection()
+    test_multi_link_targets()
+    test_all_parts_comments()
+    test_summary_html()
+    test_flight_key_normalization()
+    test_card_renderer()
     test_link_extraction()
+    test_link_scanner()
+    test_message_prefilter()
+    test_json_card_walker()
     test_regex_patterns()
+    test_summary_cache()
+    test_transcript_cache()
+    test_single_flight()
+    test_stage_graph()
+    test_rate_limiter()
+    test_job_scheduler()
+    test_split_text_chunks()
+    test_prompt_budget()
+    test_llm_stream()
+    test_stitch_transcripts()
+    test_segment_failures()
+    test_silence_regions()
+    test_audio_overflow_fallback()
+    test_ffmpeg_profiles()
+    test_ffmpeg_speed()
+    test_select_dash_audio()
+    test_http_client()
+    test_ranged_downloader()
+    test_ttl_cache()
 
     print("All tests passed.")
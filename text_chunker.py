@@ -0,0 +1,51 @@
+"""
+文本分块模块
+将长字幕切分为带重叠的片段，供分段总结使用
+"""
+from typing import List
+
+
+# 优先在这些字符之后断开，避免把一句话切成两半
+SENTENCE_BREAKS = '。！？；!?;\n'
+WORD_BREAKS = '，,、 '
+
+
+def _find_break(text: str, start: int, end: int) -> int:
+    """在 [start, end) 的后半段中寻找最靠后的断句位置，找不到时返回 end"""
+    lower = start + (end - start) // 2
+    for breaks in (SENTENCE_BREAKS, WORD_BREAKS):
+        for i in range(end - 1, lower - 1, -1):
+            if text[i] in breaks:
+                return i + 1
+    return end
+
+
+def split_text_chunks(text: str, chunk_size: int, overlap: int = 0) -> List[str]:
+    """按字符数切分文本，相邻片段之间保留 overlap 个字符的重叠
+
+    切分点尽量落在句末标点处；文本不超过 chunk_size 时原样返回一个片段。
+    """
+    if chunk_size <= 0 or len(text) <= chunk_size:
+        return [text] if text else []
+
+    overlap = max(0, min(overlap, chunk_size // 2))
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            end = _find_break(text, start, end)
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        # 重叠部分尽量从完整的句子开始
+        next_start = max(end - overlap, start + 1)
+        for i in range(next_start, end - 1):
+            if text[i] in SENTENCE_BREAKS:
+                next_start = i + 1
+                break
+        start = next_start
+    return chunks
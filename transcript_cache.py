@@ -0,0 +1,106 @@
+"""
+字幕/转写缓存模块
+基于 SQLite 持久化保存压缩后的字幕和语音转写文本，提示词或模型变化时无需重新提取音频
+"""
+import sqlite3
+import time
+import zlib
+from typing import Optional, Dict, Any
+from astrbot.api import logger
+
+from .sqlite_cache import SQLiteCache
+
+
+# 字幕文本的来源标识，语音转写使用 AudioService.transcript_signature() 生成的标识
+SUBTITLE_SOURCE = 'subtitle'
+
+
+class TranscriptCache(SQLiteCache):
+    """字幕和语音转写文本的磁盘缓存
+
+    以 (cid, 来源标识) 为主键保存 zlib 压缩后的文本，来源标识区分 B站字幕和
+    不同提取参数（时长、Whisper 模型、语言等）下的转写结果。
+    总大小（压缩后）超出上限时按最近访问时间（LRU）淘汰，不限制条目数。
+    """
+
+    TABLE = 'transcript_cache'
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS transcript_cache (
+            cid INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            aid INTEGER,
+            bvid TEXT,
+            data BLOB NOT NULL,
+            raw_size INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (cid, source)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_transcript_cache_access ON transcript_cache (last_access)',
+    )
+
+    def __init__(self, db_path: str, max_size_bytes: int = 128 * 1024 * 1024):
+        super().__init__(db_path, max_size_bytes=max_size_bytes)
+
+    def _get_sync(self, cid: int, source: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT data FROM transcript_cache WHERE cid = ? AND source = ?', (cid, source)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                'UPDATE transcript_cache SET last_access = ? WHERE cid = ? AND source = ?',
+                (time.time(), cid, source)
+            )
+            conn.commit()
+            return zlib.decompress(row[0]).decode('utf-8')
+
+    async def get(self, cid: int, source: str) -> Optional[str]:
+        """查询指定分P和来源的文本，未命中返回None"""
+        try:
+            text = await self._run(self._get_sync, cid, source)
+        except (sqlite3.Error, zlib.error, UnicodeDecodeError) as e:
+            logger.warning(f"读取转写缓存失败: {type(e).__name__}: {str(e)}")
+            text = None
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    def _set_sync(self, cid: int, source: str, aid: int, bvid: str, text: str) -> None:
+        raw = text.encode('utf-8')
+        data = zlib.compress(raw, 6)
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                'INSERT OR REPLACE INTO transcript_cache '
+                '(cid, source, aid, bvid, data, raw_size, size, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (cid, source, aid, bvid, data, len(raw), len(data), now, now)
+            )
+            self._evict_locked(conn)
+            conn.commit()
+
+    async def set(self, cid: int, source: str, aid: int, bvid: str, text: str) -> None:
+        """写入一条字幕或转写文本"""
+        if not text:
+            return
+        try:
+            await self._run(self._set_sync, cid, source, aid, bvid, text)
+        except sqlite3.Error as e:
+            logger.warning(f"写入转写缓存失败: {type(e).__name__}: {str(e)}")
+
+    def _stats_sync(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            count, raw_size, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(size), 0) FROM transcript_cache'
+            ).fetchone()
+            return {'entries': count, 'raw_bytes': raw_size, 'size_bytes': size}
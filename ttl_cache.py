@@ -0,0 +1,69 @@
+"""
+内存缓存模块
+为 B站 view、playurl 等接口的响应提供带过期时间的内存缓存，减少重复的签名请求
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class TTLCache:
+    """带过期时间的内存缓存
+
+    每个条目单独设置有效期，过期后读取视为未命中；条目数超过 max_entries 时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._data: 'OrderedDict[Hashable, Tuple[Any, float, float]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取未过期的条目，未命中返回None"""
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """返回条目已缓存的秒数，不存在时返回None"""
+        entry = self._data.get(key)
+        return time.monotonic() - entry[2] if entry else None
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """写入条目，ttl 不大于0时不缓存"""
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        self._data[key] = (value, now + ttl, now)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """删除条目"""
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def url_deadline_ttl(url: str, margin: float = 60.0, default: float = 0.0) -> float:
+    """根据 B站 CDN 地址中的 deadline 参数（Unix 时间戳）计算剩余有效期，预留 margin 秒
+
+    地址不含 deadline 时返回 default。
+    """
+    deadline = parse_qs(urlparse(url).query).get('deadline')
+    if not deadline:
+        return default
+    try:
+        return float(deadline[0]) - time.time() - margin
+    except ValueError:
+        return default